@@ -0,0 +1,28 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Entry point of ``python -m json_schema_validator``."""
+
+import sys
+
+from json_schema_validator.cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,621 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Validation in :mod:`asyncio` applications.
+
+:func:`validate_async` validates a document a slice at a time and gives
+control back to the event loop between slices, so that validating a large
+document does not delay the other tasks of the loop for long.
+
+:class:`ValidationStage` is a pipeline stage that decodes and validates a
+stream of JSON messages in an executor, in batches.
+
+This module requires Python 3.6 or later.
+"""
+
+import asyncio
+import itertools
+import time
+
+from json_schema_validator import backend
+from json_schema_validator.compiled import CompiledValidator
+from json_schema_validator.errors import (
+    LimitExceeded,
+    SchemaError,
+    ValidationError,
+)
+from json_schema_validator.misc import ARRAY_TYPES, ITERATOR_TYPES
+from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import _uses_requires
+from json_schema_validator.validator import Validator, basestring
+
+
+# Number of milliseconds spent validating before giving control back
+BUDGET_MS = 5
+
+# Number of values validated between two looks at the clock
+CHECK_INTERVAL = 32
+
+# Number of values validated in the event loop before the rest of the
+# document is validated by the executor, if any
+OFFLOAD_THRESHOLD = 10000
+
+# Marks the end of the messages in the queues of a ValidationStage
+_END = object()
+
+
+def _requires_grandparent(schema_json):
+    """
+    Check if a schema, or a nested type schema, requires a schema that uses
+    requires, and so looks at the object enclosing the enclosing object.
+    """
+    if not isinstance(schema_json, dict):
+        return False
+    requires_json = schema_json.get("requires")
+    if isinstance(requires_json, dict) and _uses_requires(requires_json):
+        return True
+    json_type = schema_json.get("type")
+    if isinstance(json_type, list):
+        return any(_requires_grandparent(item) for item in json_type)
+    return _requires_grandparent(json_type)
+
+
+class _Children(object):
+    """
+    Values of the current object or array of a validator.
+
+    Values are numbered in the order they are validated: the properties of
+    the schema, then the additional properties of an object (a single check
+    if they are not allowed), or the items of an array.
+    """
+
+    def __init__(self, context):
+        obj = context._object
+        schema = context._schema
+        self.properties = self.keys = None
+        self.schemas = []
+        if isinstance(obj, dict):
+            self.properties = list(schema.properties.keys())
+            self.schemas.extend(schema.properties.values())
+            if schema.additionalProperties is False:
+                self.count = len(self.properties) + 1
+            else:
+                self.keys = list(obj.keys())
+                self.count = len(self.properties) + len(self.keys)
+                self.schemas.append(schema.additionalProperties)
+        else:
+            self.items = schema.items
+            if isinstance(self.items, dict):
+                self.count = len(obj)
+                self.schemas.append(self.items)
+            elif isinstance(self.items, list):
+                self.count = max(len(obj), len(self.items))
+                self.schemas.extend(self.items)
+                self.schemas.append(schema.additionalProperties)
+            else:
+                self.count = 0
+
+    def can_offload(self):
+        """
+        Check if the values can be validated without the objects enclosing
+        the current object.
+        """
+        return not any(
+            _requires_grandparent(schema_json)
+            for schema_json in self.schemas)
+
+    def walk(self, context, position, walker):
+        """
+        Validate the value at position.
+
+        :param walker:
+            :class:`_Walker` to walk the value with, or None to validate it
+            at once
+        :returns:
+            A generator, see :meth:`_Walker.walk`
+        """
+        if self.properties is None:
+            items = self.items
+            if isinstance(items, dict):
+                context._push_array_schema()
+            elif position < len(items):
+                context._push_schema(
+                    Schema(items[position]), "items[%d]" % position)
+            else:
+                context._push_schema(
+                    Schema(context._schema.additionalProperties),
+                    ".additionalProperties")
+            context._push_array_item_object(position)
+            yield from self._walk_value(context, walker)
+            context._pop_object()
+            context._pop_schema()
+        elif position < len(self.properties):
+            prop = self.properties[position]
+            context._push_property_schema(prop)
+            if prop in context._object:
+                context._push_property_object(prop)
+                yield from self._walk_value(context, walker)
+                context._pop_object()
+            else:
+                context._validate_missing_property(prop)
+            context._pop_schema()
+        elif self.keys is None:
+            context._validate_additional_properties()
+        else:
+            prop = self.keys[position - len(self.properties)]
+            context._push_additional_property_schema()
+            context._push_property_object(prop)
+            yield from self._walk_value(context, walker)
+            context._pop_object()
+            context._pop_schema()
+
+    def _walk_value(self, context, walker):
+        if walker is None:
+            context._validate()
+        else:
+            yield from walker.walk(context)
+
+
+class _Offload(object):
+    """
+    Request to validate the rest of an object or array with an executor.
+
+    :attr:`result` is set to the result of :func:`_validate_children`, or to
+    (exc, [], []) if the executor raised exc.
+    """
+
+    def __init__(self, context, start):
+        stack = context._object_stack
+        # Only the object or array itself is sent to the executor
+        self.args = (
+            type(context), list(context._schema_stack),
+            [(None, path) for obj, path in stack[:-1]] + stack[-1:], start)
+        self.result = None
+
+
+def _validate_children(validator_class, schema_stack, object_stack, start):
+    """
+    Validate the values of an object or array from position start on, in an
+    executor.
+
+    The stacks are those of the validator that walked the document, see
+    :class:`_Offload`.
+
+    :returns:
+        None if the values are valid. Otherwise a tuple (exc, schemas,
+        objects) where exc is the
+        :class:`json_schema_validator.errors.ValidationError` and schemas and
+        objects are the entries that the validation left on top of the
+        stacks, as ``Validator._validate()`` does when it fails.
+    """
+    context = validator_class()
+    context._schema_stack = list(schema_stack)
+    context._object_stack = list(object_stack)
+    children = _Children(context)
+    try:
+        for position in range(start, children.count):
+            for step in children.walk(context, position, None):
+                pass
+    except ValidationError as exc:
+        return (exc, context._schema_stack[len(schema_stack):],
+                context._object_stack[len(object_stack):])
+
+
+class _Walker(object):
+    """
+    Validator of a document one value at a time.
+
+    The checks are those of ``Validator._validate()``, in the same order, but
+    every object and array is walked into, including those checked against
+    alternative types, nested types or the schema of requires.
+
+    Once :attr:`offload` is set, the rest of each object and array being
+    walked is requested from the executor, by yielding an :class:`_Offload`.
+    Its result must be set before resuming the walk.
+    """
+
+    def __init__(self):
+        self.offload = False
+
+    def walk(self, context):
+        """
+        Validate the current object of context.
+
+        :returns:
+            A generator that yields None after each value and
+            :class:`_Offload` requests
+        """
+        obj = context._object
+        schema = context._schema
+        # Other values are validated at once, like a whole document that is
+        # an iterator, which is not read ahead (see Validator._validate())
+        nested_iterator = (
+            isinstance(obj, ITERATOR_TYPES)
+            and len(context._object_stack) > 1)
+        requires_schema = (
+            isinstance(schema.requires, dict) and schema.requires != {})
+        if isinstance(obj, (dict, list)) or nested_iterator \
+                or not isinstance(schema.type, basestring) \
+                or requires_schema:
+            yield from self._walk(context)
+        else:
+            context._validate()
+        yield
+
+    def _walk(self, context):
+        obj = context._object
+        schema = context._schema
+        if isinstance(obj, ITERATOR_TYPES):
+            obj = context._unpack_array_object()
+        yield from self._walk_type(context)
+        yield from self._walk_requires(context)
+        if isinstance(obj, dict):
+            yield from self._walk_children(context)
+        elif isinstance(obj, list):
+            if schema.items != {}:
+                context._validate_unique_items()
+                context._validate_item_count(len(obj))
+                if isinstance(schema.items, list):
+                    context._validate_tuple_length(len(obj))
+                yield from self._walk_children(context)
+        elif isinstance(obj, ARRAY_TYPES):
+            context._validate_items()
+        else:
+            context._validate_scalar()
+        context._report_unsupported()
+
+    def _walk_type(self, context):
+        json_type = context._schema.type
+        if isinstance(json_type, dict):
+            context._push_schema(Schema(json_type), ".type")
+            yield from self.walk(context)
+            context._pop_schema()
+        elif isinstance(json_type, list) and json_type:
+            for index, alternative in enumerate(json_type):
+                context._push_schema(
+                    Schema({'type': alternative}), ".type.%d" % index)
+                try:
+                    yield from self.walk(context)
+                except LimitExceeded:
+                    raise
+                except ValidationError:
+                    pass
+                else:
+                    break
+                finally:
+                    context._pop_schema()
+            else:
+                context._report_type_alternatives(json_type)
+        else:
+            context._validate_type()
+
+    def _walk_requires(self, context):
+        requires_json = context._schema.requires
+        if isinstance(requires_json, dict) and requires_json \
+                and len(context._object_stack) > 1:
+            sub_validator = context._get_requires_validator(requires_json)
+            context._share_limits(sub_validator)
+            try:
+                yield from self.walk(sub_validator)
+            finally:
+                sub_validator._share_limits(context)
+        else:
+            context._validate_requires()
+
+    def _walk_children(self, context):
+        children = _Children(context)
+        for position in range(children.count):
+            if self.offload and children.can_offload():
+                request = _Offload(context, position)
+                yield request
+                if request.result is not None:
+                    exc, schemas, objects = request.result
+                    context._schema_stack.extend(schemas)
+                    context._object_stack.extend(objects)
+                    raise exc
+                return
+            yield from children.walk(context, position, self)
+
+
+async def validate_async(schema, obj, budget_ms=BUDGET_MS, executor=None,
+                         offload_threshold=OFFLOAD_THRESHOLD,
+                         validator_class=Validator):
+    """
+    Validate specified JSON object obj without blocking the event loop.
+
+    The document is validated in slices of about budget_ms milliseconds.
+    Control goes back to the event loop after each slice. Every object and
+    array is walked one value at a time, including those checked against
+    alternative types or the schema of requires. The result and the
+    errors are the same as those of ``validator_class.validate(schema,
+    obj)``.
+
+    :param schema:
+        Schema to validate against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param obj:
+        JSON object to validate
+    :param budget_ms:
+        Number of milliseconds to spend validating before giving control
+        back to the event loop
+    :param executor:
+        :class:`concurrent.futures.Executor` to validate large documents
+        with, or None to validate every document in the event loop. With a
+        process executor, schema, obj and validator_class must be picklable.
+    :param offload_threshold:
+        Number of values validated in the event loop before the rest of a
+        large document is validated with executor. The values of each object
+        and array being walked that are left are validated by a single call
+        to executor, innermost first. Values that were validated already are
+        not validated again.
+    :param validator_class:
+        Class of the validator to use
+    :returns:
+        True on success
+    :raises `json_schema_validator.errors.ValidationError`:
+        if the object does not match schema.
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    if not isinstance(schema, Schema):
+        raise ValueError(
+            "schema value {0!r} is not a Schema"
+            " object".format(schema))
+    context = validator_class()
+    context._object_stack = []
+    context._schema_stack = []
+    context._push_schema(schema, "schema")
+    context._push_object(obj, "object")
+    walker = _Walker()
+    loop = asyncio.get_event_loop()
+    budget = budget_ms / 1000.0
+    deadline = time.monotonic() + budget
+    count = 0
+    for step in walker.walk(context):
+        if step is not None:
+            try:
+                step.result = await loop.run_in_executor(
+                    executor, _validate_children, *step.args)
+            except Exception as exc:
+                step.result = (exc, [], [])
+            continue
+        count += 1
+        if executor is not None and count >= offload_threshold:
+            walker.offload = True
+        if count % CHECK_INTERVAL == 0 and time.monotonic() >= deadline:
+            await asyncio.sleep(0)
+            deadline = time.monotonic() + budget
+    return True
+
+
+def _validate_batch(validator, deserializer, messages):
+    """
+    Decode and validate a batch of messages, in an executor.
+
+    The compiled validator is only compiled once by each process of a process
+    executor, see :mod:`json_schema_validator.compiled`.
+
+    :returns:
+        A list of (obj, error) tuples, one for each message. Any exception
+        raised for a message, other than a
+        :class:`json_schema_validator.errors.SchemaError`, is the error of
+        that message only.
+    """
+    results = []
+    for message in messages:
+        try:
+            obj = deserializer(message)
+            validator.validate(obj)
+        except SchemaError:
+            raise
+        except Exception as exc:
+            results.append((None, exc))
+        else:
+            results.append((obj, None))
+    return results
+
+
+class _Latency(object):
+    """Accumulated latency of a stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds, count=1):
+        self.count += count
+        self.total += seconds * count
+        self.max = max(self.max, seconds)
+
+    def get_stats(self):
+        return {
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class ValidationStage(object):
+    """
+    Pipeline stage that validates a stream of JSON messages.
+
+    Messages are read from an asynchronous iterable into a bounded input
+    queue. Workers take batches of messages from that queue, decode and
+    validate them in an executor and put the results into a bounded output
+    queue, from which they are produced. A slow consumer thus stops the
+    workers, which stop the reading of messages.
+
+    Messages are validated with a
+    :class:`json_schema_validator.compiled.CompiledValidator`, made once per
+    process of the executor.
+
+    :param schema:
+        Schema to validate each message against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param workers:
+        Number of batches validated at the same time
+    :param executor:
+        :class:`concurrent.futures.ThreadPoolExecutor` or
+        :class:`concurrent.futures.ProcessPoolExecutor` to validate with, the
+        default executor of the event loop if None
+    :param batch_size:
+        Maximum number of messages validated by a single call to the executor.
+        Workers take the messages that are waiting in the input queue, up to
+        that number.
+    :param queue_size:
+        Maximum number of messages in each of the input and output queues
+    :param deserializer:
+        Function to convert messages to JSON objects. It has to be picklable
+        with a process executor.
+    """
+
+    def __init__(self, schema, workers=4, executor=None, batch_size=64,
+                 queue_size=1024, deserializer=backend.loads):
+        if not isinstance(schema, Schema):
+            raise ValueError(
+                "schema value {0!r} is not a Schema"
+                " object".format(schema))
+        self.schema = schema
+        self.workers = workers
+        self.executor = executor
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.deserializer = deserializer
+        self._validator = CompiledValidator(schema)
+        self._input = self._output = None
+        self._received = self._invalid = self._batches = 0
+        self._queue_latency = _Latency()
+        self._validation_latency = _Latency()
+        self._output_latency = _Latency()
+
+    def get_stats(self):
+        """
+        Get statistics about the messages processed so far.
+
+        :returns:
+            A dictionary with the number of messages ``"received"``, of
+            ``"invalid"`` messages and of ``"batches"``, the current depth of
+            the ``"input_queue"`` and of the ``"output_queue"`` and the
+            ``"mean"`` and ``"max"`` latency, in seconds, of the three stages
+            a message goes through: waiting in the input queue
+            (``"queue_latency"``), being decoded and validated
+            (``"validation_latency"``) and waiting in the output queue
+            (``"output_latency"``).
+        """
+        return {
+            "received": self._received,
+            "invalid": self._invalid,
+            "batches": self._batches,
+            "input_queue": self._input.qsize() if self._input else 0,
+            "output_queue": self._output.qsize() if self._output else 0,
+            "queue_latency": self._queue_latency.get_stats(),
+            "validation_latency": self._validation_latency.get_stats(),
+            "output_latency": self._output_latency.get_stats(),
+        }
+
+    async def process(self, messages):
+        """
+        Validate messages.
+
+        :param messages:
+            Asynchronous iterable of JSON texts, as :class:`str` or as UTF-8
+            encoded :class:`bytes`
+        :returns:
+            An asynchronous generator of (index, obj, error) tuples, one for
+            each message, where index is the position of the message in
+            messages. obj is the decoded message if it is valid and None
+            otherwise. error is the
+            :class:`json_schema_validator.errors.ValidationError`, the
+            :class:`ValueError` for messages that are not valid JSON, any
+            other exception raised while decoding or validating the message,
+            or None.
+            Results come out as batches complete, so not necessarily in the
+            order of the messages.
+        :raises `json_schema_validator.errors.SchemaError`:
+            if the schema itself is wrong.
+        """
+        self._input = asyncio.Queue(self.queue_size)
+        self._output = asyncio.Queue(self.queue_size)
+        tasks = [asyncio.ensure_future(self._read(messages))]
+        tasks.extend(
+            asyncio.ensure_future(self._work())
+            for i in range(self.workers))
+        done = asyncio.ensure_future(self._finish(tasks))
+        try:
+            while True:
+                item = await self._output.get()
+                if item is _END:
+                    break
+                index, obj, error, put_time = item
+                self._output_latency.add(time.monotonic() - put_time)
+                yield index, obj, error
+            await done
+        finally:
+            for task in tasks + [done]:
+                task.cancel()
+
+    async def _read(self, messages):
+        index = itertools.count()
+        async for message in messages:
+            await self._input.put((next(index), message, time.monotonic()))
+            self._received += 1
+        for i in range(self.workers):
+            await self._input.put(_END)
+
+    async def _work(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            item = await self._input.get()
+            if item is _END:
+                return
+            batch = [item]
+            end = False
+            while len(batch) < self.batch_size and not self._input.empty():
+                item = self._input.get_nowait()
+                if item is _END:
+                    end = True
+                    break
+                batch.append(item)
+            started = time.monotonic()
+            for index, message, put_time in batch:
+                self._queue_latency.add(started - put_time)
+            results = await loop.run_in_executor(
+                self.executor, _validate_batch, self._validator,
+                self.deserializer, [message for index, message, t in batch])
+            finished = time.monotonic()
+            self._validation_latency.add(finished - started, len(batch))
+            self._batches += 1
+            for (index, message, put_time), (obj, error) in zip(
+                    batch, results):
+                if error is not None:
+                    self._invalid += 1
+                await self._output.put((index, obj, error, finished))
+            if end:
+                return
+
+    async def _finish(self, tasks):
+        """Wait for the reader and the workers and end the output."""
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # Errors are raised by "await done" in process()
+            await self._output.put(_END)
@@ -0,0 +1,174 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Fastest available JSON decoder.
+
+:func:`loads` uses the first of orjson_, ujson_, simplejson_ and :mod:`json`
+that can be imported. Whatever the backend, it accepts the same input and
+returns the same objects as :func:`json.loads`:
+
+- the text may be a :class:`str`, or UTF-8 encoded :class:`bytes`,
+  :class:`bytearray` or :class:`memoryview`,
+- text that the fast backends reject, such as the ``NaN`` and ``Infinity``
+  constants, is decoded again with simplejson or json, which also report the
+  errors,
+- text with long runs of digits, that may be integers that do not fit in 64
+  bits, is decoded with simplejson or json.
+
+.. _orjson: https://pypi.org/project/orjson/
+.. _ujson: https://pypi.org/project/ujson/
+.. _simplejson: https://pypi.org/project/simplejson/
+"""
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+_text_type = type(u"")
+
+# Maps digits to "0" and other bytes to " "
+_DIGITS_TABLE = bytes(bytearray(
+    0x30 if 0x30 <= byte <= 0x39 else 0x20 for byte in range(256)))
+
+# Digits of integers that may not fit in 64 bits. The fast backends turn
+# those into floats or reject them.
+_LONG_DIGITS = b"0" * 19
+
+
+def _json_loads(data):
+    if isinstance(data, _text_type):
+        return json.loads(data)
+    # Not every version of json accepts bytes
+    return json.loads(bytes(data).decode("utf-8"))
+
+
+def _has_long_digits(data):
+    if isinstance(data, _text_type):
+        data = data.encode("utf-8", "surrogatepass")
+    elif isinstance(data, memoryview):
+        data = data.tobytes()
+    # Much faster than searching for a regular expression
+    return _LONG_DIGITS in data.translate(_DIGITS_TABLE)
+
+
+def _orjson_loads(data):
+    if not _has_long_digits(data):
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return _json_loads(data)
+
+
+def _ujson_loads(data):
+    if not isinstance(data, (bytes, _text_type)):
+        data = bytes(data)
+    if not _has_long_digits(data):
+        try:
+            return ujson.loads(data)
+        except (ValueError, OverflowError):
+            pass
+    return _json_loads(data)
+
+
+# Maximum number of keys interned by make_interning_loads()
+INTERN_LIMIT = 10000
+
+
+# Name of the backend used by loads()
+if orjson is not None:
+    name = "orjson"
+    _loads = _orjson_loads
+elif ujson is not None:
+    name = "ujson"
+    _loads = _ujson_loads
+else:
+    name = json.__name__
+    _loads = _json_loads
+
+
+def loads(data):
+    """
+    Convert JSON text to a JSON object.
+
+    :param data:
+        JSON text, as :class:`str` or as UTF-8 encoded :class:`bytes`,
+        :class:`bytearray` or :class:`memoryview`
+    :returns:
+        The JSON object
+    :raises ValueError:
+        if data is not valid JSON
+    """
+    return _loads(data)
+
+
+def make_interning_loads(names=(), limit=INTERN_LIMIT):
+    """
+    Make a function like :func:`loads` that interns the keys of objects.
+
+    Objects decoded by the function share a single string object for each
+    key. This saves memory when many similar objects are decoded, one at a
+    time or not. Strings passed in names are used as they are, so keys that
+    are also schema property names are the very same objects as those in the
+    schema, which makes looking them up faster.
+
+    Keys are decoded with simplejson or json whatever the backend of
+    :func:`loads` is.
+
+    :param names:
+        Iterable of the strings to use for keys
+    :param limit:
+        Maximum number of keys to intern. Other keys are not shared.
+    :returns:
+        A function that behaves like :func:`loads`
+    """
+    table = dict((name, name) for name in names)
+    get = table.get
+
+    def object_pairs_hook(pairs):
+        obj = {}
+        for key, value in pairs:
+            interned = get(key)
+            if interned is None:
+                if len(table) < limit:
+                    table[key] = key
+                interned = key
+            obj[interned] = value
+        return obj
+
+    decode = json.JSONDecoder(object_pairs_hook=object_pairs_hook).decode
+
+    def interning_loads(data):
+        if not isinstance(data, _text_type):
+            data = bytes(data).decode("utf-8")
+        return decode(data)
+    return interning_loads
@@ -0,0 +1,377 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Bulk validation of JSON Lines files.
+
+A JSON Lines (NDJSON) file holds one JSON document per line. The functions in
+this module validate each line of such a file against a single schema.
+
+Files are memory-mapped and processed in blocks of whole lines. Each block is
+decoded once and the documents are parsed straight out of the decoded text,
+so lines are not copied one by one. Compressed files (see
+:mod:`json_schema_validator.compression`) are decompressed on the fly instead.
+With
+:class:`json_schema_validator.columnar.ColumnarValidator` (the default) the
+documents of a block are then checked together, one property at a time, and
+only the documents that fail are validated again to report the error.
+"""
+
+import mmap
+import operator
+import os
+import re
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from json_schema_validator import compression
+from json_schema_validator.columnar import ColumnarValidator, find_invalid_row
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.misc import get_schema_fingerprint
+from json_schema_validator.schema import Schema
+
+
+# Approximate number of bytes processed at a time
+BLOCK_SIZE = 1 << 20
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iter_blocks(buf, start=0, block_size=BLOCK_SIZE):
+    """
+    Split buf into blocks of whole lines.
+
+    Blocks are about block_size bytes long, unless a single line is longer.
+
+    :param buf:
+        :class:`bytes` or :class:`mmap.mmap` object to split
+    :param start:
+        Offset in buf of the first line
+    :returns:
+        A generator of tuples (offset, block) where block is a copy of the
+        lines that start at offset in buf.
+    """
+    for start, end in iter_block_ranges(buf, start, block_size):
+        yield start, buf[start:end]
+
+
+def iter_block_ranges(buf, start=0, block_size=BLOCK_SIZE):
+    """
+    Split buf into ranges of whole lines, without copying it.
+
+    :returns:
+        A generator of tuples (start, end) with the offsets of the blocks that
+        :func:`iter_blocks` would produce.
+    """
+    size = len(buf)
+    while start < size:
+        end = buf.rfind(b"\n", start, start + block_size)
+        if end == -1:
+            end = buf.find(b"\n", start + block_size)
+        end = size if end == -1 else end + 1
+        yield start, end
+        start = end
+
+
+def iter_stream_blocks(fp, start=0, block_size=BLOCK_SIZE):
+    """
+    Read blocks of whole lines from a file object.
+
+    :param fp:
+        Binary file object to read from
+    :param start:
+        Offset of the first byte read from fp
+    :returns:
+        Same as :func:`iter_blocks`
+    """
+    offset = start
+    rest = b""
+    while True:
+        data = fp.read(block_size)
+        if not data:
+            if rest:
+                yield offset, rest
+            return
+        if rest:
+            data = rest + data
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            rest = data
+            continue
+        if end == len(data):
+            rest = b""
+        else:
+            rest = data[end:]
+            data = data[:end]
+        yield offset, data
+        offset += end
+
+
+def _iter_documents(block, decoder):
+    """
+    Parse the lines of a block.
+
+    :returns:
+        A generator of tuples (offset, obj, error) where offset is the offset
+        of the line in block. Either obj is the parsed document or error is
+        the :class:`ValueError` raised while parsing it. Blank lines are
+        skipped.
+    """
+    try:
+        text = block.decode("utf-8")
+    except UnicodeDecodeError:
+        text = None
+    # Offsets in text are offsets in block when every character is a byte
+    ascii = text is not None and len(text) == len(block)
+    size = len(block)
+    pos = 0
+    while pos < size:
+        end = block.find(b"\n", pos)
+        if end == -1:
+            end = size
+        offset = pos
+        pos = end + 1
+        if ascii:
+            line, start, stop = text, offset, end
+        else:
+            try:
+                line = block[offset:end].decode("utf-8")
+            except UnicodeDecodeError as exc:
+                yield offset, None, exc
+                continue
+            start, stop = 0, len(line)
+        start = WHITESPACE.match(line, start, stop).end()
+        if start == stop:
+            continue
+        try:
+            obj, obj_end = decoder.raw_decode(line, start)
+        except ValueError as exc:
+            yield offset, None, exc
+            continue
+        if obj_end > stop or WHITESPACE.match(
+                line, obj_end, stop).end() != stop:
+            yield offset, None, ValueError(
+                "Line is not a single JSON document")
+            continue
+        yield offset, obj, None
+
+
+def _find_invalid_rows(schema, rows, validator):
+    """
+    Validate a list of documents.
+
+    :returns:
+        A generator of tuples (index, error) for each invalid document.
+    """
+    start = 0
+    if isinstance(validator, ColumnarValidator) and \
+            len(rows) >= validator.columnar_threshold:
+        index = find_invalid_row(rows, schema)
+        if index is None:
+            return
+        if index is not NotImplemented:
+            # Rows before the first invalid one are valid. The columnar
+            # check is not run again on the rest, that would be quadratic
+            # in the number of invalid rows.
+            start = index
+    for index in range(start, len(rows)):
+        try:
+            validator.validate_toplevel(schema, rows[index])
+        except ValidationError as exc:
+            yield index, exc
+
+
+def validate_blocks(schema, blocks, validator_class=ColumnarValidator,
+                    line_no=1, checkpoint=None, error_count=0):
+    """
+    Validate each line of blocks of JSON Lines text.
+
+    :param schema:
+        Schema to validate each line against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param blocks:
+        Iterable of tuples (offset, block) as produced by :func:`iter_blocks`
+        or :func:`iter_stream_blocks`
+    :param validator_class:
+        Class of the validator to use
+    :param line_no:
+        Number of the first line of the first block
+    :param checkpoint:
+        :class:`json_schema_validator.checkpoint.Checkpoint` where the
+        progress is saved, between two blocks, once the errors of the blocks
+        before have been consumed. The progress holds the offset and the line
+        number of the next block and the number of errors reported so far
+        (``"offset"``, ``"line_no"`` and ``"error_count"``).
+    :param error_count:
+        Number of errors reported before the first block
+    :returns:
+        Same as :func:`validate_lines`
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    if not isinstance(schema, Schema):
+        raise ValueError(
+            "schema value {0!r} is not a Schema"
+            " object".format(schema))
+    validator = validator_class()
+    decoder = json.JSONDecoder()
+    next_save = None
+    for offset, block in blocks:
+        if checkpoint is not None:
+            if next_save is None:
+                next_save = offset + checkpoint.interval
+            elif offset >= next_save:
+                checkpoint.save({
+                    "offset": offset,
+                    "line_no": line_no,
+                    "error_count": error_count,
+                })
+                next_save = offset + checkpoint.interval
+        offsets = []
+        rows = []
+        errors = []
+        for line_offset, obj, error in _iter_documents(block, decoder):
+            if error is None:
+                offsets.append(line_offset)
+                rows.append(obj)
+            else:
+                errors.append((line_offset, error))
+        for index, error in _find_invalid_rows(schema, rows, validator):
+            errors.append((offsets[index], error))
+        errors.sort(key=operator.itemgetter(0))
+        error_count += len(errors)
+        for line_offset, error in errors:
+            yield (line_no + block.count(b"\n", 0, line_offset),
+                   offset + line_offset, error)
+        line_no += block.count(b"\n")
+
+
+def validate_buffer(schema, buf, validator_class=ColumnarValidator,
+                    block_size=BLOCK_SIZE):
+    """
+    Validate each line of JSON Lines text held in memory.
+
+    :param schema:
+        Schema to validate each line against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param buf:
+        :class:`bytes` or :class:`mmap.mmap` object with UTF-8 encoded text
+    :param validator_class:
+        Class of the validator to use
+    :param block_size:
+        Approximate number of bytes to process at a time
+    :returns:
+        Same as :func:`validate_lines`
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    return validate_blocks(
+        schema, iter_blocks(buf, 0, block_size), validator_class)
+
+
+def validate_lines(schema, path, validator_class=ColumnarValidator,
+                   block_size=BLOCK_SIZE, checkpoint=None):
+    """
+    Validate each line of a JSON Lines file.
+
+    :param schema:
+        Schema to validate each line against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param path:
+        Path of the file, the text must be encoded as UTF-8. The file may be
+        compressed with gzip, bzip2 or xz.
+    :param validator_class:
+        Class of the validator to use
+    :param block_size:
+        Approximate number of bytes to process at a time
+    :param checkpoint:
+        :class:`json_schema_validator.checkpoint.Checkpoint` making the job
+        resumable. The progress is saved about every ``checkpoint.interval``
+        bytes (see :func:`validate_blocks`). A job started again with the same
+        checkpoint, file and schema skips the lines that were already
+        validated and reports the remaining errors. The ``"error_count"`` of
+        the progress returned by ``checkpoint.resume()`` tells how many errors
+        were reported before, so that the error output can be truncated to
+        match. The state file is removed when the whole file is validated.
+    :returns:
+        A generator of tuples (line_no, byte_offset, error) for each invalid
+        line. line_no starts at 1 and byte_offset is the offset of the start
+        of the line, in the decompressed text if the file is compressed.
+        error is the
+        :class:`json_schema_validator.errors.ValidationError` or, for lines
+        that are not valid JSON, the :class:`ValueError` describing the
+        problem. Blank lines are ignored.
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    :raises ValueError:
+        if the checkpoint belongs to another job.
+    """
+    start, line_no, error_count = 0, 1, 0
+    if checkpoint is not None:
+        progress = checkpoint.resume(_get_job(schema, path))
+        if progress is not None:
+            start = progress["offset"]
+            line_no = progress["line_no"]
+            error_count = progress["error_count"]
+    with open(path, "rb") as stream:
+        kind = compression.detect_compression(
+            stream.read(compression.MAGIC_SIZE))
+        stream.seek(0)
+        if kind is not None:
+            with compression.open_decompressed(stream) as reader:
+                # Offsets are offsets in the decompressed text
+                reader.skip(start)
+                for result in validate_blocks(
+                        schema, iter_stream_blocks(reader, start, block_size),
+                        validator_class, line_no, checkpoint, error_count):
+                    yield result
+        else:
+            try:
+                buf = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                buf = b""
+            try:
+                for result in validate_blocks(
+                        schema, iter_blocks(buf, start, block_size),
+                        validator_class, line_no, checkpoint, error_count):
+                    yield result
+            finally:
+                if buf:
+                    buf.close()
+    if checkpoint is not None:
+        checkpoint.clear()
+
+
+def _get_job(schema, path):
+    """Identify a job of :func:`validate_lines` for its checkpoint."""
+    stat = os.stat(path)
+    return {
+        "kind": "lines",
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "schema": get_schema_fingerprint(schema),
+    }
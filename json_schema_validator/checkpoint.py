@@ -0,0 +1,123 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Checkpoints of long validation jobs.
+
+A :class:`Checkpoint` is a small state file where a job records its progress
+at regular intervals. When the job is started again with the same checkpoint
+it resumes from the last recorded progress and produces the same results as
+an uninterrupted run. The state file is removed once the job completes.
+
+See :func:`json_schema_validator.bulk.validate_lines` and
+:meth:`json_schema_validator.streaming.StreamingValidator.validate`.
+"""
+
+import json
+import os
+
+
+# Default number of input bytes between two checkpoints
+INTERVAL = 64 << 20
+
+# Version of the format of state files
+VERSION = 1
+
+_replace = getattr(os, "replace", os.rename)
+
+
+class Checkpoint(object):
+    """
+    State file of a resumable validation job.
+
+    :param path:
+        Path of the state file
+    :param interval:
+        Number of input bytes to process between two saves
+    """
+
+    def __init__(self, path, interval=INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._job = None
+
+    def load(self):
+        """
+        Load the state file.
+
+        :returns:
+            The saved state or None if there is no state file.
+        """
+        try:
+            stream = open(self.path, "r")
+        except IOError as exc:
+            if not os.path.exists(self.path):
+                return
+            raise exc
+        with stream:
+            state = json.load(stream)
+        if state.get("version") != VERSION:
+            raise ValueError(
+                "Unsupported checkpoint version {0!r}".format(
+                    state.get("version")))
+        return state
+
+    def resume(self, job):
+        """
+        Start or resume a job.
+
+        :param job:
+            JSON object identifying the job (its kind, input and schema)
+        :returns:
+            The progress saved by the interrupted job or None if the job
+            starts from the beginning.
+        :raises ValueError:
+            if the state file belongs to another job.
+        """
+        self._job = job
+        state = self.load()
+        if state is None:
+            return
+        if state["job"] != job:
+            raise ValueError(
+                "Checkpoint {0!r} belongs to another job".format(self.path))
+        return state["progress"]
+
+    def save(self, progress):
+        """
+        Save the progress of the job.
+
+        The state file is replaced atomically, an interrupted save leaves the
+        previous state intact.
+
+        :param progress:
+            JSON object describing the progress
+        """
+        state = {"version": VERSION, "job": self._job, "progress": progress}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as stream:
+            json.dump(state, stream)
+            stream.flush()
+            os.fsync(stream.fileno())
+        _replace(temp_path, self.path)
+
+    def clear(self):
+        """Remove the state file of a completed job."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
@@ -0,0 +1,456 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Command line validator.
+
+Validates JSON files and JSON Lines (NDJSON) files against a schema, with a
+pool of worker processes::
+
+    json-schema-validator SCHEMA PATH... [--workers N] [--fail-fast]
+        [--format text|json] [--quarantine FILE] [--summary]
+
+The same program is run by ``python -m json_schema_validator``. Each PATH is
+a file, a directory searched recursively for ``.json``, ``.jsonl`` and
+``.ndjson`` files (possibly compressed), a glob pattern or ``-`` for JSON
+Lines read from the standard input. Files named ``*.jsonl`` or ``*.ndjson``,
+and all files with ``--lines``, hold one document per line. Other files hold
+a single document. Files that cannot be read, and glob patterns that match
+nothing, are reported like invalid documents.
+
+Files are validated in parallel, and large uncompressed JSON Lines files are
+split in blocks of lines validated in parallel too. Errors are printed to the
+standard output in the order of the input, the summary to the standard
+error. The exit status is 0 if every document is valid, 1 otherwise and 2
+for usage errors and problems with the schema.
+"""
+
+import argparse
+import fnmatch
+import glob
+import json
+import mmap
+import multiprocessing
+import os
+import sys
+import timeit
+
+from json_schema_validator import bulk, compression, parallel
+from json_schema_validator import backend
+from json_schema_validator.bulk import BLOCK_SIZE
+from json_schema_validator.compiled import CompiledValidator
+from json_schema_validator.errors import SchemaError, ValidationError
+from json_schema_validator.schema import Schema
+
+
+# Patterns of names of the files found in directories
+PATTERNS = ("*.json", "*.jsonl", "*.ndjson")
+
+# Patterns of names of JSON Lines files
+LINES_PATTERNS = ("*.jsonl", "*.ndjson")
+
+# Extensions of compressed files
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".xz")
+
+# Number of tasks per worker sent ahead of the results
+TASKS_AHEAD = 4
+
+STDIN = "-"
+
+
+class _Job(object):
+    """Validation done by the workers."""
+
+    def __init__(self, schema, files, keep_records):
+        self.schema = schema
+        self.validator = CompiledValidator(schema)
+        self.files = files
+        self.keep_records = keep_records
+
+
+def _make_job(schema_json, files, keep_records):
+    return _Job(Schema(schema_json), files, keep_records)
+
+
+def _strip_compression(name):
+    base, ext = os.path.splitext(name)
+    if ext in COMPRESSED_EXTENSIONS:
+        return base
+    return name
+
+
+def _is_lines_file(path):
+    name = _strip_compression(os.path.basename(path))
+    return any(fnmatch.fnmatch(name, pattern) for pattern in LINES_PATTERNS)
+
+
+def find_files(paths):
+    """
+    Find the files to validate.
+
+    :param paths:
+        Files, directories, glob patterns or ``-``
+    :returns:
+        A generator of paths of files, in the order of paths. The files of
+        directories are sorted. Glob patterns that match nothing are
+        generated as they are, to be reported as missing files.
+    """
+    for path in paths:
+        if path != STDIN and not os.path.exists(path) and \
+                glob.has_magic(path):
+            matches = sorted(glob.glob(path))
+            if not matches:
+                yield path
+            for match in matches:
+                for found in find_files([match]):
+                    yield found
+        elif os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    base = _strip_compression(name)
+                    if any(fnmatch.fnmatch(base, pattern)
+                           for pattern in PATTERNS):
+                        yield os.path.join(dirpath, name)
+        else:
+            yield path
+
+
+def _read_file(path):
+    """Read a whole file, decompressing it if needed."""
+    with open(path, "rb") as stream:
+        with compression.open_decompressed(stream) as reader:
+            return reader.read()
+
+
+def _is_compressed(path):
+    with open(path, "rb") as stream:
+        return compression.detect_compression(
+            stream.read(compression.MAGIC_SIZE)) is not None
+
+
+def _iter_tasks(files, lines, block_size):
+    """
+    Split the validation of files into tasks.
+
+    A task is a tuple (file index, lines, start, end). Uncompressed JSON
+    Lines files are split into ranges of whole lines from start to end,
+    other files are validated as a whole (start and end are None), as are
+    files that cannot be read, whose error is reported by :func:`_run_task`.
+    """
+    for file_index, path in enumerate(files):
+        is_lines = lines or path == STDIN or _is_lines_file(path)
+        try:
+            if not is_lines or path == STDIN or _is_compressed(path):
+                yield file_index, is_lines, None, None
+                continue
+            stream = open(path, "rb")
+        except (IOError, OSError):
+            yield file_index, is_lines, None, None
+            continue
+        with stream:
+            try:
+                buf = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                continue
+            try:
+                for start, end in bulk.iter_block_ranges(buf, 0, block_size):
+                    yield file_index, True, start, end
+            finally:
+                buf.close()
+
+
+def _validate_block(job, block, offset):
+    """
+    Validate a block of lines.
+
+    :returns:
+        A tuple (newlines, documents, errors) where errors is a list of
+        tuples (line index, offset, error, record).
+    """
+    errors = []
+    for line_no, line_offset, error in bulk.validate_blocks(
+            job.schema, [(0, block)]):
+        if not isinstance(error, ValidationError):
+            error = ValueError(str(error))
+        record = None
+        if job.keep_records:
+            end = block.find(b"\n", line_offset)
+            record = block[line_offset:end if end != -1 else len(block)]
+        errors.append((line_no - 1, offset + line_offset, error, record))
+    documents = sum(1 for line in block.split(b"\n") if line.strip())
+    return block.count(b"\n"), documents, errors
+
+
+def _run_task(job, task):
+    """
+    Validate a task of :func:`_iter_tasks`.
+
+    :returns:
+        A tuple (task, newlines, documents, errors), as for
+        :func:`_validate_block`. Documents that are not JSON Lines are
+        reported at line index None.
+    """
+    file_index, lines, start, end = task
+    path = job.files[file_index]
+    if start is not None:
+        with open(path, "rb") as stream:
+            stream.seek(start)
+            block = stream.read(end - start)
+        return (task,) + _validate_block(job, block, start)
+    if lines:
+        newlines = documents = 0
+        errors = []
+        try:
+            with open(path, "rb") as stream:
+                with compression.open_decompressed(stream) as reader:
+                    for offset, block in bulk.iter_stream_blocks(reader):
+                        count, block_documents, block_errors = \
+                            _validate_block(job, block, offset)
+                        for index, line_offset, error, record in \
+                                block_errors:
+                            errors.append(
+                                (newlines + index, line_offset, error,
+                                 record))
+                        newlines += count
+                        documents += block_documents
+        except (IOError, OSError) as exc:
+            errors.append((None, None, ValueError(str(exc)), None))
+        return task, newlines, documents, errors
+    try:
+        text = _read_file(path)
+        obj = backend.loads(text)
+    except (IOError, OSError, ValueError) as exc:
+        return task, 0, 1, [(None, None, ValueError(str(exc)), None)]
+    try:
+        job.validator.validate(obj)
+    except ValidationError as exc:
+        record = None
+        if job.keep_records:
+            record = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        return task, 0, 1, [(None, None, exc, record)]
+    return task, 0, 1, []
+
+
+def _run_worker_task(task):
+    return _run_task(parallel._job, task)
+
+
+def _iter_stream_results(job, task, stream, block_size):
+    """Validate JSON Lines read from stream, block by block."""
+    for offset, block in bulk.iter_stream_blocks(stream, 0, block_size):
+        yield (task,) + _validate_block(job, block, offset)
+
+
+def iter_results(schema, files, workers=None, lines=False,
+                 keep_records=False, block_size=BLOCK_SIZE, stdin=None):
+    """
+    Validate files.
+
+    :param schema:
+        Schema to validate each document against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param files:
+        List of paths of files, as found by :func:`find_files`
+    :param workers:
+        Number of worker processes, the number of CPUs by default. With a
+        single worker, or when ``-`` is one of the files, files are validated
+        in the calling process.
+    :param lines:
+        If True, every file holds JSON Lines
+    :param keep_records:
+        If True, the text of invalid documents is kept
+    :param block_size:
+        Approximate number of bytes of JSON Lines validated at a time
+    :param stdin:
+        Binary stream read for the ``-`` path
+    :returns:
+        A generator of tuples (file index, newlines, documents, errors) in
+        the order of the files, with one or more tuples for each file.
+        newlines is the number of newlines seen, documents the number of
+        documents validated. errors is a list of tuples (line no, offset,
+        error, record) where line no is counted from the first line of the
+        tuple, or None if the file holds a single document, error the
+        :class:`json_schema_validator.errors.ValidationError` or the
+        :class:`ValueError` for text that is not JSON and record the text
+        of the document or None.
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    job = _Job(schema, files, keep_records)
+    tasks = _iter_tasks(files, lines, block_size)
+    if workers <= 1 or STDIN in files:
+        for task in tasks:
+            if files[task[0]] == STDIN:
+                for result in _iter_stream_results(
+                        job, task, stdin, block_size):
+                    yield _get_file_result(result)
+            else:
+                yield _get_file_result(_run_task(job, task))
+        return
+    pool, job_id = parallel._start_pool(
+        job, workers, _make_job, (schema._schema, files, keep_records))
+    try:
+        args = ((task,) for task in tasks)
+        for result in parallel._run_in_order(
+                pool, _run_worker_task, args, workers * TASKS_AHEAD):
+            yield _get_file_result(result)
+    finally:
+        parallel._stop_pool(pool, job_id)
+
+
+def _get_file_result(result):
+    task, newlines, documents, errors = result
+    return task[0], newlines, documents, [
+        (None if index is None else index + 1, offset, error, record)
+        for index, offset, error, record in errors]
+
+
+def _format_text(path, line_no, error):
+    where = path if line_no is None else "{0}:{1}".format(path, line_no)
+    if isinstance(error, ValidationError):
+        return "{0}: {1}: {2}".format(
+            where, error.object_expr, error.new_message)
+    return "{0}: {1}".format(where, error)
+
+
+def _format_json(path, line_no, offset, error):
+    report = {"path": path, "line": line_no, "offset": offset}
+    if isinstance(error, ValidationError):
+        report["message"] = error.new_message
+        report["object_expr"] = error.object_expr
+        report["schema_expr"] = error.schema_expr
+    else:
+        report["message"] = str(error)
+    return json.dumps(report, sort_keys=True)
+
+
+def _get_size(path):
+    if path == STDIN:
+        return 0
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog="json-schema-validator",
+        description="Validate JSON and JSON Lines files against a schema")
+    parser.add_argument("schema", help="path of the schema")
+    parser.add_argument(
+        "paths", nargs="+", metavar="path",
+        help="file, directory or glob pattern to validate, - for JSON Lines"
+        " read from the standard input")
+    parser.add_argument(
+        "-j", "--workers", type=int,
+        help="number of worker processes (default: number of CPUs)")
+    parser.add_argument(
+        "--lines", action="store_true",
+        help="validate each line of every file")
+    parser.add_argument(
+        "--fail-fast", action="store_true",
+        help="stop at the first invalid document")
+    parser.add_argument(
+        "--format", choices=("text", "json"), default="text",
+        help="format of the errors (default: %(default)s)")
+    parser.add_argument(
+        "--quarantine", metavar="FILE",
+        help="write the invalid documents to FILE, one per line")
+    parser.add_argument(
+        "--summary", action="store_true",
+        help="print the number of documents and the throughput")
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None):
+    """
+    Run the command line validator.
+
+    :returns:
+        The exit status
+    """
+    if stdin is None:
+        stdin = getattr(sys.stdin, "buffer", sys.stdin)
+    if stdout is None:
+        stdout = sys.stdout
+    if stderr is None:
+        stderr = sys.stderr
+    parser = make_parser()
+    args = parser.parse_args(argv)
+    try:
+        with open(args.schema, "rb") as stream:
+            schema = Schema(backend.loads(stream.read()))
+    except (IOError, OSError, ValueError) as exc:
+        stderr.write("{0}: cannot load schema: {1}\n".format(
+            args.schema, exc))
+        return 2
+    files = list(find_files(args.paths))
+    quarantine = None
+    if args.quarantine is not None:
+        quarantine = open(args.quarantine, "wb")
+    began = timeit.default_timer()
+    documents = invalid = 0
+    line_nos = [1] * len(files)
+    results = iter_results(
+        schema, files, args.workers, args.lines, quarantine is not None,
+        stdin=stdin)
+    try:
+        for file_index, newlines, count, errors in results:
+            path = files[file_index]
+            if path == STDIN:
+                path = "<stdin>"
+            documents += count
+            for line_no, offset, error, record in errors:
+                if line_no is not None:
+                    line_no += line_nos[file_index] - 1
+                invalid += 1
+                if args.format == "json":
+                    stdout.write(
+                        _format_json(path, line_no, offset, error) + "\n")
+                else:
+                    stdout.write(_format_text(path, line_no, error) + "\n")
+                if quarantine is not None and record is not None:
+                    quarantine.write(record.rstrip(b"\r") + b"\n")
+                if args.fail_fast:
+                    break
+            line_nos[file_index] += newlines
+            if invalid and args.fail_fast:
+                break
+    except SchemaError as exc:
+        stderr.write("{0}: invalid schema: {1}\n".format(args.schema, exc))
+        return 2
+    finally:
+        results.close()
+        if quarantine is not None:
+            quarantine.close()
+    if args.summary:
+        elapsed = max(timeit.default_timer() - began, 1e-9)
+        size = sum(_get_size(path) for path in set(files))
+        stderr.write(
+            "{0} documents ({1} invalid) in {2} files, {3:.1f} MB in"
+            " {4:.2f}s: {5:.0f} documents/s, {6:.1f} MB/s\n".format(
+                documents, invalid, len(files), size / 1e6, elapsed,
+                documents / elapsed, size / 1e6 / elapsed))
+    return 1 if invalid else 0
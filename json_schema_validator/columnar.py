@@ -0,0 +1,380 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Columnar validation of arrays of homogeneous records.
+
+An array of objects that share one simple object schema is transposed into
+one column per property. Each check (type, enumeration, pattern, length and
+range) then runs over a whole column at once, mostly inside built-in
+functions, instead of walking the schema again for every row. Only the first
+invalid row is validated again, row by row, to report the error.
+
+NumPy structured arrays are columnar already. Their fields are checked in
+place: numeric fields with vectorized operations and other fields in chunks
+of :data:`CHUNK_SIZE` values, so no per-record dictionaries are created.
+"""
+
+import itertools
+import operator
+import sys
+
+from json_schema_validator import vectorized
+from json_schema_validator.errors import SchemaError
+from json_schema_validator.misc import ARRAY_TYPES, NUMERIC_TYPES
+from json_schema_validator.schema import Schema
+from json_schema_validator.validator import Validator
+
+if sys.version_info[0] > 2:
+    basestring = (str, )
+
+
+# Schema keywords of the row (object) schema supported by columnar validation
+ROW_KEYWORDS = frozenset([
+    "type", "properties", "additionalProperties", "optional", "title",
+    "description", "default",
+])
+
+# Schema keywords of each property supported by columnar validation
+COLUMN_KEYWORDS = frozenset([
+    "type", "optional", "enum", "pattern", "minimum", "maximum",
+    "minimumCanEqual", "maximumCanEqual", "minLength", "maxLength", "title",
+    "description", "default",
+])
+
+# Types of values that are not subject to enum and pattern checks
+CONTAINER_TYPES = (dict, ) + ARRAY_TYPES
+
+# Placeholder for properties missing from a row
+MISSING = object()
+
+# Number of values of a structured array field converted to python at once
+CHUNK_SIZE = 4096
+
+
+def _first(flags, value=True):
+    """Index of the first element of flags equal to value, or None."""
+    try:
+        return flags.index(value)
+    except ValueError:
+        return
+
+
+def _get_python_types(json_type):
+    """
+    Map a schema type to a tuple of python types.
+
+    :returns:
+        A tuple of types, None if any value is acceptable or NotImplemented if
+        the type is a nested schema.
+    """
+    if isinstance(json_type, list):
+        json_type_list = json_type
+    else:
+        json_type_list = [json_type]
+    python_types = ()
+    for json_type in json_type_list:
+        if isinstance(json_type, (dict, list)):
+            return NotImplemented
+        if json_type == "any":
+            return
+        if json_type == "boolean":
+            python_types += (bool, )
+        else:
+            python_types += (Validator.JSON_TYPE_MAP[json_type], )
+    return python_types
+
+
+def _select(indices, values, python_types, negate=False):
+    """Select values (and their indices) that are instances of python_types."""
+    flags = map(isinstance, values, itertools.repeat(python_types))
+    if negate:
+        flags = map(operator.not_, flags)
+    flags = list(flags)
+    return (list(itertools.compress(indices, flags)),
+            list(itertools.compress(values, flags)))
+
+
+def find_invalid_value(values, schema):
+    """
+    Find the first value in a column that does not match schema.
+
+    :param values:
+        List of values of one property, with :data:`MISSING` in place of
+        missing properties
+    :param schema:
+        :class:`json_schema_validator.schema.Schema` of the property
+    :returns:
+        Index of the first invalid value, None if all values are valid or
+        NotImplemented if the schema cannot be checked column by column.
+    """
+    if not COLUMN_KEYWORDS.issuperset(schema._schema):
+        return NotImplemented
+    try:
+        optional = schema.optional
+        python_types = _get_python_types(schema.type)
+        enum = schema.enum
+        pattern = schema.pattern
+        minimum = schema.minimum
+        minimum_can_equal = minimum is None or schema.minimumCanEqual
+        maximum = schema.maximum
+        maximum_can_equal = maximum is None or schema.maximumCanEqual
+        min_length = schema.minLength
+        max_length = schema.maxLength
+    except SchemaError:
+        # Let the regular code path report schema errors
+        return NotImplemented
+    if python_types is NotImplemented:
+        return NotImplemented
+    if enum is not None:
+        try:
+            enum = frozenset(enum)
+        except TypeError:
+            return NotImplemented
+    found = []
+    indices = range(len(values))
+    missing = list(map(operator.is_, values, itertools.repeat(MISSING)))
+    if True in missing:
+        if optional:
+            present = list(map(operator.not_, missing))
+            indices = list(itertools.compress(indices, present))
+            values = list(itertools.compress(values, present))
+        else:
+            # Values after the first missing one do not matter
+            index = missing.index(True)
+            found.append(index)
+            indices = indices[:index]
+            values = values[:index]
+    if python_types is not None:
+        index = _first(
+            list(map(isinstance, values, itertools.repeat(python_types))),
+            False)
+        if index is not None:
+            found.append(indices[index])
+            indices = indices[:index]
+            values = values[:index]
+    scalar_indices, scalars = _select(
+        indices, values, CONTAINER_TYPES, negate=True)
+    if enum is not None:
+        try:
+            index = _first(list(map(enum.__contains__, scalars)), False)
+        except TypeError:
+            return NotImplemented
+        if index is not None:
+            found.append(scalar_indices[index])
+    string_indices, strings = _select(
+        scalar_indices, scalars, basestring)
+    if pattern is not None:
+        index = _first(list(map(pattern.match, strings)), None)
+        if index is not None:
+            found.append(string_indices[index])
+    if min_length or max_length is not None:
+        lengths = list(map(len, strings))
+        if min_length:
+            index = _first(list(map(
+                operator.lt, lengths, itertools.repeat(min_length))))
+            if index is not None:
+                found.append(string_indices[index])
+        if max_length is not None:
+            index = _first(list(map(
+                operator.gt, lengths, itertools.repeat(max_length))))
+            if index is not None:
+                found.append(string_indices[index])
+    if minimum is not None or maximum is not None:
+        number_indices, numbers = _select(
+            scalar_indices, scalars, NUMERIC_TYPES)
+        if minimum is not None:
+            below = operator.lt if minimum_can_equal else operator.le
+            index = _first(list(map(
+                below, numbers, itertools.repeat(minimum))))
+            if index is not None:
+                found.append(number_indices[index])
+        if maximum is not None:
+            above = operator.gt if maximum_can_equal else operator.ge
+            index = _first(list(map(
+                above, numbers, itertools.repeat(maximum))))
+            if index is not None:
+                found.append(number_indices[index])
+    if found:
+        return min(found)
+
+
+def _get_row_properties(schema):
+    """
+    Get the properties and additionalProperties of a row schema.
+
+    :returns:
+        A tuple (properties, additionalProperties) or NotImplemented if the
+        schema cannot be checked column by column.
+    """
+    schema_json = schema._schema
+    if not ROW_KEYWORDS.issuperset(schema_json):
+        return NotImplemented
+    if schema_json.get("type") != "object":
+        return NotImplemented
+    try:
+        properties = schema.properties
+        additional_properties = schema.additionalProperties
+    except SchemaError:
+        return NotImplemented
+    if additional_properties != {} and additional_properties is not False:
+        return NotImplemented
+    for prop_schema_json in properties.values():
+        if not isinstance(prop_schema_json, dict):
+            return NotImplemented
+    return properties, additional_properties
+
+
+def find_invalid_row(rows, schema):
+    """
+    Find the first row that does not match schema.
+
+    :param rows:
+        List of objects to check
+    :param schema:
+        :class:`json_schema_validator.schema.Schema` of each row
+    :returns:
+        Index of the first invalid row, None if all rows are valid or
+        NotImplemented if the schema cannot be checked column by column.
+    """
+    row_properties = _get_row_properties(schema)
+    if row_properties is NotImplemented:
+        return NotImplemented
+    properties, additional_properties = row_properties
+    found = []
+    index = _first(
+        list(map(isinstance, rows, itertools.repeat(dict))), False)
+    if index is not None:
+        # Rows after the first non-object do not matter
+        found.append(index)
+        rows = rows[:index]
+    if additional_properties is False:
+        allowed = frozenset(properties)
+        index = _first(list(map(allowed.issuperset, rows)), False)
+        if index is not None:
+            found.append(index)
+    for prop, prop_schema_json in properties.items():
+        column = list(map(operator.methodcaller("get", prop, MISSING), rows))
+        index = find_invalid_value(column, Schema(prop_schema_json))
+        if index is NotImplemented:
+            return NotImplemented
+        if index is not None:
+            found.append(index)
+    if found:
+        return min(found)
+
+
+def find_invalid_record(arr, schema):
+    """
+    Find the first record of a structured array that does not match schema.
+
+    Each record is checked as if it was an object mapping field names to
+    values. Fields are accessed through zero-copy views of arr.
+
+    :param arr:
+        One-dimensional NumPy structured array to check
+    :param schema:
+        :class:`json_schema_validator.schema.Schema` of each record
+    :returns:
+        Index of the first invalid record, None if all records are valid or
+        NotImplemented if the schema cannot be checked column by column.
+    """
+    row_properties = _get_row_properties(schema)
+    if row_properties is NotImplemented:
+        return NotImplemented
+    properties, additional_properties = row_properties
+    names = arr.dtype.names
+    for name in names:
+        if arr.dtype.fields[name][0].names is not None:
+            # Nested records are not supported
+            return NotImplemented
+    if len(arr) == 0:
+        return
+    if additional_properties is False and not set(properties).issuperset(
+            names):
+        # Every record has the same, unexpected, fields
+        return 0
+    found = []
+    for prop, prop_schema_json in properties.items():
+        prop_schema = Schema(prop_schema_json)
+        if prop not in names:
+            try:
+                optional = prop_schema.optional
+            except SchemaError:
+                return NotImplemented
+            if not optional:
+                return 0
+            continue
+        column = arr[prop]
+        index = vectorized.find_invalid_item(column, prop_schema)
+        if index is NotImplemented:
+            for start in range(0, len(column), CHUNK_SIZE):
+                index = find_invalid_value(
+                    column[start:start + CHUNK_SIZE].tolist(), prop_schema)
+                if index is NotImplemented:
+                    return NotImplemented
+                if index is not None:
+                    index += start
+                    break
+        if index is not None:
+            found.append(index)
+    if found:
+        return min(found)
+
+
+class ColumnarValidator(Validator):
+    """
+    JSON Schema validator with columnar validation of arrays of records.
+
+    Arrays of at least :attr:`columnar_threshold` objects, whose items schema
+    only uses simple property constraints, are validated one property
+    (column) at a time. NumPy structured arrays are validated field by field
+    regardless of their size. Errors are the same as reported by
+    :class:`json_schema_validator.validator.Validator`. Other arrays are
+    validated the usual way.
+    """
+
+    #: Minimum number of rows to use columnar validation
+    columnar_threshold = 16
+
+    def _validate_vectorized_items(self):
+        if super(ColumnarValidator, self)._validate_vectorized_items():
+            return True
+        if self._limits is not None:
+            # Limits are checked as each value is visited
+            return False
+        obj = self._object
+        if vectorized.is_record_array(obj):
+            index = find_invalid_record(obj, self._schema)
+            get_row = vectorized.get_record
+        elif isinstance(obj, list) and len(obj) >= self.columnar_threshold:
+            index = find_invalid_row(obj, self._schema)
+            get_row = operator.getitem
+        else:
+            return False
+        if index is NotImplemented:
+            return False
+        if index is not None:
+            # Let the regular code path report the error. This also validates
+            # the remaining rows should it disagree with the columnar check.
+            for index in range(index, len(obj)):
+                self._push_object(get_row(obj, index), "[%d]" % index)
+                self._validate()
+                self._pop_object()
+        return True
@@ -0,0 +1,392 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Validators compiled for a single schema.
+
+:class:`CompiledValidator` turns a schema into a tree of functions, once,
+that check if a JSON object is valid. The functions keep their state in local
+variables, so a compiled validator can be shared between threads. Documents
+that fail the check are validated again with a new
+:class:`json_schema_validator.validator.Validator`, for each call, to report
+the error.
+
+Compiled validators can be pickled, to be sent to worker processes. They are
+pickled as the fingerprint and the compact JSON text of their schema, and
+compiled again when they are unpickled, once per process: validators
+unpickled later with the same fingerprint are taken from a cache.
+"""
+
+import json
+import re
+import threading
+
+from json_schema_validator.errors import SchemaError, ValidationError
+from json_schema_validator.extensions import datetime_extension
+from json_schema_validator.misc import (
+    ARRAY_TYPES,
+    NUMERIC_TYPES,
+    dump_schema,
+    get_schema_fingerprint,
+)
+from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import _is_unconstrained
+from json_schema_validator.validator import Validator, basestring
+
+
+# Maximum number of unpickled validators kept by a process
+CACHE_SIZE = 64
+
+# Unpickled validators, by fingerprint and validator class
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _never(obj):
+    """Check of values that only the validator can judge."""
+    return False
+
+
+class _Compiler(object):
+    """
+    Compiler of schemas into checks.
+
+    A check is a function that takes a JSON object and returns True if the
+    validator would accept it. It returns False if the object is invalid or
+    if it cannot tell, and may raise any exception in that case too. A check
+    of None stands for a schema that accepts any value.
+    """
+
+    def __init__(self, type_map):
+        self._type_map = type_map
+        # Checks of the schemas compiled so far, by id of the schema JSON
+        self._checks = {}
+        self._pending = set()
+
+    def compile(self, schema_json):
+        """Get the check of a schema that is part of the compiled schema."""
+        key = id(schema_json)
+        try:
+            return self._checks[key]
+        except KeyError:
+            pass
+        if key in self._pending:
+            # The schema contains itself
+            checks = self._checks
+            return lambda obj: checks[key] is None or checks[key](obj)
+        self._pending.add(key)
+        try:
+            check = self._compile(schema_json)
+        except (SchemaError, NotImplementedError):
+            # Let the validator report the problem
+            check = _never
+        self._pending.discard(key)
+        self._checks[key] = check
+        return check
+
+    def _compile(self, schema_json):
+        schema = Schema(schema_json)
+        if _is_unconstrained(schema_json):
+            return
+        # The validator always looks at these
+        type_check = self._compile_type(schema.type)
+        if schema.requires != {} or schema.contentEncoding is not None or \
+                schema.divisibleBy != 1 or schema.disallow is not None:
+            return _never
+        dict_check = self._compile_part(self._compile_dict, schema)
+        array_check = self._compile_part(self._compile_array, schema)
+        scalar_check = self._compile_part(self._compile_scalar, schema)
+
+        def check(obj):
+            if type_check is not None and not type_check(obj):
+                return False
+            if isinstance(obj, dict):
+                return dict_check is None or dict_check(obj)
+            if isinstance(obj, ARRAY_TYPES):
+                return array_check is None or array_check(obj)
+            return scalar_check is None or scalar_check(obj)
+        return check
+
+    def _compile_part(self, compile_part, schema):
+        """Compile the checks of a kind of value, that may be invalid."""
+        try:
+            return compile_part(schema)
+        except (SchemaError, NotImplementedError):
+            return _never
+
+    def _compile_type(self, json_type):
+        if json_type == "any":
+            return
+        if json_type == "boolean":
+            return lambda obj: obj is True or obj is False
+        if isinstance(json_type, dict):
+            return self.compile(json_type)
+        if isinstance(json_type, list):
+            alternatives = []
+            for alternative in json_type:
+                # An alternative is checked with a schema holding just the
+                # type, which only constrains the type
+                Schema({"type": alternative}).type
+                alternative_check = self._compile_type(alternative)
+                if alternative_check is None:
+                    return
+                alternatives.append(alternative_check)
+
+            def check_alternatives(obj):
+                for alternative_check in alternatives:
+                    if alternative_check(obj):
+                        return True
+                return False
+            return check_alternatives
+        python_types = self._type_map[json_type]
+        return lambda obj: isinstance(obj, python_types)
+
+    def _compile_dict(self, schema):
+        properties = schema.properties
+        property_checks = []
+        required = []
+        for prop, prop_schema_json in properties.items():
+            prop_check = self.compile(prop_schema_json)
+            if prop_check is _never:
+                return _never
+            if prop_check is not None:
+                property_checks.append((prop, prop_check))
+            if not Schema(prop_schema_json).optional:
+                required.append(prop)
+        additional = schema.additionalProperties
+        if additional is False:
+            names = frozenset(properties)
+            additional_check = None
+        else:
+            names = None
+            additional_check = self.compile(additional)
+        if not property_checks and not required and names is None and \
+                additional_check is None:
+            return
+
+        def check_dict(obj):
+            for prop, prop_check in property_checks:
+                if prop in obj and not prop_check(obj[prop]):
+                    return False
+            for prop in required:
+                if prop not in obj:
+                    return False
+            if names is not None:
+                if not names.issuperset(obj):
+                    return False
+            elif additional_check is not None:
+                for value in obj.values():
+                    if not additional_check(value):
+                        return False
+            return True
+        return check_dict
+
+    def _compile_array(self, schema):
+        items = schema.items
+        if items == {}:
+            # The validator does not look at the items then
+            return
+        unique = schema.uniqueItems is True
+        min_items = schema.minItems
+        max_items = schema.maxItems
+        if isinstance(items, dict):
+            item_checks = None
+            item_check = self.compile(items)
+            additional = extra_check = None
+        else:
+            item_checks = [self.compile(item_json) for item_json in items]
+            item_check = None
+            additional = schema.additionalProperties
+            if additional is False:
+                extra_check = _never
+            else:
+                extra_check = self.compile(additional)
+
+        def check_array(obj):
+            if not isinstance(obj, list):
+                # Other array types are left to the validator
+                return False
+            count = len(obj)
+            if unique and len(set(obj)) != count:
+                return False
+            if min_items and count < min_items:
+                return False
+            if max_items is not None and count > max_items:
+                return False
+            if item_checks is None:
+                if item_check is not None:
+                    for item in obj:
+                        if not item_check(item):
+                            return False
+                return True
+            if count < len(item_checks):
+                return False
+            for index, item in enumerate(obj):
+                if index < len(item_checks):
+                    check = item_checks[index]
+                else:
+                    check = extra_check
+                if check is not None and not check(item):
+                    return False
+            return True
+        return check_array
+
+    def _compile_scalar(self, schema):
+        enum = schema.enum
+        fmt = schema.format
+        pattern = schema.pattern
+        min_length = schema.minLength
+        max_length = schema.maxLength
+        minimum = schema.minimum
+        maximum = schema.maximum
+        if minimum is not None:
+            minimum_can_equal = schema.minimumCanEqual
+        if maximum is not None:
+            maximum_can_equal = schema.maximumCanEqual
+        if enum is None and fmt is None and pattern is None and \
+                min_length is None and max_length is None and \
+                minimum is None and maximum is None:
+            return
+
+        def check_scalar(obj):
+            if enum is not None:
+                for allowed_value in enum:
+                    if obj == allowed_value:
+                        break
+                else:
+                    return False
+            if fmt == "date-time":
+                datetime_extension.from_json(obj)
+            elif fmt == "regex":
+                re.compile(obj)
+            if isinstance(obj, basestring):
+                if pattern is not None and not pattern.match(obj):
+                    return False
+                if min_length is not None and len(obj) < min_length:
+                    return False
+                if max_length is not None and len(obj) > max_length:
+                    return False
+            elif isinstance(obj, NUMERIC_TYPES):
+                if minimum is not None and (obj < minimum or (
+                        obj == minimum and not minimum_can_equal)):
+                    return False
+                if maximum is not None and (obj > maximum or (
+                        obj == maximum and not maximum_can_equal)):
+                    return False
+            return True
+        return check_scalar
+
+
+class CompiledValidator(object):
+    """
+    Validator of a single schema that can be shared between threads.
+
+    The schema is compiled when the validator is created. Compiled validators
+    are immutable and do not keep any state between calls, so one instance
+    can be used by any number of threads at once, including on free-threaded
+    builds of CPython, and re-entrantly.
+
+    :param schema:
+        Schema to validate against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param validator_class:
+        Class of the validator used to report errors. Its validation must not
+        have side effects, like decoding values.
+    """
+
+    def __init__(self, schema, validator_class=Validator):
+        if not isinstance(schema, Schema):
+            raise ValueError(
+                "schema value {0!r} is not a Schema"
+                " object".format(schema))
+        self._schema = schema
+        self._validator_class = validator_class
+        self._check = _Compiler(validator_class.JSON_TYPE_MAP).compile(
+            schema._schema)
+        # Fingerprint and text of the schema, computed when first pickled
+        self._pickled = None
+
+    def __reduce__(self):
+        pickled = self._pickled
+        if pickled is None:
+            text = dump_schema(self._schema._schema)
+            fingerprint = get_schema_fingerprint(self._schema)
+            pickled = self._pickled = (fingerprint, text)
+        return _load, pickled + (self._validator_class,)
+
+    @property
+    def schema(self):
+        """The schema to validate against."""
+        return self._schema
+
+    def validate(self, obj):
+        """
+        Validate specified JSON object obj.
+
+        :param obj:
+            JSON object to validate
+        :rtype:
+            bool
+        :returns:
+            True on success
+        :raises `json_schema_validator.errors.ValidationError`:
+            if the object does not match schema.
+        :raises `json_schema_validator.errors.SchemaError`:
+            if the schema itself is wrong.
+        """
+        check = self._check
+        if check is not None:
+            try:
+                valid = check(obj)
+            except Exception:
+                valid = False
+            if not valid:
+                self._validator_class().validate_toplevel(self._schema, obj)
+        return True
+
+    def is_valid(self, obj):
+        """
+        Check if JSON object obj is valid.
+
+        :returns:
+            True if obj matches the schema, False otherwise
+        :raises `json_schema_validator.errors.SchemaError`:
+            if the schema itself is wrong.
+        """
+        try:
+            return self.validate(obj)
+        except ValidationError:
+            return False
+
+
+def _load(fingerprint, text, validator_class):
+    """Unpickle a compiled validator, compiling its schema at most once."""
+    key = (fingerprint, validator_class)
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
+    validator = CompiledValidator(Schema(json.loads(text)), validator_class)
+    validator._pickled = (fingerprint, text)
+    with _cache_lock:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        _cache[key] = validator
+    return validator
@@ -0,0 +1,297 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Transparent decompression of input files.
+
+Compressed input is recognized by its magic bytes. gzip, bzip2 and xz (when
+the :mod:`lzma` module is available) are supported, including files made of
+several concatenated streams.
+
+Decompression runs on a reader thread, ahead of the consumer, so that it
+overlaps with parsing and validation. The decompressors release the GIL while
+they work.
+"""
+
+import bz2
+import threading
+import zlib
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+
+# Number of compressed bytes read at a time
+READ_SIZE = 1 << 20
+
+# Number of decompressed chunks the reader thread may be ahead
+QUEUE_SIZE = 8
+
+# Magic bytes of each supported format
+MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+)
+
+# Number of bytes needed to recognize any format
+MAGIC_SIZE = max(len(magic) for magic, kind in MAGIC)
+
+
+def detect_compression(header):
+    """
+    Detect the compression format of a file.
+
+    :param header:
+        The first :data:`MAGIC_SIZE` bytes of the file
+    :returns:
+        ``"gzip"``, ``"bz2"``, ``"xz"`` or None if the file is not
+        compressed.
+    """
+    for magic, kind in MAGIC:
+        if header.startswith(magic):
+            return kind
+
+
+def _make_decompressor(kind):
+    if kind == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if kind == "bz2":
+        return bz2.BZ2Decompressor()
+    if lzma is None:
+        raise ValueError("Decompressing xz input requires the lzma module")
+    return lzma.LZMADecompressor()
+
+
+def iter_decompressed(fp, kind, read_size=READ_SIZE, head=b""):
+    """
+    Decompress a file incrementally.
+
+    :param fp:
+        Binary file object to read compressed data from
+    :param kind:
+        Compression format, as returned by :func:`detect_compression`
+    :param read_size:
+        Number of bytes to read at a time, and maximum size of the chunks
+    :param head:
+        Data already read from fp
+    :returns:
+        A generator of chunks of decompressed data
+    :raises ValueError:
+        if the compressed data is corrupt or truncated
+    """
+    decompressor = _make_decompressor(kind)
+    data = head
+    # True when the decompressor may have output left without more input
+    pending = False
+    while True:
+        if not data and not pending:
+            data = fp.read(read_size)
+            if not data:
+                break
+        if getattr(decompressor, "eof", False):
+            # Another stream follows
+            decompressor = _make_decompressor(kind)
+        try:
+            chunk = _decompress(decompressor, kind, data, read_size)
+        except (IOError, EOFError, zlib.error) as exc:
+            raise ValueError("Corrupt {0} data: {1}".format(kind, exc))
+        if chunk:
+            yield chunk
+        pending = (len(chunk) >= read_size
+                   and not getattr(decompressor, "eof", False))
+        # Input left over by zlib when the output was full
+        data = getattr(decompressor, "unconsumed_tail", b"")
+        if not data:
+            data = decompressor.unused_data
+            if data:
+                decompressor = _make_decompressor(kind)
+                pending = False
+    if getattr(decompressor, "eof", True) is False:
+        raise ValueError("Truncated {0} data".format(kind))
+
+
+def _decompress(decompressor, kind, data, max_length):
+    """
+    Decompress data, producing at most max_length bytes.
+
+    The bz2 decompressor of Python 2 cannot limit its output, it produces
+    everything at once.
+    """
+    if kind == "gzip" or hasattr(decompressor, "needs_input"):
+        return decompressor.decompress(data, max_length)
+    return decompressor.decompress(data)
+
+
+def _discard(fp, count):
+    """Read and discard count bytes from fp."""
+    while count:
+        data = fp.read(min(count, READ_SIZE))
+        if not data:
+            raise ValueError("Unexpected end of data")
+        count -= len(data)
+
+
+class ThreadedReader(object):
+    """
+    Binary file object reading data produced on a background thread.
+
+    The thread consumes an iterable of chunks of data (for example
+    :func:`iter_decompressed`) and stays at most queue_size chunks ahead of
+    the reader. Exceptions raised by the iterable are raised again by
+    :meth:`read`. Reads may return fewer bytes than requested.
+    """
+
+    def __init__(self, chunks, queue_size=QUEUE_SIZE):
+        self._queue = queue.Queue(queue_size)
+        self._chunk = b""
+        self._pos = 0
+        self._done = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, args=(chunks, ))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, chunks):
+        try:
+            for chunk in chunks:
+                self._queue.put((chunk, None))
+                if self._closed:
+                    return
+        except Exception as exc:
+            self._queue.put((None, exc))
+        else:
+            self._queue.put((None, None))
+
+    def read(self, size=-1):
+        """Read at most size bytes, or everything if size is negative."""
+        if size < 0:
+            chunks = []
+            while True:
+                chunk = self.read(READ_SIZE)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+        while self._pos == len(self._chunk):
+            if self._done:
+                return b""
+            chunk, exc = self._queue.get()
+            if exc is not None:
+                self._done = True
+                raise exc
+            if chunk is None:
+                self._done = True
+            else:
+                self._chunk = chunk
+                self._pos = 0
+        data = self._chunk[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+    def skip(self, count):
+        """Discard the next count bytes."""
+        _discard(self, count)
+
+    def close(self):
+        """Stop the background thread."""
+        self._closed = True
+        while self._thread.is_alive():
+            # Make room for the chunk the thread may be blocked on
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _HeadReader(object):
+    """File object reading data already read from fp, then from fp."""
+
+    def __init__(self, head, fp):
+        self._head = head
+        self._fp = fp
+
+    def read(self, size=-1):
+        if not self._head:
+            return self._fp.read(size)
+        if size < 0:
+            data = self._head + self._fp.read()
+        else:
+            data = self._head[:size]
+        self._head = self._head[len(data):]
+        return data
+
+    def skip(self, count):
+        head = min(count, len(self._head))
+        self._head = self._head[head:]
+        count -= head
+        if not count:
+            return
+        try:
+            self._fp.seek(count, 1)
+        except (AttributeError, IOError, ValueError):
+            _discard(self._fp, count)
+
+    def close(self):
+        # The underlying file object belongs to the caller
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_decompressed(fp, read_size=READ_SIZE):
+    """
+    Get a file object with the decompressed content of fp.
+
+    Compressed data is decompressed on a :class:`ThreadedReader` thread.
+    Other data, including text, is passed through unchanged. Closing the
+    returned object does not close fp.
+
+    :param fp:
+        File object to read from, positioned at the start of the data
+    :param read_size:
+        Number of compressed bytes to read at a time
+    :returns:
+        A file object with ``read()``, ``skip()`` and ``close()`` methods.
+        ``skip(count)`` discards the next count bytes, seeking in fp when
+        the data is not compressed.
+    """
+    head = fp.read(MAGIC_SIZE)
+    if isinstance(head, bytes):
+        kind = detect_compression(head)
+        if kind is not None:
+            return ThreadedReader(
+                iter_decompressed(fp, kind, read_size, head))
+    return _HeadReader(head, fp)
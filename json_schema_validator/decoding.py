@@ -0,0 +1,138 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Schema-directed decoding of JSON documents.
+
+Values with a format are decoded in the same pass that validates them. The
+value parsed to check the format is the value stored in the decoded document,
+nothing is parsed twice.
+"""
+
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.misc import ITERATOR_TYPES
+from json_schema_validator.schema import Schema
+from json_schema_validator.validator import Validator
+
+
+class DecodingValidator(Validator):
+    """
+    JSON Schema validator that also decodes values with a format.
+
+    Strings described by ``{"format": "date-time"}`` are replaced with the
+    :class:`datetime.datetime` objects obtained while checking the format (see
+    :class:`json_schema_validator.extensions.datetime_extension`).
+
+    Replacements are only applied once the whole document is valid. Values
+    checked against alternatives of a union type that did not match are not
+    decoded.
+    """
+
+    def __init__(self, copy=False, limits=None):
+        super(DecodingValidator, self).__init__(limits)
+        self._copy = copy
+        self._decoded = []
+
+    @classmethod
+    def decode(cls, schema, obj, copy=False, limits=None):
+        """
+        Validate specified JSON object obj with specified schema and decode it.
+
+        :param schema:
+            Schema to validate against
+        :type schema:
+            :class:`json_schema_validator.schema.Schema`
+        :param obj:
+            JSON object to validate and decode
+        :param copy:
+            If False (default) then obj is decoded in place. Otherwise obj is
+            left intact and the dictionaries and lists that contain decoded
+            values are copied. Other values are shared with obj.
+        :param limits:
+            Optional :class:`json_schema_validator.limits.Limits` of the
+            validation
+        :returns:
+            The decoded object. This is obj itself, unless copy is True or obj
+            is a value that was decoded.
+        :raises `json_schema_validator.errors.ValidationError`:
+            if the object does not match schema. Nothing is decoded then.
+        :raises `json_schema_validator.errors.SchemaError`:
+            if the schema itself is wrong.
+        """
+        if not isinstance(schema, Schema):
+            raise ValueError(
+                "schema value {0!r} is not a Schema"
+                " object".format(schema))
+        self = cls(copy, limits)
+        self.validate_toplevel(schema, obj)
+        return self._apply_decoded(obj)
+
+    def validate_toplevel(self, schema, obj):
+        self._decoded = []
+        super(DecodingValidator, self).validate_toplevel(schema, obj)
+
+    def _validate(self):
+        mark = len(self._decoded)
+        try:
+            super(DecodingValidator, self)._validate()
+        except ValidationError:
+            # Forget values decoded by a failed union type alternative
+            del self._decoded[mark:]
+            raise
+
+    def _decode_format(self, value):
+        # Iterators may have been replaced by lists of their items
+        read = set(id(items) for it, items in self._iterator_items.values())
+        for obj, path in self._object_stack[:-1]:
+            if isinstance(obj, ITERATOR_TYPES) or id(obj) in read:
+                raise ValueError(
+                    "Values of arrays given as iterators cannot be decoded")
+        keys = []
+        for obj, path in self._object_stack[1:]:
+            if path.startswith("["):
+                keys.append(int(path[1:-1]))
+            else:
+                keys.append(path[1:])
+        self._decoded.append((keys, value))
+
+    def _apply_decoded(self, root):
+        """Store decoded values in root, or in a copy of root, and return it."""
+        copied = set()
+        for keys, value in self._decoded:
+            if not keys:
+                return value
+            if self._copy and id(root) not in copied:
+                root = self._copy_container(root, copied)
+            container = root
+            for key in keys[:-1]:
+                child = container[key]
+                if self._copy and id(child) not in copied:
+                    child = container[key] = self._copy_container(
+                        child, copied)
+                container = child
+            container[keys[-1]] = value
+        return root
+
+    def _copy_container(self, obj, copied):
+        if isinstance(obj, dict):
+            obj = dict(obj)
+        else:
+            obj = list(obj)
+        copied.add(id(obj))
+        return obj
@@ -63,3 +63,24 @@ class ValidationError(ValueError):
                 "schema_expr={2!r})").format(
                     self.new_message, self.object_expr,
                     self.schema_expr)
+
+
+class LimitExceeded(ValidationError):
+    """
+    Exception raised when the validation exceeds one of its limits.
+
+    The object is rejected without being fully validated, see
+    :class:`json_schema_validator.limits.Limits`. The object_expr attribute
+    designates the value at which the limit was exceeded.
+
+    .. attribute:: limit
+
+        Name of the limit: ``'timeout'``, ``'max_depth'``, ``'max_nodes'``
+        or ``'max_string_length'``.
+    """
+
+    def __init__(self, message, new_message=None,
+                 object_expr=None, schema_expr=None, limit=None):
+        super(LimitExceeded, self).__init__(
+            message, new_message, object_expr, schema_expr)
+        self.limit = limit
@@ -32,6 +32,11 @@ import sys
 
 from datetime import datetime, timedelta
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 if sys.version_info[0] > 2:
     basestring = (str, )
 
@@ -57,18 +62,132 @@ class datetime_extension(object):
         * Colon
         * Two digit seconds code
         * Capital letter 'Z' - Zulu (UTC) time zone indicator
+
+    Strings in exactly this fixed-width form are parsed without
+    :meth:`datetime.datetime.strptime`, which is considerably slower.
     """
 
     FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
+    FIXED_WIDTH_PATTERN = re.compile(
+        r"([0-9]{4})-([0-9]{2})-([0-9]{2})"
+        r"T([0-9]{2}):([0-9]{2}):([0-9]{2})Z\Z")
+
+    # Positions of the separators and digits in the fixed-width form
+    SEPARATORS = ((4, "-"), (7, "-"), (10, "T"), (13, ":"), (16, ":"),
+                  (19, "Z"))
+    DIGITS = (0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18)
+
     @classmethod
     def to_json(cls, obj):
         return obj.strftime(cls.FORMAT)
 
     @classmethod
     def from_json(cls, doc):
+        match = cls.FIXED_WIDTH_PATTERN.match(doc)
+        if match is not None:
+            try:
+                return datetime(*map(int, match.groups()))
+            except ValueError:
+                pass
+        # Let strptime() accept or reject anything else
         return datetime.strptime(doc, cls.FORMAT)
 
+    @classmethod
+    def to_json_many(cls, objs):
+        """
+        Serialize a sequence of datetime.datetime objects.
+
+        :param objs:
+            Sequence of :class:`datetime.datetime` objects or a NumPy
+            ``datetime64`` array
+        :returns:
+            List of strings, the same as calling :meth:`to_json` on each
+            object
+        :raises ValueError:
+            if the array contains ``NaT``
+        """
+        to_json = cls.to_json
+        if (numpy is not None and isinstance(objs, numpy.ndarray)
+                and objs.dtype.kind == "M"):
+            seconds = objs.astype("datetime64[s]")
+            if numpy.isnat(seconds).any():
+                raise ValueError("NaT cannot be serialized")
+            years = seconds.astype("datetime64[Y]").astype("int64") + 1970
+            if seconds.size and (years.min() < 1000 or years.max() > 9999):
+                # Only four digit years have the fixed-width form, leave the
+                # others to strftime()
+                return [to_json(obj) for obj in seconds.tolist()]
+            text = numpy.datetime_as_string(seconds, unit="s")
+            return numpy.char.add(text, "Z").tolist()
+        return [
+            "%04d-%02d-%02dT%02d:%02d:%02dZ" % (
+                obj.year, obj.month, obj.day,
+                obj.hour, obj.minute, obj.second)
+            if obj.year >= 1000 else to_json(obj)
+            for obj in objs]
+
+    @classmethod
+    def from_json_many(cls, docs, as_numpy=False):
+        """
+        Deserialize a sequence of JSON documents (strings).
+
+        When NumPy is available strings in the fixed-width form are checked
+        and converted all at once.
+
+        :param docs:
+            Sequence of strings
+        :param as_numpy:
+            If True, return a NumPy ``datetime64[s]`` array. This requires
+            NumPy.
+        :returns:
+            List of :class:`datetime.datetime` objects, the same as calling
+            :meth:`from_json` on each document, or a NumPy array.
+        :raises ValueError:
+            If any of the documents is not a valid date-time string.
+        """
+        if numpy is not None:
+            arr = cls._from_json_array(docs)
+            if arr is not None:
+                return arr if as_numpy else arr.tolist()
+        elif as_numpy:
+            raise ValueError("as_numpy requires NumPy")
+        from_json = cls.from_json
+        objs = [from_json(doc) for doc in docs]
+        if as_numpy:
+            return numpy.array(objs, dtype="datetime64[s]")
+        return objs
+
+    @classmethod
+    def _from_json_array(cls, docs):
+        """
+        Convert strings in the fixed-width form to a datetime64 array.
+
+        :returns:
+            A NumPy ``datetime64[s]`` array or None if some of the strings
+            are not in the fixed-width form or are not valid.
+        """
+        try:
+            text = numpy.asarray(docs)
+        except ValueError:
+            return
+        if text.ndim != 1 or text.dtype != numpy.dtype("U20"):
+            return
+        chars = text.view("U1").reshape(len(text), 20)
+        ok = numpy.ones(len(text), dtype=bool)
+        for index, separator in cls.SEPARATORS:
+            ok &= chars[:, index] == separator
+        digits = chars[:, cls.DIGITS]
+        ok &= ((digits >= "0") & (digits <= "9")).all(axis=1)
+        # Year zero is valid in NumPy but not in python
+        ok &= (chars[:, 0:4] != "0").any(axis=1)
+        if not ok.all():
+            return
+        try:
+            return text.astype("U19").astype("datetime64[s]")
+        except ValueError:
+            return
+
 
 class timedelta_extension(object):
     """
@@ -98,3 +217,101 @@ class timedelta_extension(object):
             raise ValueError("JSON document must match expected pattern")
         days, seconds, microseconds = map(int, match.groups())
         return timedelta(days, seconds, microseconds)
+
+    @classmethod
+    def to_json_many(cls, objs):
+        """
+        Serialize a sequence of datetime.timedelta objects.
+
+        :param objs:
+            Sequence of :class:`datetime.timedelta` objects or a NumPy
+            ``timedelta64`` array
+        :returns:
+            List of strings, the same as calling :meth:`to_json` on each
+            object
+        :raises ValueError:
+            if the array contains ``NaT``
+        """
+        if (numpy is not None and isinstance(objs, numpy.ndarray)
+                and objs.dtype.kind == "m"):
+            if numpy.isnat(objs).any():
+                raise ValueError("NaT cannot be serialized")
+            microseconds = objs.astype("timedelta64[us]").astype("int64")
+            days, microseconds = divmod(microseconds, 86400 * 10 ** 6)
+            seconds, microseconds = divmod(microseconds, 10 ** 6)
+            return ["{0}d {1}s {2}us".format(*values) for values in zip(
+                days.tolist(), seconds.tolist(), microseconds.tolist())]
+        return ["{0}d {1}s {2}us".format(
+            obj.days, obj.seconds, obj.microseconds) for obj in objs]
+
+    @classmethod
+    def from_json_many(cls, docs, as_numpy=False):
+        """
+        Deserialize a sequence of JSON documents (strings).
+
+        When NumPy is available the strings are split and converted all at
+        once.
+
+        :param docs:
+            Sequence of strings
+        :param as_numpy:
+            If True, return a NumPy ``timedelta64[us]`` array. This requires
+            NumPy.
+        :returns:
+            List of :class:`datetime.timedelta` objects, the same as calling
+            :meth:`from_json` on each document, or a NumPy array.
+        """
+        if numpy is not None:
+            arr = cls._from_json_array(docs)
+            if arr is not None:
+                return arr if as_numpy else arr.tolist()
+        elif as_numpy:
+            raise ValueError("as_numpy requires NumPy")
+        from_json = cls.from_json
+        objs = [from_json(doc) for doc in docs]
+        if as_numpy:
+            return numpy.array(objs, dtype="timedelta64[us]")
+        return objs
+
+    @classmethod
+    def _from_json_array(cls, docs):
+        """
+        Convert strings in the JSON form to a timedelta64 array.
+
+        :returns:
+            A NumPy ``timedelta64[us]`` array or None if some of the strings
+            are not in the JSON form or are too large for the array.
+        """
+        try:
+            text = numpy.asarray(docs)
+        except ValueError:
+            return
+        if text.ndim != 1 or text.dtype.kind != "U":
+            return
+        numbers = []
+        ok = numpy.ones(len(text), dtype=bool)
+        for suffix in ("d ", "s ", "us"):
+            number, separator, text = numpy.char.partition(text, suffix).T
+            # At most 12 digits, so that the numbers fit in an int64
+            length = numpy.char.str_len(number)
+            ok &= (separator == suffix) & (length > 0) & (length <= 12)
+            numbers.append(number)
+        ok &= text == ""
+        if not ok.all():
+            return
+        # Read the digits of the numbers padded to a fixed width. Digits other
+        # than ASCII ones are left to from_json().
+        powers = 10 ** numpy.arange(11, -1, -1, dtype="int64")
+        values = []
+        for number in numbers:
+            digits = numpy.char.zfill(number, 12).astype("U12").view(
+                "uint32").reshape(len(number), 12).astype("int64") - ord("0")
+            if ((digits < 0) | (digits > 9)).any():
+                return
+            values.append(digits.dot(powers))
+        days, seconds, microseconds = values
+        # Keep the total number of microseconds within an int64
+        if (days >= 10 ** 8).any() or (seconds >= 10 ** 11).any():
+            return
+        microseconds += (days * 86400 + seconds) * 10 ** 6
+        return microseconds.astype("timedelta64[us]")
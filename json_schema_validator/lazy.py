@@ -0,0 +1,271 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Validation of JSON documents on access.
+
+:func:`lazy_validate` wraps a JSON document in read-only proxies,
+:class:`LazyValidatedDict` and :class:`LazyValidatedList`, that validate each
+value the first time it is accessed. Code that only reads a few values out of
+a large document then only pays for validating those.
+
+The checks that concern an object or an array as a whole (its type, missing
+properties, unknown properties when ``additionalProperties`` is false and the
+number of items) are done when its proxy is created. Objects and arrays whose
+schema needs to look at them as a whole (``uniqueItems``, ``requires`` and the
+like) are validated completely when they are accessed and are returned as
+they are.
+
+Errors are the :class:`json_schema_validator.errors.ValidationError` that
+:class:`json_schema_validator.validator.Validator` would report for the same
+value, raised by the access to the invalid value. Values that are never
+accessed are never validated.
+"""
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import (
+    _get_item_constraints,
+    _get_property_constraints,
+    _is_streamable,
+    _is_unconstrained,
+)
+from json_schema_validator.validator import Validator
+
+
+def lazy_validate(schema, obj):
+    """
+    Validate a JSON object as its values are accessed.
+
+    :param schema:
+        Schema to validate against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param obj:
+        JSON object to validate
+    :returns:
+        A :class:`LazyValidatedDict` or :class:`LazyValidatedList` proxy of
+        obj, or obj itself, validated, if it is not an object or an array.
+    :raises `json_schema_validator.errors.ValidationError`:
+        if obj as a whole does not match schema
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    if not isinstance(schema, Schema):
+        raise ValueError(
+            "schema value {0!r} is not a Schema"
+            " object".format(schema))
+    if _is_unconstrained(schema._schema):
+        return obj
+    return _wrap(_Cache(), [], [], obj, "object", [(schema, "schema")])
+
+
+class _Cache(object):
+    """Facts about the schemas of a document, by id of the schema JSON."""
+
+    def __init__(self):
+        self.streamable = {}
+        self.key_sets = {}
+
+    def is_streamable(self, schema, kind):
+        key = (id(schema._schema), kind)
+        try:
+            return self.streamable[key]
+        except KeyError:
+            streamable = self.streamable[key] = _is_streamable(
+                schema._schema, kind)
+            return streamable
+
+    def get_key_sets(self, schema):
+        """
+        Get the property names of an object schema.
+
+        :returns:
+            A tuple (names, required) with the sets of all the properties and
+            of the properties that are not optional.
+        """
+        try:
+            return self.key_sets[id(schema._schema)]
+        except KeyError:
+            properties = schema.properties
+            key_sets = self.key_sets[id(schema._schema)] = (
+                frozenset(properties),
+                frozenset(
+                    prop for prop, prop_schema in properties.items()
+                    if not Schema(prop_schema).optional))
+            return key_sets
+
+
+def _wrap(cache, object_stack, schema_stack, value, path, constraints):
+    """
+    Validate value, or wrap it in a proxy that validates it lazily.
+
+    :param object_stack:
+        Object stack of the container of value
+    :param schema_stack:
+        Schema stack of the container of value
+    :param path:
+        Object path of value in its container
+    :param constraints:
+        List of (schema, schema path) tuples that value must match
+    """
+    if not constraints:
+        return value
+    object_stack = object_stack + [(value, path)]
+    if len(constraints) == 1:
+        schema, schema_path = constraints[0]
+        if isinstance(value, dict):
+            if cache.is_streamable(schema, "object"):
+                return LazyValidatedDict(
+                    cache, object_stack,
+                    schema_stack + [(schema, schema_path)])
+        elif isinstance(value, list):
+            if cache.is_streamable(schema, "array"):
+                return LazyValidatedList(
+                    cache, object_stack,
+                    schema_stack + [(schema, schema_path)])
+    context = Validator()
+    context._object_stack = object_stack
+    for schema, schema_path in constraints:
+        context._schema_stack = schema_stack + [(schema, schema_path)]
+        context._validate()
+    return value
+
+
+def _make_context(object_stack, schema_stack):
+    """Get a validator positioned at the top of the stacks."""
+    context = Validator()
+    context._object_stack = list(object_stack)
+    context._schema_stack = list(schema_stack)
+    return context
+
+
+class LazyValidatedDict(Mapping):
+    """
+    Read-only proxy of a JSON object that validates values on access.
+
+    Instances are made by :func:`lazy_validate`. Each value is validated the
+    first time it is looked up and the result is remembered. Nested objects
+    and arrays are returned as proxies too.
+    """
+
+    def __init__(self, cache, object_stack, schema_stack):
+        self._cache = cache
+        self._object_stack = object_stack
+        self._schema_stack = schema_stack
+        self._obj = obj = object_stack[-1][0]
+        schema = schema_stack[-1][0]
+        self._properties = properties = schema.properties
+        self._additional = additional = schema.additionalProperties
+        self._values = {}
+        context = _make_context(object_stack, schema_stack)
+        context._validate_type()
+        context._report_unsupported()
+        names, required = cache.get_key_sets(schema)
+        if not required.issubset(obj):
+            for prop in properties:
+                if prop in required and prop not in obj:
+                    context._push_property_schema(prop)
+                    context._validate_missing_property(prop)
+                    context._pop_schema()
+        if additional is False and not names.issuperset(obj):
+            for prop in obj:
+                if prop not in properties:
+                    context._report_unknown_property(prop)
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._obj[key]
+        constraints = _get_property_constraints(
+            self._properties, self._additional, key)
+        value = self._values[key] = _wrap(
+            self._cache, self._object_stack, self._schema_stack, value,
+            "." + key, constraints)
+        return value
+
+    def __contains__(self, key):
+        return key in self._obj
+
+    def __iter__(self):
+        return iter(self._obj)
+
+    def __len__(self):
+        return len(self._obj)
+
+    def __repr__(self):
+        return "<LazyValidatedDict {0}>".format(
+            "".join(path for obj, path in self._object_stack))
+
+
+class LazyValidatedList(Sequence):
+    """
+    Read-only proxy of a JSON array that validates items on access.
+
+    Instances are made by :func:`lazy_validate`. Each item is validated the
+    first time it is looked up and the result is remembered. Nested objects
+    and arrays are returned as proxies too.
+    """
+
+    def __init__(self, cache, object_stack, schema_stack):
+        self._cache = cache
+        self._object_stack = object_stack
+        self._schema_stack = schema_stack
+        self._obj = obj = object_stack[-1][0]
+        schema = schema_stack[-1][0]
+        self._items = schema.items
+        self._additional = schema.additionalProperties
+        self._values = {}
+        context = _make_context(object_stack, schema_stack)
+        context._validate_type()
+        context._report_unsupported()
+        if self._items != {}:
+            context._validate_item_count(len(obj))
+            if isinstance(self._items, list):
+                context._validate_tuple_length(len(obj))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._obj)))]
+        if index < 0:
+            index += len(self._obj)
+        try:
+            return self._values[index]
+        except KeyError:
+            pass
+        value = self._obj[index]
+        constraints = _get_item_constraints(
+            self._items, self._additional, index)
+        value = self._values[index] = _wrap(
+            self._cache, self._object_stack, self._schema_stack, value,
+            "[%d]" % index, constraints)
+        return value
+
+    def __len__(self):
+        return len(self._obj)
+
+    def __repr__(self):
+        return "<LazyValidatedList {0}>".format(
+            "".join(path for obj, path in self._object_stack))
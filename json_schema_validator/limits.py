@@ -0,0 +1,96 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Resource limits of validation.
+
+A :class:`Limits` object bounds the work done by a
+:class:`json_schema_validator.validator.Validator` for a single document, so
+that hostile or broken documents cannot hold a worker for long. Validation
+stops with a :class:`json_schema_validator.errors.LimitExceeded` error as soon
+as a limit is exceeded::
+
+    limits = Limits(timeout=0.1, max_depth=64, max_nodes=100000)
+    Validator.validate(schema, obj, limits=limits)
+"""
+
+import time
+
+
+# Default number of visited values between two reads of the clock
+CHECK_INTERVAL = 256
+
+_clock = getattr(time, "monotonic", time.time)
+
+
+class Limits(object):
+    """
+    Limits of the validation of a single document.
+
+    Limits that are None are not checked. Limits can be shared by any number
+    of validators.
+
+    Only the values that the validator visits are checked, parts of the
+    document that the schema does not describe are not looked at anyway.
+    Arrays of numbers checked at once (see
+    :mod:`json_schema_validator.vectorized`) count as one value per item.
+
+    :param timeout:
+        Maximum duration of the validation, in seconds. The clock is only
+        read every check_interval values, so validation may last a little
+        longer.
+    :param max_depth:
+        Maximum nesting depth of values, the document itself is at depth 0
+    :param max_nodes:
+        Maximum number of values visited, including the document itself
+    :param max_string_length:
+        Maximum length of string values
+    :param check_interval:
+        Number of values visited between two reads of the clock
+    """
+
+    def __init__(self, timeout=None, max_depth=None, max_nodes=None,
+                 max_string_length=None, check_interval=CHECK_INTERVAL):
+        if check_interval < 1:
+            raise ValueError(
+                "check_interval must be positive, not {0!r}".format(
+                    check_interval))
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.max_string_length = max_string_length
+        self.check_interval = check_interval
+
+    def get_deadline(self):
+        """
+        Get the deadline of a validation starting now.
+
+        :returns:
+            A time of :func:`time.monotonic` or None without timeout
+        """
+        if self.timeout is None:
+            return
+        return _clock() + self.timeout
+
+    def __repr__(self):
+        return (
+            "Limits(timeout={0!r}, max_depth={1!r}, max_nodes={2!r},"
+            " max_string_length={3!r})").format(
+                self.timeout, self.max_depth, self.max_nodes,
+                self.max_string_length)
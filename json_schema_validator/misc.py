@@ -19,8 +19,56 @@
 
 """Stuff that does not belong anywhere else."""
 
+import array
 import decimal
+import hashlib
+import json
+
+try:
+    from collections.abc import Iterator
+except ImportError:
+    from collections import Iterator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 # List of types recognized as numeric
 NUMERIC_TYPES = (int, float, decimal.Decimal)
+
+# List of types recognized as arrays whose items are produced on demand
+# (generators, database cursors and the like). The items of a whole document
+# are consumed as they are validated, nested ones are read into a list once.
+ITERATOR_TYPES = (Iterator, )
+
+# List of types recognized as arrays
+ARRAY_TYPES = (list, array.array, memoryview)
+if numpy is not None:
+    ARRAY_TYPES += (numpy.ndarray, )
+ARRAY_TYPES += ITERATOR_TYPES
+
+
+def dump_schema(schema_json):
+    """
+    Get the compact JSON text of a schema.
+
+    Properties are validated in the order of the schema, so the text keeps
+    that order.
+    """
+    return json.dumps(schema_json, separators=(",", ":"))
+
+
+def get_schema_fingerprint(schema):
+    """
+    Get a fingerprint of a schema.
+
+    :param schema:
+        :class:`json_schema_validator.schema.Schema` to look at
+    :returns:
+        The SHA-1 digest, in hexadecimal, of the text made by
+        :func:`dump_schema`
+    """
+    text = dump_schema(schema._schema)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,993 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Validation of many documents in parallel.
+
+:func:`validate_many` validates documents in a pool of worker processes, so
+that batch jobs are not limited to a single core.
+
+The schema is compiled once, in the parent process, into a
+:class:`json_schema_validator.compiled.CompiledValidator`. Where processes
+are started by forking, workers inherit the compiled validator instead of
+receiving a copy. :func:`gc.freeze` is called just before forking so that
+the garbage collector of the workers does not write to, and thereby copy,
+the memory pages they share with the parent.
+
+Documents are sent to the workers in chunks. The size of the chunks is
+adjusted as results come back so that each chunk keeps a worker busy for
+about :data:`CHUNK_TIME` seconds: small documents are sent many at a time and
+large ones a few at a time.
+
+:func:`validate_array` and :func:`validate_array_text` validate the items of
+a single large array in parallel instead and :func:`validate_lines` the lines
+of a JSON Lines file.
+"""
+
+import collections
+import gc
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import threading
+import timeit
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+from json_schema_validator import backend, bulk, compression
+from json_schema_validator.bulk import (
+    BLOCK_SIZE,
+    iter_block_ranges,
+    iter_stream_blocks,
+    validate_blocks,
+)
+from json_schema_validator.columnar import ColumnarValidator
+from json_schema_validator.compiled import CompiledValidator, _Compiler
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import (
+    StreamingValidator,
+    _get_item_constraints,
+    _is_streamable,
+)
+from json_schema_validator.validator import Validator
+
+
+# Number of documents in the first chunk sent to each worker
+CHUNK_SIZE = 16
+
+# Maximum number of documents in a chunk
+MAX_CHUNK_SIZE = 4096
+
+# Number of seconds a worker should spend on a chunk
+CHUNK_TIME = 0.05
+
+# Number of chunks per worker sent ahead of the results
+CHUNKS_AHEAD = 2
+
+# Number of seconds between two checks that the workers are alive
+WAIT_INTERVAL = 0.5
+
+# Number of ranges per worker that the items of an array are split into
+RANGES_PER_WORKER = 4
+
+# Minimum number of items of arrays validated by validate_array()
+ARRAY_THRESHOLD = 100000
+
+# Minimum number of bytes of text validated by validate_array_text()
+TEXT_THRESHOLD = 16 << 20
+
+_WHITESPACE = b" \t\n\r"
+
+# Jobs that are running, inherited by forked workers
+_jobs = {}
+_jobs_lock = threading.Lock()
+_job_ids = itertools.count()
+
+# Job of a worker process
+_job = None
+
+
+def _get_context():
+    """
+    Get the multiprocessing context to start workers with.
+
+    :returns:
+        A tuple (context, forks) where forks tells if the workers are forked
+        from the calling process.
+    """
+    get_context = getattr(multiprocessing, "get_context", None)
+    if get_context is None:
+        return multiprocessing, os.name == "posix"
+    if "fork" in multiprocessing.get_all_start_methods():
+        return get_context("fork"), True
+    return get_context(), False
+
+
+def _init_inherited(started, job_id):
+    """Initialize a forked worker with the job of its parent."""
+    global _job
+    if started is not None:
+        started.put(os.getpid())
+    _job = _jobs[job_id]
+
+
+def _init_made(started, make_job, args):
+    """Initialize a worker that was not forked by making its job again."""
+    global _job
+    if started is not None:
+        started.put(os.getpid())
+    _job = make_job(*args)
+
+
+def _make_compiled_validator(schema_json, validator_class):
+    return CompiledValidator(Schema(schema_json), validator_class)
+
+
+def _validate_chunk(start, documents):
+    """
+    Validate a chunk of documents in a worker.
+
+    :returns:
+        A tuple (start, count, errors, exception, elapsed) where errors is a
+        list of tuples (index, error) for the invalid documents, exception is
+        the unexpected exception that stopped the validation, if any, and
+        elapsed is the number of seconds spent.
+    """
+    began = timeit.default_timer()
+    errors = []
+    try:
+        for index, obj in enumerate(documents, start):
+            try:
+                _job.validate(obj)
+            except ValidationError as exc:
+                errors.append((index, exc))
+    except Exception as exc:
+        return start, len(documents), None, exc, 0.0
+    return (start, len(documents), errors, None,
+            timeit.default_timer() - began)
+
+
+def _adjust_chunk_size(chunk_size, count, elapsed):
+    """Get the size of the next chunk from the time spent on the last one."""
+    if elapsed <= 0:
+        return min(chunk_size * 2, MAX_CHUNK_SIZE)
+    best = int(count * CHUNK_TIME / elapsed)
+    # Move half way to avoid reacting too much to a single chunk
+    chunk_size = (chunk_size + best) // 2
+    return max(1, min(chunk_size, MAX_CHUNK_SIZE))
+
+
+def _iter_results(start, count, errors):
+    """Get the result of each document of a chunk."""
+    errors = dict(errors)
+    for index in range(start, start + count):
+        yield index, errors.get(index)
+
+
+def _get_worker_pids(started, pids):
+    """
+    Get the process ids of the workers started so far.
+
+    Each worker puts its process id on started when it starts, see
+    :func:`_start_pool`.
+
+    :param pids:
+        Process ids of the workers known already
+    """
+    pids = set(pids)
+    while True:
+        try:
+            pids.add(started.get_nowait())
+        except queue.Empty:
+            return frozenset(pids)
+
+
+def _wait_for_chunk(done, pending, started, pids):
+    """
+    Wait for the result of a chunk put on done.
+
+    Chunks that could not be sent or whose result could not be received are
+    never put on done, their :class:`multiprocessing.pool.AsyncResult`, in
+    pending, holds the error instead. Pools also silently replace workers that
+    die, and the chunk they were working on is lost. Waiting stops with an
+    error when workers other than the ones started, pids, were started.
+    """
+    while True:
+        try:
+            return done.get(timeout=WAIT_INTERVAL)
+        except queue.Empty:
+            pass
+        for result in pending.values():
+            if result.ready() and not result.successful():
+                # Raises the error of the chunk
+                result.get()
+        if _get_worker_pids(started, pids) != pids:
+            raise RuntimeError("A worker process died")
+
+
+def _start_pool(job, workers, make_job, args, started=None):
+    """
+    Start the worker processes of a job.
+
+    Forked workers inherit job, the others make it with make_job(*args).
+    If started is a queue of the context of :func:`_get_context`, each
+    worker puts its process id on it when it starts.
+
+    :returns:
+        A tuple (pool, job_id) where job_id is None if the workers were not
+        forked.
+    """
+    context, forks = _get_context()
+    if not forks:
+        return context.Pool(
+            workers, _init_made, (started, make_job, args)), None
+    with _jobs_lock:
+        job_id = next(_job_ids)
+        _jobs[job_id] = job
+        freeze = getattr(gc, "freeze", None)
+        if freeze is not None:
+            # Objects that exist now are never looked at by the garbage
+            # collector of the workers
+            freeze()
+        try:
+            pool = context.Pool(
+                workers, _init_inherited, (started, job_id))
+        finally:
+            if freeze is not None:
+                gc.unfreeze()
+    return pool, job_id
+
+
+def _stop_pool(pool, job_id):
+    pool.terminate()
+    pool.join()
+    if job_id is not None:
+        with _jobs_lock:
+            del _jobs[job_id]
+
+
+def validate_many(schema, documents, workers=None, ordered=True,
+                  validator_class=Validator):
+    """
+    Validate many JSON objects in parallel.
+
+    :param schema:
+        Schema to validate each document against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param documents:
+        Iterable of JSON objects to validate. It is consumed as the workers
+        need more documents, so it may be a generator of any length.
+    :param workers:
+        Number of worker processes, the number of CPUs by default. With a
+        single worker the documents are validated in the calling process.
+    :param ordered:
+        If True, results are produced in the order of the documents.
+        Otherwise they are produced as soon as they are available, in chunks
+        of consecutive documents.
+    :param validator_class:
+        Class of the validator used to report errors, see
+        :class:`json_schema_validator.compiled.CompiledValidator`
+    :returns:
+        A generator of tuples (index, error), one for each document, where
+        index is the position of the document in documents and error is the
+        :class:`json_schema_validator.errors.ValidationError` describing the
+        problem or None if the document is valid.
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    if not isinstance(schema, Schema):
+        raise ValueError(
+            "schema value {0!r} is not a Schema"
+            " object".format(schema))
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    validator = CompiledValidator(schema, validator_class)
+    if workers <= 1:
+        return _validate_serially(validator, documents)
+    return _validate_in_pool(validator, documents, workers, ordered)
+
+
+def _validate_serially(validator, documents):
+    for index, obj in enumerate(documents):
+        try:
+            validator.validate(obj)
+        except ValidationError as exc:
+            yield index, exc
+        else:
+            yield index, None
+
+
+def _validate_in_pool(validator, documents, workers, ordered):
+    documents = iter(documents)
+    started = _get_context()[0].Queue()
+    pool, job_id = _start_pool(
+        validator, workers, _make_compiled_validator,
+        (validator.schema._schema, validator._validator_class), started)
+    done = queue.Queue()
+    try:
+        pids = frozenset(started.get() for i in range(workers))
+        chunk_size = CHUNK_SIZE
+        # Results that are waiting for the results of earlier documents
+        waiting = {}
+        next_index = 0
+        start = 0
+        # Number of chunks that were sent and not produced yet
+        outstanding = 0
+        # Results of the chunks that were sent, by start, until they arrive
+        pending = {}
+        exhausted = False
+        while True:
+            while not exhausted and outstanding < workers * CHUNKS_AHEAD:
+                chunk = list(itertools.islice(documents, chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                pending[start] = pool.apply_async(
+                    _validate_chunk, (start, chunk), callback=done.put)
+                start += len(chunk)
+                outstanding += 1
+            if outstanding == 0:
+                break
+            chunk_start, count, errors, exception, elapsed = \
+                _wait_for_chunk(done, pending, started, pids)
+            del pending[chunk_start]
+            if exception is not None:
+                raise exception
+            chunk_size = _adjust_chunk_size(chunk_size, count, elapsed)
+            if not ordered:
+                outstanding -= 1
+                for result in _iter_results(chunk_start, count, errors):
+                    yield result
+                continue
+            waiting[chunk_start] = count, errors
+            while next_index in waiting:
+                count, errors = waiting.pop(next_index)
+                outstanding -= 1
+                for result in _iter_results(next_index, count, errors):
+                    yield result
+                next_index += count
+    finally:
+        _stop_pool(pool, job_id)
+
+
+class _ArrayJob(object):
+    """
+    Validation of the items of a top-level array.
+
+    :param obj:
+        The array, if it was parsed
+    :param data:
+        The JSON text of the array, if it was not
+    """
+
+    def __init__(self, schema, validator_class, obj=None, data=None):
+        self.schema = schema
+        self.validator_class = validator_class
+        self.obj = obj
+        self.data = data
+        self.items = schema.items
+        self.additional = schema.additionalProperties
+        self._compiler = _Compiler(validator_class.JSON_TYPE_MAP)
+        self._constraints = None
+        if isinstance(self.items, dict):
+            # The same for every item
+            self._constraints = self.get_constraints(0)
+
+    def get_constraints(self, index):
+        """
+        Get the schemas of the item at index.
+
+        :returns:
+            A list of (schema, schema path, check) tuples
+        """
+        if self._constraints is not None:
+            return self._constraints
+        return [
+            (schema, schema_path, self._compiler.compile(schema._schema))
+            for schema, schema_path in _get_item_constraints(
+                self.items, self.additional, index)]
+
+    def validate_item(self, index, item):
+        """
+        Validate the item at index.
+
+        :returns:
+            The :class:`json_schema_validator.errors.ValidationError` of the
+            item or None if it is valid
+        """
+        for schema, schema_path, check in self.get_constraints(index):
+            if check is None:
+                continue
+            try:
+                valid = check(item)
+            except Exception:
+                valid = False
+            if valid:
+                continue
+            context = self.validator_class()
+            context._object_stack = [
+                (self.obj, "object"), (item, "[%d]" % index)]
+            context._schema_stack = [
+                (self.schema, "schema"), (schema, schema_path)]
+            try:
+                context._validate()
+            except ValidationError as exc:
+                return exc
+
+
+def _make_array_job(schema_json, validator_class):
+    return _ArrayJob(Schema(schema_json), validator_class)
+
+
+def _validate_item_range(start, end, items=None):
+    """
+    Validate the items of a parsed array from start to end in a worker.
+
+    :param items:
+        The items, if the worker did not inherit the array
+    :returns:
+        The error of the first invalid item or None
+    """
+    job = _job
+    if items is None:
+        items = job.obj
+        offset = 0
+    else:
+        offset = start
+    for index in range(start, end):
+        error = job.validate_item(index, items[index - offset])
+        if error is not None:
+            return error
+
+
+def _validate_text_range(start, end, text=None):
+    """
+    Validate the items of the JSON text of an array in a worker.
+
+    :param start:
+        Offset of the first item in the text of the array
+    :param end:
+        Offset of the end of the last item
+    :param text:
+        The text from start to end, if the worker did not inherit it
+    :returns:
+        A tuple (count, valid) with the number of items and False if any item
+        is invalid or if the text is not valid JSON
+    """
+    job = _job
+    if text is None:
+        text = job.data[start:end]
+    try:
+        items = backend.loads(b"[" + bytes(text) + b"]")
+    except ValueError:
+        return 0, False
+    for index, item in enumerate(items):
+        if job.validate_item(index, item) is not None:
+            return len(items), False
+    return len(items), True
+
+
+def _run_ranges(job, workers, func, tasks):
+    """
+    Run func(*args) in workers for each args of tasks.
+
+    :returns:
+        A generator of the results, in the order of the tasks. The workers
+        are stopped when the generator is closed.
+    """
+    pool, job_id = _start_pool(
+        job, workers, _make_array_job,
+        (job.schema._schema, job.validator_class))
+    try:
+        results = [pool.apply_async(func, args) for args in tasks]
+        for result in results:
+            yield result.get()
+    finally:
+        _stop_pool(pool, job_id)
+
+
+def validate_array(schema, obj, workers=None, threshold=ARRAY_THRESHOLD,
+                   validator_class=Validator):
+    """
+    Validate a large array, its items in parallel.
+
+    The items are split into contiguous ranges that are validated by a pool of
+    worker processes. Where workers are forked they inherit the array instead
+    of receiving a copy of their items. The error of the first invalid item
+    is reported, so the result is the same as that of
+    ``validator_class.validate(schema, obj)``, which is what validates arrays
+    of less than threshold items, other objects and arrays whose schema needs
+    to look at all the items at once (like ``uniqueItems``).
+
+    :param schema:
+        Schema to validate against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param obj:
+        JSON object to validate
+    :param workers:
+        Number of worker processes, the number of CPUs by default
+    :param threshold:
+        Minimum number of items to validate in parallel
+    :param validator_class:
+        Class of the validator to use
+    :returns:
+        True on success
+    :raises `json_schema_validator.errors.ValidationError`:
+        if the object does not match schema.
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    if not isinstance(schema, Schema):
+        raise ValueError(
+            "schema value {0!r} is not a Schema"
+            " object".format(schema))
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1 or not isinstance(obj, list) or len(obj) < threshold or \
+            not _is_streamable(schema._schema, "array"):
+        return validator_class.validate(schema, obj)
+    # Same checks, in the same order, as validator_class
+    context = validator_class()
+    context._object_stack = [(obj, "object")]
+    context._schema_stack = [(schema, "schema")]
+    context._validate_type()
+    context._validate_requires()
+    if schema.items != {}:
+        context._validate_item_count(len(obj))
+        if isinstance(schema.items, list):
+            context._validate_tuple_length(len(obj))
+        job = _ArrayJob(schema, validator_class, obj=obj)
+        forks = _get_context()[1]
+        tasks = []
+        for start, end in _split_range(len(obj), workers * RANGES_PER_WORKER):
+            tasks.append((start, end, None if forks else obj[start:end]))
+        results = _run_ranges(job, workers, _validate_item_range, tasks)
+        try:
+            for error in results:
+                if error is not None:
+                    raise error
+        finally:
+            results.close()
+    context._report_unsupported()
+    return True
+
+
+def validate_array_text(schema, data, workers=None, threshold=TEXT_THRESHOLD):
+    """
+    Validate the JSON text of a large array, its items in parallel.
+
+    The text is split into ranges of whole items without parsing it and the
+    ranges are parsed and validated by a pool of worker processes, so the
+    parsed items are never sent between processes. Where workers are forked
+    they inherit the text too. If the array is invalid, it is validated
+    again with :meth:`json_schema_validator.streaming.StreamingValidator.validate`,
+    which stops at the first error, to report it. The result is always the
+    same as that of ``StreamingValidator.validate()``, which is what validates
+    texts of less than threshold bytes, texts of other values and arrays
+    whose schema needs to look at all the items at once (like ``uniqueItems``)
+    or describes each item separately.
+
+    :param schema:
+        Schema to validate against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param data:
+        JSON text to validate, as :class:`str` or as UTF-8 encoded
+        :class:`bytes`, :class:`bytearray`, :class:`memoryview` or
+        :class:`mmap.mmap`
+    :param workers:
+        Number of worker processes, the number of CPUs by default
+    :param threshold:
+        Minimum number of bytes to validate in parallel
+    :returns:
+        True on success
+    :raises `json_schema_validator.errors.ValidationError`:
+        if the text does not match schema.
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    :raises ValueError:
+        if the text is not valid JSON
+    """
+    if not isinstance(schema, Schema):
+        raise ValueError(
+            "schema value {0!r} is not a Schema"
+            " object".format(schema))
+    if isinstance(data, type(u"")):
+        data = data.encode("utf-8")
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers > 1 and len(data) >= threshold and \
+            _is_streamable(schema._schema, "array") and \
+            isinstance(schema.items, dict) and \
+            _is_valid_array_text(schema, data, workers):
+        return True
+    return StreamingValidator.validate(schema, io.BytesIO(data))
+
+
+def _is_valid_array_text(schema, data, workers):
+    """
+    Check if the JSON text of an array is valid, its items in parallel.
+
+    :returns:
+        True if data is valid, False if it is invalid or is not an array.
+    """
+    ranges = _split_array_text(bytes(data), workers * RANGES_PER_WORKER)
+    if ranges is None:
+        return False
+    # The array itself is not needed by the checks below
+    context = Validator()
+    context._object_stack = [([], "object")]
+    context._schema_stack = [(schema, "schema")]
+    try:
+        context._validate_type()
+        context._validate_requires()
+    except ValidationError:
+        return False
+    count = 0
+    if ranges:
+        job = _ArrayJob(schema, Validator, data=data)
+        forks = _get_context()[1]
+        tasks = []
+        for start, end in ranges:
+            tasks.append((start, end, None if forks else data[start:end]))
+        results = _run_ranges(job, workers, _validate_text_range, tasks)
+        try:
+            for range_count, valid in results:
+                if not valid:
+                    return False
+                count += range_count
+        finally:
+            results.close()
+    try:
+        if schema.items != {}:
+            context._validate_item_count(count)
+        context._report_unsupported()
+    except ValidationError:
+        return False
+    return True
+
+
+def _split_range(count, parts):
+    """Split range(count) into about parts contiguous (start, end) ranges."""
+    step = max(1, -(-count // parts))
+    return [(start, min(start + step, count))
+            for start in range(0, count, step)]
+
+
+def _get_depth_change(text, start, end):
+    return (text.count(b"[", start, end) + text.count(b"{", start, end) -
+            text.count(b"]", start, end) - text.count(b"}", start, end))
+
+
+def _find_item_end(text, pos, end, depth):
+    """
+    Find the first comma between two items of the top-level array.
+
+    :param pos:
+        Offset, outside strings, where to start looking
+    :param depth:
+        Nesting depth at pos
+    :returns:
+        A tuple (comma, depth) with the offset of the comma, or -1 if there
+        is none before end, and the nesting depth after it.
+    """
+    while True:
+        comma = text.find(b",", pos, end)
+        if comma < 0:
+            return comma, depth
+        if text.count(b"\"", pos, comma) % 2:
+            # The comma is inside a string, continue after the string
+            close = text.find(b"\"", comma, end)
+            if close < 0:
+                return close, depth
+            depth += _get_depth_change(text, pos, close)
+            pos = close + 1
+            continue
+        depth += _get_depth_change(text, pos, comma)
+        pos = comma + 1
+        if depth == 1:
+            return comma, depth
+
+
+def _split_array_text(data, parts):
+    """
+    Split the JSON text of an array into about parts ranges of whole items.
+
+    This only looks at the quotes, brackets, braces and commas of the text,
+    with fast string methods, and does not check that the text is valid JSON.
+    Brackets and braces inside strings are counted as well, so strings with
+    unbalanced brackets may produce ranges that are not made of whole items.
+    Those ranges are not valid JSON on their own.
+
+    :returns:
+        A list of (start, end) tuples with the offsets of the ranges, which
+        hold comma separated items, or None if data is not an array.
+    """
+    # Quotes are then only found at the start and at the end of strings
+    text = data.replace(b"\\\\", b"  ").replace(b"\\\"", b"  ")
+    first = len(text) - len(text.lstrip(_WHITESPACE))
+    last = len(text.rstrip(_WHITESPACE))
+    if text[first:first + 1] != b"[" or text[last - 1:last] != b"]" or \
+            last - first < 2:
+        return
+    first += 1
+    last -= 1
+    if not text[first:last].strip(_WHITESPACE):
+        return []
+    ranges = []
+    step = max(1, (last - first) // parts)
+    range_start = pos = first
+    depth = 1
+    for target in range(first + step, last, step):
+        if target <= pos:
+            continue
+        if text.count(b"\"", pos, target) % 2:
+            # The target is inside a string, start after the string
+            target = text.find(b"\"", target, last) + 1
+            if target <= 0:
+                break
+        depth += _get_depth_change(text, pos, target)
+        comma, depth = _find_item_end(text, target, last, depth)
+        if comma < 0:
+            break
+        ranges.append((range_start, comma))
+        range_start = pos = comma + 1
+    ranges.append((range_start, last))
+    return ranges
+
+
+class _LinesJob(object):
+    """
+    Validation of the lines of a JSON Lines file.
+
+    :param buf:
+        Buffer shared with the parent that holds the text of the blocks, or
+        None if the blocks are sent with the tasks
+    :param memory:
+        :class:`multiprocessing.shared_memory.SharedMemory` object of buf,
+        if any, kept so that buf stays valid
+    """
+
+    def __init__(self, schema, validator_class, buf=None, memory=None):
+        self.schema = schema
+        self.validator_class = validator_class
+        self.buf = buf
+        self.memory = memory
+
+
+def _make_lines_job(schema_json, validator_class, path, memory_name):
+    buf = memory = None
+    if path is not None:
+        with open(path, "rb") as stream:
+            buf = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    elif memory_name is not None:
+        memory = shared_memory.SharedMemory(memory_name)
+        buf = memory.buf
+    return _LinesJob(Schema(schema_json), validator_class, buf, memory)
+
+
+def _validate_line_block(start, end, offset, block=None):
+    """
+    Validate a block of lines in a worker.
+
+    :param start:
+        Offset of the block in the shared buffer
+    :param end:
+        Offset of the end of the block in the shared buffer
+    :param offset:
+        Offset of the block in the text
+    :param block:
+        The block, if it is not in the shared buffer
+    :returns:
+        A tuple (count, errors) with the number of newlines of the block and
+        a list of (line index, offset, error) tuples for its invalid lines.
+        The line index is counted from the first line of the block.
+    """
+    job = _job
+    if block is None:
+        block = bytes(job.buf[start:end])
+    errors = []
+    for line_no, line_offset, error in validate_blocks(
+            job.schema, [(offset, block)], job.validator_class):
+        if not isinstance(error, ValidationError):
+            # Decoding errors may hold the whole block
+            error = ValueError(str(error))
+        errors.append((line_no - 1, line_offset, error))
+    return block.count(b"\n"), errors
+
+
+def _run_in_order(pool, func, tasks, ahead):
+    """
+    Run func(*args) in pool for each args of tasks.
+
+    No more than ahead tasks are running or waiting at a time. The next
+    args is taken from tasks only once the result of an earlier task has
+    been produced.
+
+    :returns:
+        A generator of the results, in the order of the tasks
+    """
+    pending = collections.deque()
+    tasks = iter(tasks)
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < ahead:
+            try:
+                args = next(tasks)
+            except StopIteration:
+                exhausted = True
+                break
+            pending.append(pool.apply_async(func, args))
+        if not pending:
+            return
+        yield pending.popleft().get()
+
+
+def _iter_shared_blocks(blocks, memory, slot_size, slots):
+    """
+    Copy blocks to the slots of shared memory, in turn.
+
+    :returns:
+        A generator of the args of :func:`_validate_line_block` for each
+        block. Blocks larger than a slot are sent with the args.
+    """
+    for number, (offset, block) in enumerate(blocks):
+        if memory is None or len(block) > slot_size:
+            yield 0, 0, offset, block
+            continue
+        start = (number % slots) * slot_size
+        memory.buf[start:start + len(block)] = block
+        yield start, start + len(block), offset, None
+
+
+def validate_lines(schema, path, workers=None,
+                   validator_class=ColumnarValidator, block_size=BLOCK_SIZE):
+    """
+    Validate each line of a JSON Lines file, blocks of lines in parallel.
+
+    Blocks of whole lines are validated by a pool of worker processes. The
+    text itself is never sent to the workers: they map the file to memory,
+    or inherit its mapping when they are forked, and only get the offsets of
+    their block. Compressed files are decompressed by the calling process
+    into a ring of :class:`multiprocessing.shared_memory.SharedMemory`
+    slots, where Python has it. Workers send back only their errors.
+
+    :param schema:
+        Schema to validate each line against
+    :type schema:
+        :class:`json_schema_validator.schema.Schema`
+    :param path:
+        Path of the file, as for
+        :func:`json_schema_validator.bulk.validate_lines`
+    :param workers:
+        Number of worker processes, the number of CPUs by default. With a
+        single worker the file is validated in the calling process.
+    :param validator_class:
+        Class of the validator to use
+    :param block_size:
+        Approximate number of bytes validated by a worker at a time
+    :returns:
+        Same as :func:`json_schema_validator.bulk.validate_lines`, except
+        that lines that are not valid JSON are reported with a plain
+        :class:`ValueError`.
+    :raises `json_schema_validator.errors.SchemaError`:
+        if the schema itself is wrong.
+    """
+    if not isinstance(schema, Schema):
+        raise ValueError(
+            "schema value {0!r} is not a Schema"
+            " object".format(schema))
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        return bulk.validate_lines(schema, path, validator_class, block_size)
+    return _validate_lines(schema, path, workers, validator_class, block_size)
+
+
+def _validate_lines(schema, path, workers, validator_class, block_size):
+    with open(path, "rb") as stream:
+        kind = compression.detect_compression(
+            stream.read(compression.MAGIC_SIZE))
+        stream.seek(0)
+        if kind is None:
+            results = _validate_mapped_lines(
+                schema, path, stream, workers, validator_class, block_size)
+        else:
+            results = _validate_decompressed_lines(
+                schema, stream, workers, validator_class, block_size)
+        line_no = 1
+        try:
+            for count, errors in results:
+                for index, offset, error in errors:
+                    yield line_no + index, offset, error
+                line_no += count
+        finally:
+            results.close()
+
+
+def _validate_mapped_lines(schema, path, stream, workers, validator_class,
+                           block_size):
+    try:
+        buf = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files cannot be mapped
+        return
+    try:
+        job = _LinesJob(schema, validator_class, buf)
+        pool, job_id = _start_pool(
+            job, workers, _make_lines_job,
+            (schema._schema, validator_class, path, None))
+        try:
+            tasks = (
+                (start, end, start)
+                for start, end in iter_block_ranges(buf, 0, block_size))
+            for result in _run_in_order(
+                    pool, _validate_line_block, tasks,
+                    workers * CHUNKS_AHEAD):
+                yield result
+        finally:
+            _stop_pool(pool, job_id)
+    finally:
+        buf.close()
+
+
+def _validate_decompressed_lines(schema, stream, workers, validator_class,
+                                 block_size):
+    slots = workers * CHUNKS_AHEAD
+    # Blocks of iter_stream_blocks() hold the rest of the previous read
+    slot_size = 2 * block_size
+    memory = None
+    if shared_memory is not None:
+        memory = shared_memory.SharedMemory(
+            create=True, size=slots * slot_size)
+    try:
+        if memory is not None:
+            job = _LinesJob(schema, validator_class, memory.buf, memory)
+            args = (schema._schema, validator_class, None, memory.name)
+        else:
+            job = _LinesJob(schema, validator_class)
+            args = (schema._schema, validator_class, None, None)
+        pool, job_id = _start_pool(job, workers, _make_lines_job, args)
+        try:
+            with compression.open_decompressed(stream) as reader:
+                tasks = _iter_shared_blocks(
+                    iter_stream_blocks(reader, 0, block_size),
+                    memory, slot_size, slots)
+                for result in _run_in_order(
+                        pool, _validate_line_block, tasks, slots):
+                    yield result
+        finally:
+            _stop_pool(pool, job_id)
+    finally:
+        if memory is not None:
+            memory.close()
+            memory.unlink()
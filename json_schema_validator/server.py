@@ -0,0 +1,490 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Validation daemon and its client.
+
+A :class:`ValidationServer` loads the schemas of a directory once, compiles
+them and validates documents sent by any number of local processes, over a
+Unix domain socket or a TCP port of the loopback interface. Short lived tools
+then pay neither the interpreter startup nor the compilation of the schemas.
+Start it with::
+
+    python -m json_schema_validator.server SCHEMA_DIR --socket PATH
+
+Requests and replies are binary frames sent over persistent connections. A
+request is made of a header, the id of the schema and the JSON text of the
+document::
+
+    >HI  length of the schema id, length of the document
+         schema id, UTF-8 encoded
+         document, UTF-8 encoded JSON text
+
+The id of a schema is the name of its file without the ``.json`` extension.
+A reply is made of a header and a body::
+
+    >BI  status, length of the body
+         body
+
+The status is :data:`VALID` with an empty body, :data:`INVALID` with a JSON
+object holding the ``new_message``, ``object_expr`` and ``schema_expr`` of
+the :class:`json_schema_validator.errors.ValidationError` or :data:`FAILED`
+with a UTF-8 encoded message if the document could not be validated, for
+example because it is larger than the maximum size of the server. Clients
+may send several requests before reading the replies, which come in the order
+of the requests. :class:`Client` and :class:`ConnectionPool` implement the
+client side.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import threading
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from json_schema_validator import backend
+from json_schema_validator.compiled import CompiledValidator
+from json_schema_validator.errors import SchemaError, ValidationError
+from json_schema_validator.schema import Schema
+
+
+# Statuses of replies
+VALID = 0
+INVALID = 1
+FAILED = 2
+
+# Maximum number of requests a client sends before reading the replies
+WINDOW = 64
+
+# Default maximum size of the JSON text of a document, in bytes
+MAX_DOCUMENT_SIZE = 64 * 1024 * 1024
+
+# Number of bytes read at a time from documents over the maximum size
+SKIP_SIZE = 64 * 1024
+
+_REQUEST = struct.Struct(">HI")
+_REPLY = struct.Struct(">BI")
+
+try:
+    _RecursionError = RecursionError
+except NameError:
+    # Python 2 raises RuntimeError when the recursion limit is reached
+    _RecursionError = RuntimeError
+
+
+def _read_exactly(rfile, size):
+    """Read size bytes, or None at the end of the stream."""
+    data = rfile.read(size)
+    if len(data) != size:
+        if data:
+            raise EOFError("Connection closed in the middle of a frame")
+        return
+    return data
+
+
+def _skip_exactly(rfile, size):
+    """Read and drop size bytes, or return None at the end of the stream."""
+    while size:
+        data = rfile.read(min(size, SKIP_SIZE))
+        if not data:
+            return
+        size -= len(data)
+    return b""
+
+
+class ValidationServer(object):
+    """
+    Validator of documents against a set of preloaded schemas.
+
+    :param schemas:
+        Dictionary mapping schema ids to
+        :class:`json_schema_validator.schema.Schema` objects
+    :param max_document_size:
+        Maximum size of the JSON text of a document, in bytes. Larger
+        documents are skipped and get a :data:`FAILED` reply.
+    """
+
+    def __init__(self, schemas, max_document_size=MAX_DOCUMENT_SIZE):
+        self.validators = dict(
+            (schema_id, CompiledValidator(schema))
+            for schema_id, schema in schemas.items())
+        self.max_document_size = max_document_size
+
+    @classmethod
+    def from_directory(cls, path, max_document_size=MAX_DOCUMENT_SIZE):
+        """
+        Load the schemas of a directory.
+
+        :param path:
+            Path of the directory. Each ``.json`` file holds a schema.
+        :param max_document_size:
+            As for :class:`ValidationServer`
+        """
+        schemas = {}
+        for name in sorted(os.listdir(path)):
+            schema_id, ext = os.path.splitext(name)
+            if ext != ".json":
+                continue
+            with open(os.path.join(path, name), "rb") as stream:
+                schemas[schema_id] = Schema(backend.loads(stream.read()))
+        return cls(schemas, max_document_size)
+
+    def validate(self, schema_id, data):
+        """
+        Validate a document.
+
+        :param schema_id:
+            Id of the schema to validate against, UTF-8 encoded
+        :param data:
+            UTF-8 encoded JSON text of the document
+        :returns:
+            A tuple (status, body) for the reply
+        """
+        try:
+            if isinstance(schema_id, bytes):
+                schema_id = schema_id.decode("utf-8")
+            validator = self.validators[schema_id]
+        except UnicodeDecodeError:
+            return FAILED, u"Schema id is not valid UTF-8".encode("utf-8")
+        except KeyError:
+            return FAILED, u"Unknown schema {0!r}".format(
+                schema_id).encode("utf-8")
+        try:
+            validator.validate(backend.loads(data))
+        except ValidationError as exc:
+            return INVALID, json.dumps({
+                "new_message": exc.new_message,
+                "object_expr": exc.object_expr,
+                "schema_expr": exc.schema_expr,
+            }, separators=(",", ":")).encode("utf-8")
+        except (SchemaError, ValueError, NotImplementedError) as exc:
+            return FAILED, u"{0}".format(exc).encode("utf-8")
+        except _RecursionError:
+            return FAILED, u"Document is nested too deeply".encode("utf-8")
+        except Exception as exc:
+            # Whatever else goes wrong is reported to the client, not to the
+            # thread of the connection
+            return FAILED, u"{0}: {1}".format(
+                type(exc).__name__, exc).encode("utf-8")
+        return VALID, b""
+
+    def handle(self, rfile, wfile):
+        """Serve the requests of a connection until it is closed."""
+        while True:
+            header = _read_exactly(rfile, _REQUEST.size)
+            if header is None:
+                return
+            id_size, data_size = _REQUEST.unpack(header)
+            schema_id = _read_exactly(rfile, id_size)
+            if data_size > self.max_document_size:
+                # Skip the document without holding it in memory
+                data = _skip_exactly(rfile, data_size)
+            else:
+                data = _read_exactly(rfile, data_size)
+            if schema_id is None or data is None:
+                raise EOFError("Connection closed in the middle of a frame")
+            if data_size > self.max_document_size:
+                status = FAILED
+                body = u"Document is larger than {0} bytes".format(
+                    self.max_document_size).encode("utf-8")
+            else:
+                status, body = self.validate(schema_id, data)
+            wfile.write(_REPLY.pack(status, len(body)) + body)
+
+    def make_unix_server(self, path):
+        """
+        Make a server listening on a Unix domain socket.
+
+        A socket left at path by an earlier server is replaced.
+
+        :returns:
+            A :class:`socketserver.BaseServer`, call its ``serve_forever()``
+            method to serve requests.
+        """
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except OSError:
+            pass
+        server = _ThreadingUnixServer(path, _Handler)
+        server.validation_server = self
+        return server
+
+    def make_tcp_server(self, port, host="127.0.0.1"):
+        """
+        Make a server listening on a TCP port.
+
+        :returns:
+            Same as :meth:`make_unix_server`
+        """
+        server = _ThreadingTCPServer((host, port), _Handler)
+        server.validation_server = self
+        return server
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            self.server.validation_server.handle(self.rfile, self.wfile)
+        except (EOFError, socket.error):
+            pass
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _ThreadingUnixServer(socketserver.ThreadingMixIn,
+                               socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn,
+                          socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Client(object):
+    """
+    Connection to a :class:`ValidationServer`.
+
+    Clients are not thread-safe, use a :class:`ConnectionPool` to share
+    connections between threads.
+
+    :param path:
+        Path of the Unix domain socket of the server
+    :param address:
+        (host, port) tuple of the TCP address of the server, if path is None
+    :param timeout:
+        Timeout of socket operations, in seconds
+    """
+
+    def __init__(self, path=None, address=None, timeout=None):
+        if path is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(path)
+        else:
+            sock = socket.create_connection(address, timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._rfile = sock.makefile("rb")
+
+    def close(self):
+        self._rfile.close()
+        self._sock.close()
+
+    def send(self, schema_id, data):
+        """
+        Send a request without waiting for its reply.
+
+        :param schema_id:
+            Id of the schema to validate against
+        :param data:
+            JSON text of the document, or a JSON object
+        """
+        if not isinstance(data, (bytes, type(u""))):
+            data = json.dumps(data)
+        if isinstance(data, type(u"")):
+            data = data.encode("utf-8")
+        schema_id = schema_id.encode("utf-8")
+        self._sock.sendall(
+            _REQUEST.pack(len(schema_id), len(data)) + schema_id + data)
+
+    def receive(self):
+        """
+        Read the reply of the oldest request.
+
+        :returns:
+            None if the document is valid or the
+            :class:`json_schema_validator.errors.ValidationError`. Its
+            message is the short message of the error.
+        :raises ValueError:
+            if the server could not validate the document, because the schema
+            is unknown or wrong or the document is not valid JSON or is nested
+            too deeply.
+        """
+        header = _read_exactly(self._rfile, _REPLY.size)
+        if header is None:
+            raise EOFError("Connection closed by the server")
+        status, size = _REPLY.unpack(header)
+        body = _read_exactly(self._rfile, size) if size else b""
+        if status == VALID:
+            return
+        if status == INVALID:
+            error = json.loads(body.decode("utf-8"))
+            return ValidationError(
+                error["new_message"], error["new_message"],
+                error["object_expr"], error["schema_expr"])
+        raise ValueError(body.decode("utf-8"))
+
+    def validate(self, schema_id, data):
+        """
+        Validate a document.
+
+        :returns:
+            True on success
+        :raises `json_schema_validator.errors.ValidationError`:
+            if the document does not match the schema.
+        :raises ValueError:
+            as :meth:`receive`
+        """
+        self.send(schema_id, data)
+        error = self.receive()
+        if error is not None:
+            raise error
+        return True
+
+    def validate_many(self, schema_id, documents):
+        """
+        Validate many documents, without waiting for each reply.
+
+        Up to :data:`WINDOW` requests are sent ahead of the replies.
+
+        :returns:
+            A generator of tuples (index, error), one for each document,
+            where error is as returned by :meth:`receive`.
+        """
+        sent = received = 0
+        for data in documents:
+            self.send(schema_id, data)
+            sent += 1
+            if sent - received >= WINDOW:
+                yield received, self.receive()
+                received += 1
+        while received < sent:
+            yield received, self.receive()
+            received += 1
+
+
+class ConnectionPool(object):
+    """
+    Pool of :class:`Client` connections shared by threads.
+
+    :param size:
+        Maximum number of idle connections kept open
+
+    Other parameters are those of :class:`Client`.
+    """
+
+    def __init__(self, path=None, address=None, timeout=None, size=8):
+        self.path = path
+        self.address = address
+        self.timeout = timeout
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Borrow a connection.
+
+        Connections are returned to the pool at the end of the ``with``
+        block, unless the block raised an exception other than
+        :class:`json_schema_validator.errors.ValidationError`.
+        """
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+        if client is None:
+            client = Client(self.path, self.address, self.timeout)
+        try:
+            yield client
+        except ValidationError:
+            self._release(client)
+            raise
+        except:
+            # The connection may be in the middle of a reply
+            client.close()
+            raise
+        else:
+            self._release(client)
+
+    def _release(self, client):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(client)
+                return
+        client.close()
+
+    def validate(self, schema_id, data):
+        """Validate a document, see :meth:`Client.validate`."""
+        with self.connection() as client:
+            return client.validate(schema_id, data)
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for client in idle:
+            client.close()
+
+
+def main(argv=None):
+    """Run a validation server until it is interrupted."""
+    parser = argparse.ArgumentParser(
+        prog="python -m json_schema_validator.server",
+        description="Validate JSON documents for local clients")
+    parser.add_argument(
+        "schema_dir", help="directory of the schemas, one .json file each")
+    parser.add_argument("--socket", help="path of the Unix domain socket")
+    parser.add_argument(
+        "--port", type=int, help="TCP port to listen on, on localhost")
+    parser.add_argument(
+        "--max-document-size", type=int, default=MAX_DOCUMENT_SIZE,
+        help="maximum size of a document, in bytes (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.socket is None and args.port is None:
+        parser.error("one of --socket and --port is required")
+    validation_server = ValidationServer.from_directory(
+        args.schema_dir, args.max_document_size)
+    servers = []
+    if args.socket is not None:
+        servers.append(validation_server.make_unix_server(args.socket))
+    if args.port is not None:
+        servers.append(validation_server.make_tcp_server(args.port))
+    threads = [
+        threading.Thread(target=server.serve_forever) for server in servers]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        if args.socket is not None and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,23 +19,94 @@
 
 """One liners that make the code shorter."""
 
-try:
-    import simplejson as json
-except ImportError:
-    import json
+import io
+import threading
+import weakref
+from collections import OrderedDict
 
+from json_schema_validator import backend
+from json_schema_validator.decoding import DecodingValidator
 from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import StreamingValidator
 from json_schema_validator.validator import Validator
 
-_default_deserializer = json.loads
+_default_deserializer = backend.loads
 
+# Number of parsed schemas kept by _get_schema()
+SCHEMA_CACHE_SIZE = 128
 
-def validate(schema_text, data_text, deserializer=_default_deserializer):
+_schema_cache = OrderedDict()
+_schema_cache_lock = threading.Lock()
+
+# Interning deserializer of each schema
+_interning_loads = weakref.WeakKeyDictionary()
+
+
+def _get_schema(schema_text, deserializer):
+    """
+    Get the :class:`json_schema_validator.schema.Schema` of schema_text.
+
+    Parsed schemas are cached, the least recently used ones are evicted once
+    there are more than :data:`SCHEMA_CACHE_SIZE` of them.
+    """
+    if not isinstance(schema_text, (bytes, type(u""))):
+        # bytearray and memoryview objects are not hashable
+        schema_text = bytes(schema_text)
+    key = (schema_text, deserializer)
+    with _schema_cache_lock:
+        try:
+            schema = _schema_cache.pop(key)
+        except KeyError:
+            schema = None
+        else:
+            _schema_cache[key] = schema
+    if schema is None:
+        schema = Schema(deserializer(schema_text))
+        with _schema_cache_lock:
+            _schema_cache[key] = schema
+            while len(_schema_cache) > SCHEMA_CACHE_SIZE:
+                _schema_cache.popitem(last=False)
+    return schema
+
+
+def _get_property_names(schema_json, names=None):
+    """Get the property names used anywhere in a schema."""
+    if names is None:
+        names = []
+    if isinstance(schema_json, dict):
+        properties = schema_json.get("properties")
+        if isinstance(properties, dict):
+            names.extend(properties)
+        for value in schema_json.values():
+            _get_property_names(value, names)
+    elif isinstance(schema_json, list):
+        for value in schema_json:
+            _get_property_names(value, names)
+    return names
+
+
+def _get_data_deserializer(schema, deserializer, intern_keys):
+    """Get the function that converts data validated against schema."""
+    if not intern_keys:
+        return deserializer
+    with _schema_cache_lock:
+        try:
+            return _interning_loads[schema]
+        except KeyError:
+            loads = _interning_loads[schema] = backend.make_interning_loads(
+                _get_property_names(schema._schema))
+            return loads
+
+
+def validate(schema_text, data_text, deserializer=_default_deserializer,
+             intern_keys=False, limits=None):
     """
     Validate specified JSON text with specified schema.
 
-    Both arguments are converted to JSON objects with :func:`simplejson.loads`,
-    if present, or :func:`json.loads`.
+    Both arguments are converted to JSON objects with
+    :func:`json_schema_validator.backend.loads`, which uses the fastest JSON
+    decoder available. The parsed schema is cached and reused by later calls
+    with the same schema text.
 
     :param schema_text:
         Text of the JSON schema to check against
@@ -44,23 +115,145 @@ def validate(schema_text, data_text, deserializer=_default_deserializer):
     :param data_text:
         Text of the JSON object to check
     :type data_text:
-        :class:`str`
+        :class:`str`, or UTF-8 encoded :class:`bytes`, :class:`bytearray` or
+        :class:`memoryview`
     :param deserializer:
         Function to convert the schema and data to JSON objects
     :type deserializer:
         :class:`callable`
+    :param intern_keys:
+        If True, the data is converted with a function made by
+        :func:`json_schema_validator.backend.make_interning_loads` instead
+        of deserializer. Objects converted by all calls with the same schema
+        share their keys, and keys that are property names of the schema are
+        the strings of the schema. This saves memory when many similar
+        documents are kept.
+    :param limits:
+        Optional :class:`json_schema_validator.limits.Limits` of the
+        validation. Parsing the text is not limited.
     :returns:
         Same as :meth:`json_schema_validator.validator.Validator.validate`
     :raises:
-        Whatever may be raised by simplejson (in particular
-        :class:`simplejson.decoder.JSONDecoderError`, a subclass of
-        :class:`ValueError`) or json
+        :class:`ValueError` (or a subclass) if the text is not valid JSON
     :raises:
         Whatever may be raised by
         :meth:`json_schema_validator.validator.Validator.validate`. In particular
         :class:`json_schema_validator.errors.ValidationError` and
         :class:`json_schema_validator.errors.SchemaError`
     """
-    schema = Schema(deserializer(schema_text))
-    data = deserializer(data_text)
-    return Validator.validate(schema, data)
+    schema = _get_schema(schema_text, deserializer)
+    data = _get_data_deserializer(schema, deserializer, intern_keys)(data_text)
+    return Validator.validate(schema, data, limits)
+
+
+def decode(schema_text, data_text, deserializer=_default_deserializer,
+           intern_keys=False, limits=None):
+    """
+    Validate specified JSON text with specified schema and decode it.
+
+    This is like :func:`validate` but values with a format are decoded in the
+    same pass. Strings with the date-time format become
+    :class:`datetime.datetime` objects.
+
+    :param schema_text:
+        Text of the JSON schema to check against
+    :type schema_text:
+        :class:`str`
+    :param data_text:
+        Text of the JSON object to check
+    :type data_text:
+        :class:`str`, or UTF-8 encoded :class:`bytes`, :class:`bytearray` or
+        :class:`memoryview`
+    :param deserializer:
+        Function to convert the schema and data to JSON objects
+    :type deserializer:
+        :class:`callable`
+    :param intern_keys:
+        If True, the data is converted with a function made by
+        :func:`json_schema_validator.backend.make_interning_loads` instead
+        of deserializer. Objects converted by all calls with the same schema
+        share their keys, and keys that are property names of the schema are
+        the strings of the schema. This saves memory when many similar
+        documents are kept.
+    :param limits:
+        Same as for :func:`validate`
+    :returns:
+        The decoded JSON object
+    :raises:
+        Same as :func:`validate`
+    """
+    schema = _get_schema(schema_text, deserializer)
+    data = _get_data_deserializer(schema, deserializer, intern_keys)(data_text)
+    return DecodingValidator.decode(schema, data, limits=limits)
+
+
+def validate_stream(schema_text, fp, deserializer=_default_deserializer):
+    """
+    Validate JSON text read from a file object with specified schema.
+
+    The document is parsed and validated incrementally, see
+    :class:`json_schema_validator.streaming.StreamingValidator`. Only the
+    schema is converted with deserializer.
+
+    :param schema_text:
+        Text of the JSON schema to check against
+    :type schema_text:
+        :class:`str`
+    :param fp:
+        File object to read the JSON text from, preferably in binary mode. It
+        may hold gzip, bzip2 or xz compressed data.
+    :param deserializer:
+        Function to convert the schema to a JSON object
+    :type deserializer:
+        :class:`callable`
+    :returns:
+        True on success
+    :raises:
+        :class:`ValueError` if the text is not valid JSON
+    :raises:
+        Same as :func:`validate`
+    """
+    schema = _get_schema(schema_text, deserializer)
+    return StreamingValidator.validate(schema, fp)
+
+
+def load_validated(schema_text, data_text,
+                   deserializer=_default_deserializer, lazy=False):
+    """
+    Validate specified JSON text with specified schema while parsing it.
+
+    This is like :func:`validate` but the data is parsed and validated in a
+    single pass, see
+    :meth:`json_schema_validator.streaming.StreamingValidator.load`. Parsing
+    stops at the first error, which makes this a good fit when invalid input
+    is common. Valid documents are usually validated faster by
+    :func:`validate`, whose parser is written in C. Only the schema is
+    converted with deserializer.
+
+    :param schema_text:
+        Text of the JSON schema to check against
+    :type schema_text:
+        :class:`str`
+    :param data_text:
+        Text of the JSON object to check
+    :type data_text:
+        :class:`str`, or UTF-8 encoded :class:`bytes`, :class:`bytearray` or
+        :class:`memoryview`
+    :param deserializer:
+        Function to convert the schema to a JSON object
+    :type deserializer:
+        :class:`callable`
+    :param lazy:
+        If True, objects and arrays not constrained by the schema are returned
+        as :class:`json_schema_validator.streaming.RawJSON` and decoded on
+        first access
+    :returns:
+        The JSON object
+    :raises:
+        Same as :func:`validate_stream`
+    """
+    schema = _get_schema(schema_text, deserializer)
+    if isinstance(data_text, type(u"")):
+        data_text = data_text.encode("utf-8")
+    return StreamingValidator.load(
+        schema, io.BytesIO(data_text), lazy=lazy)
@@ -0,0 +1,1211 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Streaming validation of large JSON documents.
+
+:class:`JSONEventParser` is an incremental JSON tokenizer. It reads a file
+object in chunks and produces parsing events. :class:`StreamingValidator`
+consumes those events and validates each value as soon as it is complete,
+without building the document. Memory use is bounded by the nesting depth of
+the document (and the number of keys of the objects being read) rather than by
+its size.
+
+Parsing events are ``(event, value)`` pairs where event is one of:
+
+``"start_map"``, ``"end_map"``
+    Beginning and end of an object, value is None
+``"map_key"``
+    Name of the next property of an object, value is the name
+``"start_array"``, ``"end_array"``
+    Beginning and end of an array, value is None
+``"scalar"``
+    A string, number, boolean or null, value is the python value
+"""
+
+import json
+import os
+import re
+from json.decoder import scanstring
+
+from json_schema_validator import compression
+from json_schema_validator.misc import get_schema_fingerprint
+from json_schema_validator.schema import Schema
+from json_schema_validator.validator import Validator, basestring
+
+
+# Size of chunks read from file objects
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(br'[ \t\n\r]*')
+STRING = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+TOKEN = re.compile(br'[^ \t\n\r,:\[\]{}"]*')
+NUMBER = re.compile(br'(-?(?:0|[1-9][0-9]*))(\.[0-9]+)?([eE][-+]?[0-9]+)?\Z')
+CONTROL = re.compile(br'[\x00-\x1f]')
+# Building blocks of the patterns used to check text that is skipped
+_WS = br'[ \t\n\r]*'
+_STRING = (
+    br'"[^"\\\x00-\x1f]*'
+    br'(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"')
+_SCALAR = (
+    br'(?:' + _STRING +
+    br'|-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?'
+    br'|true|false|null|NaN|-?Infinity)')
+
+# Any token
+SKIP_TOKEN = re.compile(
+    _WS + br'(?:(' + _STRING + br')|(' + _SCALAR[3:-1] + br')|([][{},:]))')
+
+# Depth of the values that are skipped with a single regular expression
+SKIP_DEPTH = 3
+
+
+def _nested_value_pattern(depth):
+    """Regular expression of JSON values nested at most depth levels deep."""
+    value = _SCALAR
+    for level in range(depth):
+        item = _WS + value + _WS
+        member = _WS + _STRING + _WS + br':' + item
+        value = (
+            br'(?:' + _SCALAR +
+            br'|\[(?:' + item + br'(?:,' + item + br')*|' + _WS + br')\]'
+            br'|\{(?:' + member + br'(?:,' + member + br')*|' + _WS +
+            br')\})')
+    return value
+
+
+_skip_patterns = None
+
+
+def _get_skip_patterns():
+    """
+    Get the patterns that skip whole values.
+
+    They are compiled on first use, which takes a noticeable time.
+
+    :returns:
+        A tuple of patterns of a value, of a property and of runs of the
+        remaining items or properties of a container.
+    """
+    global _skip_patterns
+    if _skip_patterns is None:
+        value = _nested_value_pattern(SKIP_DEPTH)
+        member = _WS + _STRING + _WS + br':' + _WS + value
+        _skip_patterns = (
+            re.compile(_WS + value),
+            re.compile(member),
+            re.compile(br'(?:' + _WS + br',' + _WS + value + br')*'),
+            re.compile(br'(?:' + _WS + br',' + member + br')*'),
+        )
+    return _skip_patterns
+
+CONSTANTS = {
+    b'true': True,
+    b'false': False,
+    b'null': None,
+    b'NaN': float('nan'),
+    b'Infinity': float('inf'),
+    b'-Infinity': float('-inf'),
+}
+
+CLOSING = {"{": b"}", "[": b"]"}
+
+# Parser states
+(_VALUE, _ARRAY_START, _OBJECT_START, _KEY, _COLON, _AFTER_VALUE,
+ _DONE) = range(7)
+
+# Value of RawJSON that was not decoded yet
+_UNDECODED = object()
+
+# Cache key of the constraints of values not described individually
+_ADDITIONAL = object()
+
+# Schema keywords that do not constrain the value itself
+INFORMATIVE_KEYWORDS = frozenset([
+    "optional", "title", "description", "default",
+])
+
+# Schema keywords that require a value to be looked at as a whole
+UNSUPPORTED_KEYWORDS = frozenset([
+    "requires", "disallow", "contentEncoding", "divisibleBy",
+])
+
+
+class JSONEventParser(object):
+    """
+    Incremental JSON tokenizer.
+
+    The parser reads JSON text from a file object, in chunks of chunk_size
+    bytes, and produces the sequence of parsing events described in
+    :mod:`json_schema_validator.streaming`. Binary file objects are preferred.
+    Text read from a text file object is encoded as UTF-8 and offsets refer to
+    that encoding.
+
+    The accepted syntax is the same as that of :func:`json.loads`, including
+    the ``NaN``, ``Infinity`` and ``-Infinity`` constants. Malformed input
+    raises :class:`ValueError`.
+    """
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE, parse_float=float,
+                 parse_int=int):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._parse_float = parse_float
+        self._parse_int = parse_int
+        self._buffer = b''
+        self._pos = 0
+        # Offset of the start of the buffer in the input
+        self._base = 0
+        self._eof = False
+        self._stack = []
+        self._state = _VALUE
+        # Start of the text that has to be kept in the buffer
+        self._mark = None
+
+    @property
+    def offset(self):
+        """Offset, in bytes, of the first input byte not parsed yet."""
+        return self._base + self._pos
+
+    @property
+    def depth(self):
+        """Number of arrays and objects that are open."""
+        return len(self._stack)
+
+    def get_state(self):
+        """
+        Get the state of the parser between two events.
+
+        :returns:
+            A JSON object that :meth:`resume` accepts
+        """
+        return {
+            "offset": self.offset,
+            "stack": "".join(self._stack),
+            "state": self._state,
+        }
+
+    @classmethod
+    def resume(cls, fp, state, chunk_size=CHUNK_SIZE, parse_float=float,
+               parse_int=int):
+        """
+        Continue parsing from a state returned by :meth:`get_state`.
+
+        :param fp:
+            Binary file object positioned at ``state["offset"]``
+        :returns:
+            A parser producing the events that follow the state
+        """
+        self = cls(fp, chunk_size, parse_float, parse_int)
+        self._base = state["offset"]
+        self._stack = list(state["stack"])
+        self._state = state["state"]
+        return self
+
+    def __iter__(self):
+        while True:
+            event = self._next_event()
+            if event is None:
+                return
+            yield event
+
+    def skip_container(self):
+        """
+        Skip the rest of the object or array whose start was just parsed.
+
+        The skipped text is checked to be well-formed JSON but no value is
+        built. Encoding errors inside strings are not detected.
+
+        :returns:
+            The JSON text of the whole object or array, as bytes
+        :raises ValueError:
+            if the text is malformed or if the last event was not the start of
+            an object or array.
+        """
+        state = self._state
+        if state != _OBJECT_START and state != _ARRAY_START:
+            raise ValueError("No object or array to skip")
+        stack = self._stack
+        depth = len(stack)
+        self._mark = self._pos - 1
+        limit = self._get_complete_end()
+        skip_value, skip_member, skip_items, skip_members = \
+            _get_skip_patterns()
+        try:
+            while True:
+                # Skip whole values and runs of values at once, if possible
+                if state == _AFTER_VALUE:
+                    if stack[-1] == "[":
+                        fast = skip_items
+                    else:
+                        fast = skip_members
+                elif state == _VALUE or state == _ARRAY_START:
+                    fast = skip_value
+                elif state == _KEY or state == _OBJECT_START:
+                    fast = skip_member
+                else:
+                    fast = None
+                if fast is not None and self._pos < limit:
+                    match = fast.match(self._buffer, self._pos, limit)
+                    if match is not None and match.end() > self._pos:
+                        self._pos = match.end()
+                        state = _AFTER_VALUE
+                # Skip one token
+                match = SKIP_TOKEN.match(self._buffer, self._pos)
+                if match is None or TOKEN.match(
+                        self._buffer, match.end()).end() == len(self._buffer):
+                    # The token may continue in the next chunk
+                    filled = self._fill()
+                    limit = self._get_complete_end()
+                    if filled:
+                        continue
+                    if match is None:
+                        self._skip_whitespace()
+                        self._error("Malformed JSON")
+                string, scalar, punct = match.groups()
+                if punct is None:
+                    if state == _VALUE or state == _ARRAY_START:
+                        state = _AFTER_VALUE
+                    elif string is not None and (
+                            state == _KEY or state == _OBJECT_START):
+                        state = _COLON
+                    else:
+                        self._skip_whitespace()
+                        self._error("Unexpected value")
+                elif punct == b"{" or punct == b"[":
+                    if state != _VALUE and state != _ARRAY_START:
+                        self._skip_whitespace()
+                        self._error("Unexpected container")
+                    if punct == b"{":
+                        stack.append("{")
+                        state = _OBJECT_START
+                    else:
+                        stack.append("[")
+                        state = _ARRAY_START
+                elif punct == b"}" or punct == b"]":
+                    if punct == b"}":
+                        container, empty = "{", _OBJECT_START
+                    else:
+                        container, empty = "[", _ARRAY_START
+                    if stack[-1] != container or (
+                            state != _AFTER_VALUE and state != empty):
+                        self._skip_whitespace()
+                        self._error("Unexpected {0!r}".format(
+                            punct.decode("ascii")))
+                    stack.pop()
+                    state = _AFTER_VALUE
+                elif punct == b",":
+                    if state != _AFTER_VALUE:
+                        self._skip_whitespace()
+                        self._error("Unexpected ','")
+                    state = _KEY if stack[-1] == "{" else _VALUE
+                else:
+                    if state != _COLON:
+                        self._skip_whitespace()
+                        self._error("Unexpected ':'")
+                    state = _VALUE
+                self._pos = match.end()
+                if len(stack) < depth:
+                    break
+            self._end_value()
+            return self._buffer[self._mark:self._pos]
+        finally:
+            self._mark = None
+
+    def _get_complete_end(self):
+        """
+        Get the end of the part of the buffer that holds complete tokens.
+
+        Unless the whole input was read, that is the end of the last
+        punctuation character in the buffer.
+        """
+        buffer = self._buffer
+        if self._eof:
+            return len(buffer)
+        return max(
+            buffer.rfind(b","), buffer.rfind(b"]"), buffer.rfind(b"}")) + 1
+
+    def _error(self, message, offset=None):
+        if offset is None:
+            offset = self.offset
+        raise ValueError("{0}: byte offset {1}".format(message, offset))
+
+    def _fill(self):
+        """
+        Read more input into the buffer.
+
+        :returns:
+            False at the end of input
+        """
+        if self._eof:
+            return False
+        # Grow the read size with the unparsed part of the buffer so that
+        # long tokens take a linear amount of work.
+        keep = self._pos if self._mark is None else self._mark
+        chunk = self._fp.read(
+            max(self._chunk_size, len(self._buffer) - keep))
+        if not chunk:
+            self._eof = True
+            return False
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode("utf-8")
+        self._base += keep
+        self._buffer = self._buffer[keep:] + chunk
+        self._pos -= keep
+        if self._mark is not None:
+            self._mark = 0
+        return True
+
+    def _skip_whitespace(self):
+        """
+        Skip whitespace and return the next input byte.
+
+        :returns:
+            The next byte or an empty bytes object at the end of input.
+        """
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos:self._pos + 1]
+            if not self._fill():
+                return b''
+
+    def _read_string(self):
+        start = self.offset
+        while True:
+            match = STRING.match(self._buffer, self._pos)
+            if match is not None:
+                break
+            if not self._fill():
+                self._error("Unterminated string starting at", start)
+        raw = match.group()
+        self._pos = match.end()
+        try:
+            text = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            self._error("Invalid UTF-8 in string starting at", start)
+        if b'\\' not in raw and CONTROL.search(raw) is None:
+            return text[1:-1]
+        try:
+            return scanstring(text, 1)[0]
+        except ValueError as exc:
+            self._error("Invalid string ({0}) starting at".format(exc), start)
+
+    def _read_token(self):
+        """Read a number or a constant."""
+        while True:
+            end = TOKEN.match(self._buffer, self._pos).end()
+            if end < len(self._buffer) or not self._fill():
+                break
+        start = self.offset
+        token = self._buffer[self._pos:end]
+        self._pos = end
+        if token in CONSTANTS:
+            return CONSTANTS[token]
+        match = NUMBER.match(token)
+        if match is None:
+            self._error("Expecting value", start)
+        integer, frac, exp = match.groups()
+        if frac or exp:
+            return self._parse_float(token.decode("ascii"))
+        return self._parse_int(token.decode("ascii"))
+
+    def _end_value(self):
+        self._state = _AFTER_VALUE if self._stack else _DONE
+
+    def _end_container(self):
+        self._pos += 1
+        container = self._stack.pop()
+        self._end_value()
+        if container == "{":
+            return ("end_map", None)
+        return ("end_array", None)
+
+    def _next_event(self):
+        """
+        Parse the next event.
+
+        :returns:
+            A tuple (event, value) or None at the end of input.
+        """
+        while True:
+            char = self._skip_whitespace()
+            state = self._state
+            if state == _DONE:
+                if char:
+                    self._error("Extra data")
+                return
+            if not char:
+                self._error("Unexpected end of input")
+            if state == _AFTER_VALUE:
+                container = self._stack[-1]
+                if char == b",":
+                    self._pos += 1
+                    self._state = _KEY if container == "{" else _VALUE
+                    continue
+                if char == CLOSING[container]:
+                    return self._end_container()
+                self._error("Expecting ',' delimiter")
+            elif state == _COLON:
+                if char != b":":
+                    self._error("Expecting ':' delimiter")
+                self._pos += 1
+                self._state = _VALUE
+            elif state == _OBJECT_START or state == _KEY:
+                if char == b"}" and state == _OBJECT_START:
+                    return self._end_container()
+                if char != b'"':
+                    self._error(
+                        "Expecting property name enclosed in double quotes")
+                key = self._read_string()
+                self._state = _COLON
+                return ("map_key", key)
+            else:
+                if char == b"]" and state == _ARRAY_START:
+                    return self._end_container()
+                if char == b"{":
+                    self._pos += 1
+                    self._stack.append("{")
+                    self._state = _OBJECT_START
+                    return ("start_map", None)
+                if char == b"[":
+                    self._pos += 1
+                    self._stack.append("[")
+                    self._state = _ARRAY_START
+                    return ("start_array", None)
+                if char == b'"':
+                    value = self._read_string()
+                else:
+                    value = self._read_token()
+                self._end_value()
+                return ("scalar", value)
+
+
+class EventBuilder(object):
+    """
+    Builder of JSON objects out of parsing events.
+
+    Events are passed to :meth:`feed`. Once :attr:`complete` is True
+    :attr:`value` holds the JSON object they describe.
+    """
+
+    def __init__(self):
+        self._containers = []
+        self._keys = []
+        self.value = None
+        self.complete = False
+
+    def feed(self, event, value):
+        """Add the next parsing event to the value being built."""
+        if event == "map_key":
+            self._keys[-1] = value
+            return
+        if event == "end_map" or event == "end_array":
+            self._containers.pop()
+            self._keys.pop()
+            self.complete = not self._containers
+            return
+        if event == "start_map":
+            value = {}
+        elif event == "start_array":
+            value = []
+        if self._containers:
+            container = self._containers[-1]
+            if isinstance(container, list):
+                container.append(value)
+            else:
+                container[self._keys[-1]] = value
+        else:
+            self.value = value
+            self.complete = event == "scalar"
+        if event == "start_map" or event == "start_array":
+            self._containers.append(value)
+            self._keys.append(None)
+
+
+class RawJSON(object):
+    """
+    JSON text of an object or array that was not decoded.
+
+    Instances stand for values that the schema does not constrain, see
+    :meth:`StreamingValidator.load`. The text is only decoded, with
+    :func:`json.loads`, when :attr:`value` is first accessed.
+
+    :ivar raw:
+        The JSON text, as UTF-8 encoded bytes
+    """
+
+    __slots__ = ("raw", "_value")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._value = _UNDECODED
+
+    @property
+    def value(self):
+        """The decoded JSON object."""
+        if self._value is _UNDECODED:
+            self._value = json.loads(self.raw.decode("utf-8"))
+        return self._value
+
+    def __repr__(self):
+        return "RawJSON({0!r})".format(self.raw)
+
+
+class _ObjectPlaceholder(dict):
+    """Object that is validated without being built."""
+
+    def __repr__(self):
+        return "{...}"
+
+
+class _ArrayPlaceholder(list):
+    """Array that is validated without being built."""
+
+    def __repr__(self):
+        return "[...]"
+
+
+def _is_unconstrained(schema_json):
+    """Check if a schema accepts any value."""
+    return INFORMATIVE_KEYWORDS.issuperset(schema_json)
+
+
+def _uses_requires(schema_json):
+    """Check if a schema, or a nested type schema, uses requires."""
+    if not isinstance(schema_json, dict):
+        return False
+    if "requires" in schema_json:
+        return True
+    json_type = schema_json.get("type")
+    if isinstance(json_type, list):
+        return any(_uses_requires(item) for item in json_type)
+    return _uses_requires(json_type)
+
+
+def _is_streamable(schema_json, kind):
+    """
+    Check if a container can be validated without building it.
+
+    :param schema_json:
+        Schema of the container
+    :param kind:
+        Either ``"object"`` or ``"array"``
+    """
+    if not UNSUPPORTED_KEYWORDS.isdisjoint(schema_json):
+        return False
+    json_type = schema_json.get("type", "any")
+    if isinstance(json_type, dict):
+        return False
+    if isinstance(json_type, list):
+        for item in json_type:
+            if isinstance(item, (dict, list)):
+                return False
+    additional = schema_json.get("additionalProperties", {})
+    if kind == "object":
+        properties = schema_json.get("properties", {})
+        if not isinstance(properties, dict):
+            return False
+        children = list(properties.values())
+    else:
+        if schema_json.get("uniqueItems") is True:
+            return False
+        items = schema_json.get("items", {})
+        children = list(items) if isinstance(items, list) else [items]
+    children.append(additional)
+    for child in children:
+        if _uses_requires(child):
+            # Requires looks at the enclosing object
+            return False
+    return True
+
+
+def _get_schema_pointers(schema_json, pointer=(), pointers=None):
+    """
+    Locate the schemas nested in a schema.
+
+    :returns:
+        A dictionary mapping the id of each JSON object in schema_json to the
+        list of keys leading to it.
+    """
+    if pointers is None:
+        pointers = {}
+    if isinstance(schema_json, dict):
+        pointers.setdefault(id(schema_json), list(pointer))
+        children = schema_json.items()
+    elif isinstance(schema_json, list):
+        children = enumerate(schema_json)
+    else:
+        return pointers
+    for key, value in children:
+        _get_schema_pointers(value, pointer + (key, ), pointers)
+    return pointers
+
+
+def _restore_builder(value, keys):
+    """Get an :class:`EventBuilder` in the middle of building value."""
+    builder = EventBuilder()
+    builder.value = value
+    builder._keys = list(keys)
+    builder._containers = [value]
+    for key in keys[:-1]:
+        parent = builder._containers[-1]
+        builder._containers.append(
+            parent[-1] if isinstance(parent, list) else parent[key])
+    return builder
+
+
+def _get_property_constraints(properties, additional, prop):
+    """
+    Get the schemas of the value of property prop of an object.
+
+    :param properties:
+        Properties of the schema of the object
+    :param additional:
+        additionalProperties of the schema of the object
+    :returns:
+        A list of (schema, schema path) tuples or None if the property is not
+        allowed.
+    """
+    constraints = []
+    if prop in properties:
+        schema_json = properties[prop]
+        if not isinstance(schema_json, dict) or not \
+                _is_unconstrained(schema_json):
+            constraints.append((Schema(schema_json), ".properties." + prop))
+    elif additional is False:
+        return
+    if additional and not _is_unconstrained(additional):
+        constraints.append((Schema(additional), ".additionalProperties"))
+    return constraints
+
+
+def _get_item_constraints(items, additional, index):
+    """
+    Get the schemas of the item at index of an array.
+
+    :param items:
+        items of the schema of the array
+    :param additional:
+        additionalProperties of the schema of the array
+    :returns:
+        A list of (schema, schema path) tuples
+    """
+    if isinstance(items, dict):
+        if _is_unconstrained(items):
+            return []
+        return [(Schema(items), ".items")]
+    if index < len(items):
+        return [(Schema(items[index]), "items[%d]" % index)]
+    if additional is False or _is_unconstrained(additional):
+        # Extra items are reported with the length of the array
+        return []
+    return [(Schema(additional), ".additionalProperties")]
+
+
+class _ObjectFrame(object):
+    """Object validated one property at a time."""
+
+    def __init__(self, schema, cache):
+        self.schema = schema
+        self.properties = schema.properties
+        self.additional = schema.additionalProperties
+        # Constraints of each property, shared by objects with this schema
+        self.cache = cache
+        self.seen = set()
+        self.key = None
+        self.constraints = None
+
+    def _get_constraints(self, prop):
+        return _get_property_constraints(
+            self.properties, self.additional, prop)
+
+    def feed(self, validator, event, value):
+        if event == "map_key":
+            self.seen.add(value)
+            self.key = value
+            key = value if value in self.properties else _ADDITIONAL
+            try:
+                self.constraints = self.cache[key]
+            except KeyError:
+                self.constraints = self.cache[key] = \
+                    self._get_constraints(value)
+            if self.constraints is None:
+                validator._context._report_unknown_property(value)
+        elif event == "end_map":
+            if len(self.seen) < len(self.properties) or \
+                    not self.seen.issuperset(self.properties):
+                context = validator._context
+                for prop in self.properties:
+                    if prop not in self.seen:
+                        context._push_property_schema(prop)
+                        context._validate_missing_property(prop)
+                        context._pop_schema()
+            validator._end_container()
+        else:
+            validator._begin_value(
+                event, value, self.constraints, "." + self.key)
+
+    def get_state(self, pointers):
+        return {
+            "type": "object",
+            "schema": pointers[id(self.schema._schema)],
+            "seen": sorted(self.seen),
+            "key": self.key,
+        }
+
+
+class _ArrayFrame(object):
+    """Array validated one item at a time."""
+
+    def __init__(self, schema, cache):
+        self.schema = schema
+        self.items = schema.items
+        self.additional = schema.additionalProperties
+        # Constraints of each item, shared by arrays with this schema
+        self.cache = cache
+        self.count = 0
+
+    def _get_constraints(self, index):
+        return _get_item_constraints(self.items, self.additional, index)
+
+    def feed(self, validator, event, value):
+        if event == "end_array":
+            if self.items != {}:
+                context = validator._context
+                context._validate_item_count(self.count)
+                if isinstance(self.items, list):
+                    context._validate_tuple_length(self.count)
+            validator._end_container()
+            return
+        index = self.count
+        self.count += 1
+        if isinstance(self.items, dict) or index >= len(self.items):
+            key = _ADDITIONAL
+        else:
+            key = index
+        try:
+            constraints = self.cache[key]
+        except KeyError:
+            constraints = self.cache[key] = self._get_constraints(index)
+        validator._begin_value(event, value, constraints, "[%d]" % index)
+
+    def get_state(self, pointers):
+        return {
+            "type": "array",
+            "schema": pointers[id(self.schema._schema)],
+            "count": self.count,
+        }
+
+
+class _BuildFrame(object):
+    """Value built in memory to validate it as a whole."""
+
+    def __init__(self, event, constraints, path):
+        self.constraints = constraints
+        self.path = path
+        self.builder = EventBuilder()
+        self.builder.feed(event, None)
+
+    def feed(self, validator, event, value):
+        self.builder.feed(event, value)
+        if self.builder.complete:
+            validator._end_built_value(self)
+
+    def get_state(self, pointers):
+        return {
+            "type": "build",
+            "constraints": [
+                [pointers[id(schema._schema)], schema_path]
+                for schema, schema_path in self.constraints],
+            "path": self.path,
+            "value": self.builder.value,
+            "keys": self.builder._keys,
+        }
+
+
+class _SkipFrame(object):
+    """Value that is not constrained by the schema."""
+
+    def __init__(self):
+        self.depth = 1
+
+    def feed(self, validator, event, value):
+        if event == "start_map" or event == "start_array":
+            self.depth += 1
+        elif event == "end_map" or event == "end_array":
+            self.depth -= 1
+            if self.depth == 0:
+                validator._frames.pop()
+                validator._end_value()
+
+    def get_state(self, pointers):
+        return {"type": "skip", "depth": self.depth}
+
+
+def _get_input_identity(fp):
+    """Identify the file read by fp for a checkpoint."""
+    name = getattr(fp, "name", None)
+    try:
+        stat = os.fstat(fp.fileno())
+    except (AttributeError, OSError, ValueError):
+        stat = None
+    if stat is None or not isinstance(name, basestring):
+        raise ValueError(
+            "Cannot identify the input of {0!r}, pass input_id to resume"
+            " its validation".format(fp))
+    return {
+        "path": os.path.abspath(name),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+
+
+class StreamingValidator(object):
+    """
+    JSON Schema validator of parsing events.
+
+    Can be used to validate a JSON document, as it is being parsed by
+    :class:`JSONEventParser`, against a
+    :class:`json_schema_validator.schema.Schema`.
+
+    Values are validated as soon as they are complete and are discarded
+    afterwards. Objects and arrays are only built when their schema has to
+    look at them as a whole (``uniqueItems``, ``requires``, nested type
+    schemas and the like). Those are validated with
+    :class:`json_schema_validator.validator.Validator`.
+
+    Errors have the same object_expr and schema_expr as those reported by
+    :class:`json_schema_validator.validator.Validator`. Legacy messages show
+    objects and arrays that were not built as ``{...}`` and ``[...]``. The
+    document is checked in document order, so when it has several errors the
+    one reported may differ.
+    """
+
+    def __init__(self, schema):
+        if not isinstance(schema, Schema):
+            raise ValueError(
+                "schema value {0!r} is not a Schema"
+                " object".format(schema))
+        self._schema = schema
+        self._context = Validator()
+        self._frames = []
+        self._done = False
+        # Facts about each schema of a container, by id of the schema JSON
+        self._streamable = {}
+        self._caches = {}
+        self._pointers = None
+
+    @classmethod
+    def validate(cls, schema, fp, chunk_size=CHUNK_SIZE, checkpoint=None,
+                 input_id=None):
+        """
+        Validate JSON text read from file object fp with specified schema.
+
+        :param schema:
+            Schema to validate against
+        :type schema:
+            :class:`json_schema_validator.schema.Schema`
+        :param fp:
+            File object to read JSON text from, preferably in binary mode.
+            Compressed data is decompressed, see
+            :func:`json_schema_validator.compression.open_decompressed`.
+        :param chunk_size:
+            Number of bytes to read at a time
+        :param checkpoint:
+            :class:`json_schema_validator.checkpoint.Checkpoint` making the
+            validation resumable. About every ``checkpoint.interval`` bytes
+            the state of the parser and of the validator is saved. When a
+            saved state of the same input exists, the text before the saved
+            offset is skipped and validation continues from there. The state
+            file is removed once the document is valid.
+        :param input_id:
+            JSON value identifying the input in the checkpoint. By default
+            the path, size and modification time of the file read by fp are
+            used; file objects that are not backed by a named file, such as
+            :class:`io.BytesIO`, need one.
+        :rtype:
+            bool
+        :returns:
+            True on success
+        :raises ValueError:
+            if the text is not valid JSON, or if the saved state belongs to
+            another input or schema.
+        :raises `json_schema_validator.errors.ValidationError`:
+            if the object does not match schema.
+        :raises `json_schema_validator.errors.SchemaError`:
+            if the schema itself is wrong.
+        """
+        progress = None
+        if checkpoint is not None:
+            if input_id is None:
+                input_id = _get_input_identity(fp)
+            progress = checkpoint.resume({
+                "kind": "document",
+                "input": input_id,
+                "schema": get_schema_fingerprint(schema),
+            })
+        if progress is None:
+            self = cls(schema)
+        else:
+            self = cls.restore(schema, progress["validator"])
+        with compression.open_decompressed(fp) as reader:
+            if progress is None:
+                parser = JSONEventParser(reader, chunk_size)
+            else:
+                reader.skip(progress["parser"]["offset"])
+                parser = JSONEventParser.resume(
+                    reader, progress["parser"], chunk_size)
+            if checkpoint is None:
+                for event, value in parser:
+                    self.feed(event, value)
+            else:
+                next_save = parser.offset + checkpoint.interval
+                for event, value in parser:
+                    self.feed(event, value)
+                    if parser.offset >= next_save:
+                        checkpoint.save({
+                            "parser": parser.get_state(),
+                            "validator": self.get_state(),
+                        })
+                        next_save = parser.offset + checkpoint.interval
+        self.close()
+        if checkpoint is not None:
+            checkpoint.clear()
+        return True
+
+    @classmethod
+    def load(cls, schema, fp, chunk_size=CHUNK_SIZE, lazy=False):
+        """
+        Validate and load JSON text read from file object fp in one pass.
+
+        This is like :meth:`validate` but the document is also built, as
+        :func:`json.load` would, while it is being validated. Invalid
+        documents are rejected as soon as the error is parsed.
+
+        With lazy set, objects and arrays that the schema does not constrain
+        (for example values of properties described by ``{}``, or not
+        described at all) are only checked to be well-formed. They are
+        returned as :class:`RawJSON` instances and no python objects are
+        created for their contents.
+
+        :param schema:
+            Schema to validate against
+        :type schema:
+            :class:`json_schema_validator.schema.Schema`
+        :param fp:
+            File object to read JSON text from, preferably in binary mode.
+            Compressed data is decompressed, see
+            :func:`json_schema_validator.compression.open_decompressed`.
+        :param chunk_size:
+            Number of bytes to read at a time
+        :param lazy:
+            If True, unconstrained objects and arrays are not decoded
+        :returns:
+            The JSON object
+        :raises:
+            Same as :meth:`validate`
+        """
+        self = cls(schema)
+        builder = EventBuilder()
+        with compression.open_decompressed(fp) as reader:
+            parser = JSONEventParser(reader, chunk_size)
+            for event, value in parser:
+                self.feed(event, value)
+                if lazy and self._is_skipping_container(event):
+                    builder.feed("scalar", RawJSON(parser.skip_container()))
+                    self._frames.pop()
+                    self._end_value()
+                else:
+                    builder.feed(event, value)
+        self.close()
+        return builder.value
+
+    def feed(self, event, value):
+        """Validate the next parsing event."""
+        if self._frames:
+            self._frames[-1].feed(self, event, value)
+        elif self._done:
+            raise ValueError("The document is already complete")
+        elif _is_unconstrained(self._schema._schema):
+            self._begin_value(event, value, [], "object")
+        else:
+            self._begin_value(
+                event, value, [(self._schema, "schema")], "object")
+
+    def close(self):
+        """Check that a complete document was validated."""
+        if not self._done:
+            raise ValueError("The document is incomplete")
+
+    def get_state(self):
+        """
+        Get the state of the validator between two parsing events.
+
+        Schemas are referred to by their location in the root schema.
+
+        :returns:
+            A JSON object that :meth:`restore` accepts
+        """
+        if self._pointers is None:
+            self._pointers = _get_schema_pointers(self._schema._schema)
+        pointers = self._pointers
+        context = self._context
+        return {
+            "done": self._done,
+            "objects": [
+                ["{" if isinstance(obj, dict) else "[", path]
+                for obj, path in context._object_stack],
+            "schemas": [
+                [pointers[id(schema._schema)], path]
+                for schema, path in context._schema_stack],
+            "frames": [frame.get_state(pointers) for frame in self._frames],
+        }
+
+    @classmethod
+    def restore(cls, schema, state):
+        """
+        Get a validator in a state returned by :meth:`get_state`.
+
+        :param schema:
+            The schema of the validator the state was taken from
+        :type schema:
+            :class:`json_schema_validator.schema.Schema`
+        :param state:
+            State returned by :meth:`get_state`
+        :returns:
+            A validator expecting the events that follow the state
+        """
+        self = cls(schema)
+        self._done = state["done"]
+        context = self._context
+        for kind, path in state["objects"]:
+            if kind == "{":
+                context._push_object(_ObjectPlaceholder(), path)
+            else:
+                context._push_object(_ArrayPlaceholder(), path)
+        for pointer, path in state["schemas"]:
+            context._push_schema(self._get_schema(pointer), path)
+        for frame_state in state["frames"]:
+            self._frames.append(self._restore_frame(frame_state))
+        return self
+
+    def _get_schema(self, pointer):
+        schema_json = self._schema._schema
+        for key in pointer:
+            schema_json = schema_json[key]
+        return Schema(schema_json)
+
+    def _restore_frame(self, state):
+        kind = state["type"]
+        if kind == "skip":
+            frame = _SkipFrame()
+            frame.depth = state["depth"]
+        elif kind == "build":
+            constraints = [
+                (self._get_schema(pointer), schema_path)
+                for pointer, schema_path in state["constraints"]]
+            frame = _BuildFrame("start_map", constraints, state["path"])
+            frame.builder = _restore_builder(state["value"], state["keys"])
+        else:
+            schema = self._get_schema(state["schema"])
+            cache = self._caches.setdefault(id(schema._schema), {})
+            if kind == "object":
+                frame = _ObjectFrame(schema, cache)
+                frame.seen = set(state["seen"])
+                frame.key = state["key"]
+                if frame.key is not None:
+                    frame.constraints = frame._get_constraints(frame.key)
+            else:
+                frame = _ArrayFrame(schema, cache)
+                frame.count = state["count"]
+        return frame
+
+    def _begin_value(self, event, value, constraints, path):
+        context = self._context
+        if event == "scalar":
+            if constraints:
+                context._push_object(value, path)
+                for schema, schema_path in constraints:
+                    context._push_schema(schema, schema_path)
+                    context._validate()
+                    context._pop_schema()
+                context._pop_object()
+            self._end_value()
+            return
+        if event == "start_map":
+            kind = "object"
+            placeholder = _ObjectPlaceholder()
+        elif event == "start_array":
+            kind = "array"
+            placeholder = _ArrayPlaceholder()
+        else:
+            raise ValueError("Unexpected parsing event {0!r}".format(event))
+        if not constraints:
+            self._frames.append(_SkipFrame())
+        elif len(constraints) == 1 and self._is_streamable(
+                constraints[0][0], kind):
+            schema, schema_path = constraints[0]
+            context._push_object(placeholder, path)
+            context._push_schema(schema, schema_path)
+            context._validate_type()
+            cache = self._caches.setdefault(id(schema._schema), {})
+            if kind == "object":
+                self._frames.append(_ObjectFrame(schema, cache))
+            else:
+                self._frames.append(_ArrayFrame(schema, cache))
+        else:
+            self._frames.append(_BuildFrame(event, constraints, path))
+
+    def _is_streamable(self, schema, kind):
+        key = (id(schema._schema), kind)
+        try:
+            return self._streamable[key]
+        except KeyError:
+            streamable = self._streamable[key] = _is_streamable(
+                schema._schema, kind)
+            return streamable
+
+    def _is_skipping_container(self, event):
+        """Check if event started an object or array that is not validated."""
+        if event != "start_map" and event != "start_array":
+            return False
+        frame = self._frames[-1]
+        return isinstance(frame, _SkipFrame) and frame.depth == 1
+
+    def _end_value(self):
+        if not self._frames:
+            self._done = True
+
+    def _end_container(self):
+        self._context._pop_schema()
+        self._context._pop_object()
+        self._frames.pop()
+        self._end_value()
+
+    def _end_built_value(self, frame):
+        context = self._context
+        context._push_object(frame.builder.value, frame.path)
+        for schema, schema_path in frame.constraints:
+            context._push_schema(schema, schema_path)
+            context._validate()
+            context._pop_schema()
+        context._pop_object()
+        self._frames.pop()
+        self._end_value()
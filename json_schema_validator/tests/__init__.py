@@ -22,27 +22,64 @@ Package with unit tests for json-schema-validator
 """
 
 import doctest
+import sys
 import unittest
 
 
 def app_modules():
-    return [
+    modules = [
         'json_schema_validator',
+        'json_schema_validator.aio',
+        'json_schema_validator.backend',
+        'json_schema_validator.bulk',
+        'json_schema_validator.checkpoint',
+        'json_schema_validator.cli',
+        'json_schema_validator.columnar',
+        'json_schema_validator.compiled',
+        'json_schema_validator.compression',
+        'json_schema_validator.decoding',
         'json_schema_validator.errors',
         'json_schema_validator.extensions',
+        'json_schema_validator.lazy',
+        'json_schema_validator.limits',
         'json_schema_validator.misc',
+        'json_schema_validator.parallel',
         'json_schema_validator.schema',
+        'json_schema_validator.server',
         'json_schema_validator.shortcuts',
+        'json_schema_validator.streaming',
         'json_schema_validator.validator',
+        'json_schema_validator.vectorized',
     ]
+    if sys.version_info < (3, 6):
+        modules.remove('json_schema_validator.aio')
+    return modules
 
 
 def test_modules():
-    return [
+    modules = [
+        'json_schema_validator.tests.test_aio',
+        'json_schema_validator.tests.test_backend',
+        'json_schema_validator.tests.test_bulk',
+        'json_schema_validator.tests.test_checkpoint',
+        'json_schema_validator.tests.test_cli',
+        'json_schema_validator.tests.test_columnar',
+        'json_schema_validator.tests.test_compiled',
+        'json_schema_validator.tests.test_compression',
+        'json_schema_validator.tests.test_decoding',
         'json_schema_validator.tests.test_extensions',
+        'json_schema_validator.tests.test_lazy',
+        'json_schema_validator.tests.test_limits',
+        'json_schema_validator.tests.test_parallel',
         'json_schema_validator.tests.test_schema',
+        'json_schema_validator.tests.test_server',
+        'json_schema_validator.tests.test_shortcuts',
+        'json_schema_validator.tests.test_streaming',
         'json_schema_validator.tests.test_validator',
     ]
+    if sys.version_info < (3, 6):
+        modules.remove('json_schema_validator.tests.test_aio')
+    return modules
 
 
 def test_suite():
@@ -0,0 +1,308 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for validation in asyncio applications
+"""
+
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator.aio import ValidationStage, validate_async
+from json_schema_validator.errors import SchemaError, ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.tests import test_validator
+from json_schema_validator.validator import Validator
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class ValidateAsyncFailureTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorFailureTests.scenarios
+
+    def assertSameError(self, **kwargs):
+        schema = Schema(json.loads(self.schema))
+        ex = self.assertRaises(
+            ValidationError, run,
+            validate_async(schema, json.loads(self.data), **kwargs))
+        self.assertEqual(ex.message, self.raises.message)
+        self.assertEqual(ex.new_message, self.raises.new_message)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+    def test_same_error_as_validator(self):
+        self.assertSameError(budget_ms=0)
+
+    def test_same_error_from_executor(self):
+        with ThreadPoolExecutor(1) as executor:
+            self.assertSameError(executor=executor, offload_threshold=1)
+
+
+class ValidateAsyncSuccessTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorSuccessTests.scenarios
+
+    def test_validator_does_not_raise_an_exception(self):
+        schema = Schema(json.loads(self.schema))
+        self.assertEqual(
+            run(validate_async(schema, json.loads(self.data), budget_ms=0)),
+            True)
+
+
+SCHEMA = Schema({
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"id": {"type": "integer"}},
+    },
+})
+
+
+# Schemas that the streaming validators do not walk into
+NON_STREAMABLE_SCHEMAS = [
+    Schema({
+        "type": "array",
+        "uniqueItems": True,
+        "items": {"type": "integer"},
+    }),
+    Schema({
+        "type": ["null", {"type": "array", "items": {"type": "integer"}}],
+    }),
+    Schema({
+        "type": "object",
+        "properties": {
+            "values": {
+                "type": "array",
+                "items": {"type": "integer"},
+                "requires": {"properties": {"count": {"type": "integer"}}},
+            },
+        },
+    }),
+]
+
+
+class CountingValidator(Validator):
+
+    pushed = 0
+
+    def _push_object(self, obj, path):
+        CountingValidator.pushed += 1
+        super(CountingValidator, self)._push_object(obj, path)
+
+
+class ValidateAsyncTests(TestCase):
+
+    def count_ticks(self, schema, obj, **kwargs):
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        async def main():
+            task = asyncio.ensure_future(ticker())
+            await validate_async(schema, obj, **kwargs)
+            task.cancel()
+        run(main())
+        return len(ticks)
+
+    def test_event_loop_is_not_blocked(self):
+        obj = [{"id": i} for i in range(20000)]
+        self.assertGreater(self.count_ticks(SCHEMA, obj, budget_ms=0), 10)
+
+    def test_non_streamable_subtrees_do_not_block(self):
+        values = list(range(20000))
+        for schema, obj in zip(NON_STREAMABLE_SCHEMAS, [
+                values, values, {"count": 20000, "values": values}]):
+            self.assertGreater(
+                self.count_ticks(schema, obj, budget_ms=0), 10)
+
+    def test_non_streamable_subtrees_errors(self):
+        values = list(range(5000))
+        values[4000] = "x"
+        for schema, obj in zip(NON_STREAMABLE_SCHEMAS, [
+                values, values, {"count": 5000, "values": values}]):
+            expected = self.assertRaises(
+                ValidationError, Validator.validate, schema, obj)
+            for kwargs in [{"budget_ms": 0}, {"offload_threshold": 100}]:
+                with ThreadPoolExecutor(1) as executor:
+                    ex = self.assertRaises(
+                        ValidationError, run, validate_async(
+                            schema, obj, executor=executor, **kwargs))
+                self.assertEqual(ex.new_message, expected.new_message)
+                self.assertEqual(ex.object_expr, expected.object_expr)
+                self.assertEqual(ex.schema_expr, expected.schema_expr)
+
+    def test_offloaded_values_are_validated_once(self):
+        obj = [{"id": i} for i in range(5000)]
+        CountingValidator.pushed = 0
+        CountingValidator.validate(SCHEMA, obj)
+        expected = CountingValidator.pushed
+        CountingValidator.pushed = 0
+        with ThreadPoolExecutor(1) as executor:
+            self.assertTrue(run(validate_async(
+                SCHEMA, obj, executor=executor, offload_threshold=100,
+                validator_class=CountingValidator)))
+        self.assertEqual(CountingValidator.pushed, expected)
+
+    def test_error_in_a_late_slice(self):
+        obj = [{"id": i} for i in range(5000)]
+        obj[4000]["id"] = "x"
+        ex = self.assertRaises(
+            ValidationError, run, validate_async(SCHEMA, obj, budget_ms=0))
+        self.assertEqual(ex.object_expr, "object[4000].id")
+
+    def test_process_executor(self):
+        obj = [{"id": i} for i in range(5000)]
+        with ProcessPoolExecutor(1) as executor:
+            self.assertTrue(run(validate_async(
+                SCHEMA, obj, executor=executor, offload_threshold=100)))
+            obj[4000]["id"] = "x"
+            ex = self.assertRaises(
+                ValidationError, run, validate_async(
+                    SCHEMA, obj, executor=executor, offload_threshold=100))
+        self.assertEqual(ex.object_expr, "object[4000].id")
+
+
+MESSAGE_SCHEMA = Schema({
+    "type": "object",
+    "properties": {"id": {"type": "integer"}},
+})
+
+
+def make_messages(count):
+    messages = []
+    for i in range(count):
+        if i % 10 == 3:
+            messages.append('{"id": "x"}')
+        elif i % 10 == 7:
+            messages.append('{"id": ')
+        else:
+            messages.append('{"id": %d}' % i)
+    return messages
+
+
+async def produce(messages, produced=None):
+    for message in messages:
+        if produced is not None:
+            produced.append(message)
+        yield message
+
+
+async def consume(stage, messages):
+    return [result async for result in stage.process(produce(messages))]
+
+
+class ValidationStageTests(TestCase):
+
+    def assertResults(self, results, count):
+        self.assertEqual(
+            sorted(index for index, obj, error in results), list(range(count)))
+        for index, obj, error in results:
+            if index % 10 == 3:
+                self.assertIsInstance(error, ValidationError)
+                self.assertIs(obj, None)
+            elif index % 10 == 7:
+                self.assertIsInstance(error, ValueError)
+                self.assertNotIsInstance(error, ValidationError)
+            else:
+                self.assertEqual((obj, error), ({"id": index}, None))
+
+    def test_default_executor(self):
+        stage = ValidationStage(MESSAGE_SCHEMA, batch_size=8)
+        self.assertResults(run(consume(stage, make_messages(500))), 500)
+        stats = stage.get_stats()
+        self.assertEqual(stats["received"], 500)
+        self.assertEqual(stats["invalid"], 100)
+        self.assertGreaterEqual(stats["batches"], 500 // 8)
+        self.assertEqual(stats["input_queue"], 0)
+        self.assertEqual(stats["output_queue"], 0)
+        self.assertGreater(stats["validation_latency"]["max"], 0)
+
+    def test_thread_executor(self):
+        with ThreadPoolExecutor(2) as executor:
+            stage = ValidationStage(
+                MESSAGE_SCHEMA, workers=2, executor=executor)
+            self.assertResults(run(consume(stage, make_messages(300))), 300)
+
+    def test_process_executor(self):
+        with ProcessPoolExecutor(2) as executor:
+            stage = ValidationStage(
+                MESSAGE_SCHEMA, workers=2, executor=executor)
+            self.assertResults(run(consume(stage, make_messages(300))), 300)
+
+    def test_no_messages(self):
+        stage = ValidationStage(MESSAGE_SCHEMA)
+        self.assertEqual(run(consume(stage, [])), [])
+
+    def test_backpressure(self):
+        stage = ValidationStage(
+            MESSAGE_SCHEMA, workers=1, batch_size=4, queue_size=4)
+        produced = []
+        ahead = []
+
+        async def main():
+            results = stage.process(produce(make_messages(200), produced))
+            count = 0
+            async for result in results:
+                count += 1
+                ahead.append(len(produced) - count)
+                await asyncio.sleep(0)
+        run(main())
+        self.assertEqual(len(produced), 200)
+        # Both queues, a batch and the message waiting to be queued
+        self.assertLessEqual(max(ahead), 4 + 4 + 4 + 1)
+
+    def test_unexpected_errors_are_results(self):
+        def deserializer(message):
+            if message == "poison":
+                raise TypeError("poisoned message")
+            return json.loads(message)
+        stage = ValidationStage(
+            Schema({"type": "array", "items": {"type": "object"},
+                    "uniqueItems": True}),
+            batch_size=8, deserializer=deserializer)
+        messages = ["[]"] * 20
+        messages[5] = "poison"
+        messages[12] = '[{"a": 1}, {"b": 2}]'
+        results = sorted(run(consume(stage, messages)), key=lambda r: r[0])
+        self.assertEqual(len(results), 20)
+        self.assertIsInstance(results[5][2], TypeError)
+        self.assertEqual(str(results[5][2]), "poisoned message")
+        self.assertIsInstance(results[12][2], TypeError)
+        self.assertEqual(
+            [index for index, obj, error in results if error is None],
+            [index for index in range(20) if index not in (5, 12)])
+
+    def test_schema_errors_are_raised(self):
+        stage = ValidationStage(Schema({"type": 1}))
+        self.assertRaises(
+            SchemaError, run, consume(stage, make_messages(10)))
@@ -0,0 +1,100 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for the JSON decoder backends
+"""
+
+import math
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator import backend
+
+
+class LoadsTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("json", {'loads': backend._json_loads}),
+    ]
+    if backend.orjson is not None:
+        scenarios.append(("orjson", {'loads': backend._orjson_loads}))
+    if backend.ujson is not None:
+        scenarios.append(("ujson", {'loads': backend._ujson_loads}))
+
+    text = u'{"a": [1, 2.5, "ł", null, true]}'
+    expected = {u"a": [1, 2.5, u"ł", None, True]}
+
+    def test_text(self):
+        self.assertEqual(self.loads(self.text), self.expected)
+
+    def test_bytes(self):
+        self.assertEqual(
+            self.loads(self.text.encode("utf-8")), self.expected)
+
+    def test_bytearray(self):
+        self.assertEqual(
+            self.loads(bytearray(self.text.encode("utf-8"))), self.expected)
+
+    def test_memoryview(self):
+        self.assertEqual(
+            self.loads(memoryview(self.text.encode("utf-8"))), self.expected)
+
+    def test_constants(self):
+        value = self.loads(u"[NaN, Infinity, -Infinity]")
+        self.assertTrue(math.isnan(value[0]))
+        self.assertEqual(value[1:], [float("inf"), float("-inf")])
+
+    def test_big_integer(self):
+        self.assertEqual(self.loads(u"[123456789012345678901234567890]"),
+                         [123456789012345678901234567890])
+
+    def test_malformed(self):
+        self.assertRaises(ValueError, self.loads, u'{"a": }')
+
+    def test_malformed_bytes(self):
+        self.assertRaises(ValueError, self.loads, b'["\xff"]')
+
+
+class MakeInterningLoadsTests(TestCase):
+
+    def test_keys_are_shared(self):
+        loads = backend.make_interning_loads()
+        first = loads(u'{"a": {"b": 1}}')
+        second = loads(b'[{"a": 2, "b": 3}]')
+        self.assertIs(list(first)[0], list(second[0])[0])
+        self.assertIs(list(first["a"])[0], list(second[0])[1])
+
+    def test_names(self):
+        name = u"".join([u"na", u"me"])
+        loads = backend.make_interning_loads([name])
+        self.assertIs(list(loads(u'{"name": 1}'))[0], name)
+
+    def test_limit(self):
+        loads = backend.make_interning_loads(limit=1)
+        self.assertEqual(
+            loads(memoryview(b'{"first": 1, "second": 2}')),
+            {u"first": 1, u"second": 2})
+        self.assertIs(
+            list(loads(u'{"first": 1}'))[0],
+            list(loads(u'{"first": 1}'))[0])
+        self.assertIsNot(
+            list(loads(u'{"second": 1}'))[0],
+            list(loads(u'{"second": 1}'))[0])
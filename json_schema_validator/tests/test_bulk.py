@@ -0,0 +1,133 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for bulk validation of JSON Lines files
+"""
+
+import json
+import os
+import tempfile
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator.bulk import iter_blocks, validate_lines
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.validator import Validator
+
+
+SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer", "minimum": 0},
+        "name": {"type": "string"},
+    },
+})
+
+
+def make_lines(count=40):
+    return [
+        json.dumps({"id": i, "name": u"rów"}).encode("utf-8")
+        for i in range(count)]
+
+
+class ValidateLinesTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("columnar", {'validator_class': None, 'block_size': 1 << 20}),
+        ("regular", {'validator_class': Validator, 'block_size': 1 << 20}),
+        ("small_blocks", {'validator_class': None, 'block_size': 8}),
+    ]
+
+    def validate(self, data):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, "wb") as stream:
+            stream.write(data)
+        kwargs = {'block_size': self.block_size}
+        if self.validator_class is not None:
+            kwargs['validator_class'] = self.validator_class
+        # Tell validation errors from malformed lines
+        return [
+            (line_no, offset, isinstance(error, ValidationError))
+            for line_no, offset, error in validate_lines(
+                SCHEMA, path, **kwargs)]
+
+    def test_valid_file(self):
+        self.assertEqual(self.validate(b"\n".join(make_lines()) + b"\n"), [])
+
+    def test_empty_file(self):
+        self.assertEqual(self.validate(b""), [])
+
+    def test_errors_are_located(self):
+        lines = make_lines()
+        lines[3] = b'{"id": -1, "name": "x"}'
+        lines[20] = b'{"id": [1,'
+        lines[31] = b'{"id": "1", "name": "x"}'
+        data = b"\n".join(lines)
+        self.assertEqual(self.validate(data), [
+            (4, data.index(lines[3]), True),
+            (21, data.index(lines[20]), False),
+            (32, data.index(lines[31]), True),
+        ])
+
+    def test_many_invalid_lines(self):
+        lines = make_lines(200)
+        for i in range(10, 200, 3):
+            lines[i] = b'{"id": -1, "name": "x"}'
+        data = b"\n".join(lines)
+        self.assertEqual(
+            [line_no for line_no, offset, error in self.validate(data)],
+            list(range(11, 201, 3)))
+
+    def test_blank_lines_and_crlf(self):
+        lines = make_lines()
+        lines[5] = b""
+        lines[6] = b"  "
+        lines[10] = b'{"id": -1, "name": "x"}'
+        data = b"\r\n".join(lines) + b"\r\n"
+        self.assertEqual(self.validate(data), [
+            (11, data.index(lines[10]), True)])
+
+    def test_invalid_utf8(self):
+        lines = make_lines()
+        lines[7] = b'{"id": 1, "name": "\xff"}'
+        data = b"\n".join(lines)
+        self.assertEqual(self.validate(data), [
+            (8, data.index(lines[7]), False)])
+
+    def test_document_split_across_lines(self):
+        lines = make_lines()
+        lines[1:1] = [b'{"id": 1,', b'"name": "x"}']
+        data = b"\n".join(lines)
+        self.assertEqual(
+            [line_no for line_no, offset, error in self.validate(data)],
+            [2, 3])
+
+
+class IterBlocksTests(TestCase):
+
+    def test_blocks_end_with_whole_lines(self):
+        data = b"a\nbb\nccccccccc\nd"
+        blocks = list(iter_blocks(data, block_size=4))
+        self.assertEqual(
+            blocks, [(0, b"a\n"), (2, b"bb\n"), (5, b"ccccccccc\n"),
+                     (15, b"d")])
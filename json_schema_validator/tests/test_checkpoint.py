@@ -0,0 +1,268 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for resumable validation
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from testscenarios import TestWithScenarios
+from testtools import ExpectedException, TestCase
+
+from json_schema_validator.bulk import validate_lines
+from json_schema_validator.checkpoint import Checkpoint
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import StreamingValidator
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptedCheckpoint(Checkpoint):
+    """Checkpoint that stops the job after a number of saves."""
+
+    def __init__(self, path, interval, saves):
+        super(InterruptedCheckpoint, self).__init__(path, interval)
+        self.saves = saves
+
+    def save(self, progress):
+        super(InterruptedCheckpoint, self).save(progress)
+        self.saves -= 1
+        if self.saves == 0:
+            raise Interrupted()
+
+
+class CheckpointTestCase(TestCase):
+
+    def setUp(self):
+        super(CheckpointTestCase, self).setUp()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "state.json")
+
+
+class CheckpointTests(CheckpointTestCase):
+
+    def test_new_job(self):
+        checkpoint = Checkpoint(self.path)
+        self.assertEqual(checkpoint.resume({"kind": "test"}), None)
+
+    def test_save_and_resume(self):
+        Checkpoint(self.path).resume({"kind": "test"})
+        checkpoint = Checkpoint(self.path)
+        checkpoint.resume({"kind": "test"})
+        checkpoint.save({"offset": 10})
+        self.assertEqual(
+            Checkpoint(self.path).resume({"kind": "test"}), {"offset": 10})
+        self.assertEqual(os.listdir(self.dir), ["state.json"])
+
+    def test_other_job(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.resume({"kind": "test"})
+        checkpoint.save({"offset": 10})
+        self.assertRaises(
+            ValueError, Checkpoint(self.path).resume, {"kind": "other"})
+
+    def test_clear(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.resume({"kind": "test"})
+        checkpoint.save({"offset": 10})
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self.path))
+        checkpoint.clear()
+
+
+LINES_SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer", "maximum": 80},
+        "name": {"type": "string"},
+    },
+})
+
+
+class ValidateLinesResumeTests(TestWithScenarios, CheckpointTestCase):
+
+    scenarios = [
+        ("plain", {'compress': False}),
+        ("gzip", {'compress': True}),
+    ]
+
+    def setUp(self):
+        super(ValidateLinesResumeTests, self).setUp()
+        lines = [
+            json.dumps({"id": i, "name": "row"}).encode("utf-8")
+            for i in range(100)]
+        lines[7] = b'{"id": '
+        data = b"\n".join(lines) + b"\n"
+        self.data_path = os.path.join(self.dir, "data.jsonl")
+        if self.compress:
+            stream = gzip.open(self.data_path, "wb")
+        else:
+            stream = open(self.data_path, "wb")
+        with stream:
+            stream.write(data)
+
+    def validate(self, checkpoint=None):
+        return [
+            (line_no, offset, isinstance(error, ValidationError))
+            for line_no, offset, error in validate_lines(
+                LINES_SCHEMA, self.data_path, block_size=64,
+                checkpoint=checkpoint)]
+
+    def test_resume(self):
+        expected = self.validate()
+        self.assertEqual(len(expected), 20)
+        for saves in (1, 4, 8):
+            results = []
+            checkpoint = InterruptedCheckpoint(self.path, 200, saves)
+            with ExpectedException(Interrupted):
+                for result in validate_lines(
+                        LINES_SCHEMA, self.data_path, block_size=64,
+                        checkpoint=checkpoint):
+                    results.append(result)
+            checkpoint = Checkpoint(self.path)
+            progress = checkpoint.load()["progress"]
+            # Keep the errors reported before the checkpoint
+            del results[progress["error_count"]:]
+            results.extend(validate_lines(
+                LINES_SCHEMA, self.data_path, block_size=64,
+                checkpoint=checkpoint))
+            self.assertEqual([
+                (line_no, offset, isinstance(error, ValidationError))
+                for line_no, offset, error in results], expected)
+            self.assertFalse(os.path.exists(self.path))
+
+    def test_other_schema(self):
+        checkpoint = InterruptedCheckpoint(self.path, 200, 1)
+        self.assertRaises(Interrupted, self.validate, checkpoint)
+        self.assertRaises(
+            ValueError, list, validate_lines(
+                Schema({}), self.data_path, checkpoint=Checkpoint(self.path)))
+
+
+DOCUMENT_SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "rows": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer", "maximum": 1000},
+                    "tags": {"type": "array", "uniqueItems": True},
+                },
+            },
+        },
+    },
+})
+
+
+class StreamingResumeTests(CheckpointTestCase):
+
+    def make_text(self, bad_id=None):
+        rows = [
+            {"id": i, "tags": ["a", "b", i], "extra": {"x": [1, {"y": 2}]}}
+            for i in range(50)]
+        if bad_id is not None:
+            rows[bad_id]["id"] = 5000
+        return json.dumps({"name": "doc", "rows": rows}).encode("utf-8")
+
+    def validate(self, text, checkpoint=None):
+        try:
+            return StreamingValidator.validate(
+                DOCUMENT_SCHEMA, io.BytesIO(text), 16, checkpoint, "doc")
+        except ValidationError as exc:
+            return (exc.object_expr, exc.schema_expr)
+
+    def assertResumes(self, text):
+        expected = self.validate(text)
+        for saves in (1, 3, 10, 30, 60):
+            checkpoint = InterruptedCheckpoint(self.path, 50, saves)
+            try:
+                result = self.validate(text, checkpoint)
+            except Interrupted:
+                result = self.validate(text, Checkpoint(self.path, 50))
+            self.assertEqual(result, expected)
+        return expected
+
+    def test_valid_document(self):
+        self.assertEqual(self.assertResumes(self.make_text()), True)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_invalid_document(self):
+        self.assertEqual(
+            self.assertResumes(self.make_text(bad_id=40)),
+            ("object.rows[40].id",
+             "schema.properties.rows.items.properties.id.maximum"))
+
+    def test_state_round_trip(self):
+        text = self.make_text()
+        checkpoint = InterruptedCheckpoint(self.path, 500, 1)
+        self.assertRaises(Interrupted, self.validate, text, checkpoint)
+        progress = Checkpoint(self.path).load()["progress"]
+        validator = StreamingValidator.restore(
+            DOCUMENT_SCHEMA, progress["validator"])
+        self.assertEqual(validator.get_state(), progress["validator"])
+
+    def test_anonymous_input_needs_an_id(self):
+        self.assertRaises(
+            ValueError, StreamingValidator.validate, DOCUMENT_SCHEMA,
+            io.BytesIO(self.make_text()), checkpoint=Checkpoint(self.path))
+
+    def write_file(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as stream:
+            stream.write(text)
+        return path
+
+    def validate_file(self, path, checkpoint):
+        with open(path, "rb") as stream:
+            return StreamingValidator.validate(
+                DOCUMENT_SCHEMA, stream, 16, checkpoint)
+
+    def test_file_input_resumes(self):
+        path = self.write_file("doc.json", self.make_text(bad_id=40))
+        checkpoint = InterruptedCheckpoint(self.path, 50, 10)
+        self.assertRaises(Interrupted, self.validate_file, path, checkpoint)
+        ex = self.assertRaises(
+            ValidationError, self.validate_file, path,
+            Checkpoint(self.path, 50))
+        self.assertEqual(ex.object_expr, "object.rows[40].id")
+
+    def test_state_of_another_input_is_refused(self):
+        path = self.write_file("doc.json", self.make_text())
+        checkpoint = InterruptedCheckpoint(self.path, 50, 10)
+        self.assertRaises(Interrupted, self.validate_file, path, checkpoint)
+        other_path = self.write_file("other.json", self.make_text())
+        self.assertRaises(
+            ValueError, self.validate_file, other_path,
+            Checkpoint(self.path, 50))
+        self.assertRaises(
+            ValueError, self.validate, self.make_text(),
+            Checkpoint(self.path, 50))
@@ -0,0 +1,206 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for the command line validator
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator.cli import iter_results, main
+from json_schema_validator.schema import Schema
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"id": {"type": "integer"}},
+}
+
+LINES = b'{"id": 1}\n{"id": "y"}\n\nnot json\n{"id": 3}\n'
+
+
+class MainTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("serial", {'workers': "1"}),
+        ("parallel", {'workers': "2"}),
+    ]
+
+    def setUp(self):
+        super(MainTests, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.write("schema.json", json.dumps(SCHEMA).encode("utf-8"))
+        self.write("data/a.json", b'{"id": 1}')
+        self.write("data/b.json", b'{"id": "x"}')
+        self.write("data/c.jsonl", LINES)
+        self.write("data/d.ndjson.gz", gzip.compress(LINES))
+        self.write("data/README", b"not a document")
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as stream:
+            stream.write(data)
+        return path
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def run_main(self, *args, **kwargs):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        status = main(
+            [self.path("schema.json"), "--workers", self.workers] +
+            list(args), kwargs.get("stdin"), stdout, stderr)
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_valid_file(self):
+        self.assertEqual(self.run_main(self.path("data/a.json")),
+                         (0, "", ""))
+
+    def test_directory(self):
+        status, out, err = self.run_main(self.path("data"))
+        self.assertEqual(status, 1)
+        lines = out.replace(self.root + os.sep, "").splitlines()
+        self.assertEqual(len(lines), 5)
+        for line, prefix in zip(lines, [
+                "data/b.json: object.id: Object has incorrect type",
+                "data/c.jsonl:2: object.id: Object has incorrect type",
+                "data/c.jsonl:4: Expecting value",
+                "data/d.ndjson.gz:2: object.id: Object has incorrect type",
+                "data/d.ndjson.gz:4: Expecting value"]):
+            self.assertTrue(line.startswith(prefix), line)
+
+    def test_glob(self):
+        status, out, err = self.run_main(self.path("data/*.json"))
+        self.assertEqual(len(out.splitlines()), 1)
+
+    def test_unmatched_glob(self):
+        status, out, err = self.run_main(
+            self.path("data/*.xml"), self.path("data/a.json"))
+        self.assertEqual(status, 1)
+        self.assertEqual(len(out.splitlines()), 1)
+        self.assertIn("data/*.xml", out)
+
+    def test_missing_files(self):
+        status, out, err = self.run_main(
+            self.path("data/missing.jsonl"), self.path("data/missing.json"),
+            self.path("data/c.jsonl"))
+        self.assertEqual(status, 1)
+        lines = out.replace(self.root + os.sep, "").splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith("data/missing.jsonl: "), lines[0])
+        self.assertTrue(lines[1].startswith("data/missing.json: "), lines[1])
+        self.assertTrue(lines[2].startswith("data/c.jsonl:2: "), lines[2])
+
+    def test_lines_option(self):
+        self.write("data/lines.txt", LINES)
+        status, out, err = self.run_main(
+            "--lines", self.path("data/lines.txt"))
+        self.assertEqual(len(out.splitlines()), 2)
+
+    def test_fail_fast(self):
+        status, out, err = self.run_main(
+            "--fail-fast", self.path("data/c.jsonl"), self.path("data"))
+        self.assertEqual(status, 1)
+        self.assertEqual(len(out.splitlines()), 1)
+
+    def test_json_format(self):
+        status, out, err = self.run_main(
+            "--format", "json", self.path("data/c.jsonl"))
+        reports = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(reports[0], {
+            "path": self.path("data/c.jsonl"),
+            "line": 2,
+            "offset": 10,
+            "message": "Object has incorrect type (expected integer)",
+            "object_expr": "object.id",
+            "schema_expr": "schema.properties.id.type",
+        })
+        self.assertEqual(reports[1]["line"], 4)
+        self.assertNotIn("object_expr", reports[1])
+
+    def test_quarantine(self):
+        self.run_main(
+            "--quarantine", self.path("bad.jsonl"), self.path("data"))
+        with open(self.path("bad.jsonl"), "rb") as stream:
+            self.assertEqual(stream.read(), (
+                b'{"id":"x"}\n'
+                b'{"id": "y"}\nnot json\n'
+                b'{"id": "y"}\nnot json\n'))
+
+    def test_summary(self):
+        status, out, err = self.run_main("--summary", self.path("data"))
+        self.assertIn("10 documents (5 invalid) in 4 files", err)
+        self.assertIn("documents/s", err)
+        self.assertIn("MB/s", err)
+
+    def test_stdin(self):
+        status, out, err = self.run_main("-", stdin=io.BytesIO(LINES))
+        self.assertEqual(out.splitlines()[0], (
+            "<stdin>:2: object.id: Object has incorrect type"
+            " (expected integer)"))
+
+    def test_schema_errors(self):
+        os.remove(self.path("schema.json"))
+        status, out, err = self.run_main(self.path("data"))
+        self.assertEqual(status, 2)
+        self.assertIn("cannot load schema", err)
+        self.write("schema.json", json.dumps({
+            "type": "object",
+            "properties": {"id": {"type": "integer", "minimum": "x"}},
+        }).encode("utf-8"))
+        status, out, err = self.run_main(self.path("data/a.json"))
+        self.assertEqual(status, 2)
+        self.assertIn("invalid schema", err)
+
+
+class IterResultsTests(TestCase):
+
+    def test_blocks_of_lines_are_numbered(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        path = os.path.join(root, "data.jsonl")
+        with open(path, "wb") as stream:
+            for i in range(1000):
+                stream.write(b'{"id": "bad"}\n' if i % 97 == 0 else
+                             b'{"id": 1}\n')
+        expected = [
+            (i + 1, i * 10 + (i + 96) // 97 * 4)
+            for i in range(0, 1000, 97)]
+        for workers in (1, 3):
+            line_no = 1
+            found = []
+            for file_index, newlines, documents, errors in iter_results(
+                    Schema(SCHEMA), [path], workers,
+                    block_size=256):
+                for line, offset, error, record in errors:
+                    found.append((line_no + line - 1, offset))
+                line_no += newlines
+            self.assertEqual(found, expected)
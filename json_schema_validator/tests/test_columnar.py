@@ -0,0 +1,299 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for columnar validation
+"""
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator import vectorized
+from json_schema_validator.columnar import ColumnarValidator, find_invalid_row
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.validator import Validator
+
+
+ROW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer", "minimum": 0},
+        "name": {"type": "string", "pattern": "^[a-z]+$", "maxLength": 8},
+        "kind": {"enum": ["a", "b"], "optional": True},
+        "score": {
+            "type": ["number", "null"],
+            "minimum": 0,
+            "maximum": 1,
+            "maximumCanEqual": False,
+        },
+    },
+}
+
+
+def make_rows(count=40, **changes):
+    rows = [
+        {"id": i, "name": "row", "kind": "a", "score": 0.5}
+        for i in range(count)]
+    for key, value in changes.items():
+        index, prop = key.split("_", 1)
+        index = int(index[1:])
+        if value is None:
+            del rows[index][prop]
+        else:
+            rows[index][prop] = value
+    return rows
+
+
+class ColumnarValidatorTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("valid_rows", {
+            'rows': make_rows(),
+        }),
+        ("valid_rows_with_missing_optional_property", {
+            'rows': make_rows(r3_kind=None),
+        }),
+        ("valid_rows_with_null_score", {
+            'rows': make_rows() + [{"id": 1, "name": "x", "score": None}],
+        }),
+        ("row_is_not_an_object", {
+            'rows': make_rows() + [5],
+            'object_expr': 'object.rows[40]',
+            'schema_expr': 'schema.properties.rows.items.type',
+        }),
+        ("missing_property", {
+            'rows': make_rows(r20_name=None),
+            'object_expr': 'object.rows[20]',
+            'schema_expr': 'schema.properties.rows.items.properties.name'
+                           '.optional',
+        }),
+        ("wrong_type", {
+            'rows': make_rows(r7_id="7"),
+            'object_expr': 'object.rows[7].id',
+            'schema_expr': 'schema.properties.rows.items.properties.id.type',
+        }),
+        ("float_is_not_integer", {
+            'rows': make_rows(r9_id=9.0),
+            'object_expr': 'object.rows[9].id',
+            'schema_expr': 'schema.properties.rows.items.properties.id.type',
+        }),
+        ("below_minimum", {
+            'rows': make_rows(r30_id=-1),
+            'object_expr': 'object.rows[30].id',
+            'schema_expr': 'schema.properties.rows.items.properties.id'
+                           '.minimum',
+        }),
+        ("equal_to_exclusive_maximum", {
+            'rows': make_rows(r12_score=1),
+            'object_expr': 'object.rows[12].score',
+            'schema_expr': 'schema.properties.rows.items.properties.score'
+                           '.maximum',
+        }),
+        ("not_in_enum", {
+            'rows': make_rows(r5_kind="c"),
+            'object_expr': 'object.rows[5].kind',
+            'schema_expr': 'schema.properties.rows.items.properties.kind'
+                           '.enum',
+        }),
+        ("pattern_mismatch", {
+            'rows': make_rows(r11_name="Row"),
+            'object_expr': 'object.rows[11].name',
+            'schema_expr': 'schema.properties.rows.items.properties.name'
+                           '.pattern',
+        }),
+        ("too_long", {
+            'rows': make_rows(r11_name="rowrowrow"),
+            'object_expr': 'object.rows[11].name',
+            'schema_expr': 'schema.properties.rows.items.properties.name'
+                           '.maxLength',
+        }),
+        ("earliest_row_is_reported", {
+            'rows': make_rows(r31_id=-1, r6_kind="c", r17_name=None),
+            'object_expr': 'object.rows[6].kind',
+            'schema_expr': 'schema.properties.rows.items.properties.kind'
+                           '.enum',
+        }),
+        ("earliest_property_in_row_is_reported", {
+            'rows': make_rows(r6_kind="c", r6_id=-1),
+            'object_expr': 'object.rows[6].id',
+            'schema_expr': 'schema.properties.rows.items.properties.id'
+                           '.minimum',
+        }),
+    ]
+
+    object_expr = None
+    schema_expr = None
+
+    def setUp(self):
+        super(ColumnarValidatorTests, self).setUp()
+        self.schema = Schema({
+            "type": "object",
+            "properties": {
+                "rows": {"type": "array", "items": ROW_SCHEMA},
+            },
+        })
+        self.obj = {"rows": self.rows}
+
+    def test_columnar_path_is_used(self):
+        index = find_invalid_row(self.rows, Schema(ROW_SCHEMA))
+        self.assertIsNot(index, NotImplemented)
+
+    def test_same_result_as_validator(self):
+        if self.object_expr is None:
+            self.assertTrue(Validator.validate(self.schema, self.obj))
+            self.assertTrue(ColumnarValidator.validate(self.schema, self.obj))
+        else:
+            expected = self.assertRaises(
+                ValidationError, Validator.validate, self.schema, self.obj)
+            ex = self.assertRaises(
+                ValidationError, ColumnarValidator.validate, self.schema,
+                self.obj)
+            self.assertEqual(ex.message, expected.message)
+            self.assertEqual(ex.new_message, expected.new_message)
+            self.assertEqual(ex.object_expr, self.object_expr)
+            self.assertEqual(ex.schema_expr, self.schema_expr)
+
+
+class ColumnarFallbackTests(TestCase):
+
+    def test_unsupported_schema_is_not_checked_by_columns(self):
+        schema = Schema({"type": "object", "properties": {
+            "when": {"type": "string", "format": "date-time"}}})
+        self.assertIs(
+            find_invalid_row([{"when": "x"}], schema), NotImplemented)
+
+    def test_unsupported_schema_is_validated_row_by_row(self):
+        schema = Schema({"type": "array", "items": {
+            "type": "object",
+            "properties": {
+                "when": {"type": "string", "format": "date-time"}}}})
+        obj = [{"when": "2010-11-12T14:38:55Z"}] * 20 + [{"when": "x"}]
+        ex = self.assertRaises(
+            ValidationError, ColumnarValidator.validate, schema, obj)
+        self.assertEqual(ex.object_expr, "object[20].when")
+
+    def test_additional_properties_false(self):
+        schema = Schema({"type": "array", "items": {
+            "type": "object",
+            "properties": {"a": {"type": "integer"}},
+            "additionalProperties": False}})
+        obj = [{"a": 1}] * 20 + [{"a": 1, "b": 2}]
+        ex = self.assertRaises(
+            ValidationError, ColumnarValidator.validate, schema, obj)
+        self.assertEqual(ex.object_expr, "object[20]")
+        self.assertEqual(ex.schema_expr, "schema.items.additionalProperties")
+
+
+class StructuredArrayTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("valid_records", {
+            'records': [(1, u"a", 0.5, True), (2, u"b", 0.0, False)],
+        }),
+        ("below_minimum", {
+            'records': [(1, u"a", 0.5, True), (-2, u"b", 0.0, False)],
+            'object_expr': 'object[1].id',
+            'schema_expr': 'schema.items.properties.id.minimum',
+        }),
+        ("above_exclusive_maximum", {
+            'records': [(1, u"a", 0.5, True), (2, u"b", 1.0, False)],
+            'object_expr': 'object[1].score',
+            'schema_expr': 'schema.items.properties.score.maximum',
+        }),
+        ("pattern_mismatch", {
+            'records': [(1, u"a", 0.5, True), (2, u"B", 0.0, False)],
+            'object_expr': 'object[1].name',
+            'schema_expr': 'schema.items.properties.name.pattern',
+        }),
+        ("float_field_is_not_integer", {
+            'dtype': [("id", "f8"), ("name", "U4"), ("score", "f8"),
+                      ("flag", "?")],
+            'records': [(1, u"a", 0.5, True)],
+            'object_expr': 'object[0].id',
+            'schema_expr': 'schema.items.properties.id.type',
+        }),
+        ("bytes_field_is_not_string", {
+            'dtype': [("id", "i4"), ("name", "S4"), ("score", "f8"),
+                      ("flag", "?")],
+            'records': [(1, b"a", 0.5, True)],
+            'object_expr': 'object[0].name',
+            'schema_expr': 'schema.items.properties.name.type',
+        }),
+        ("missing_field", {
+            'dtype': [("id", "i4"), ("score", "f8"), ("flag", "?")],
+            'records': [(1, 0.5, True)],
+            'object_expr': 'object[0]',
+            'schema_expr': 'schema.items.properties.name.optional',
+        }),
+        ("unknown_field", {
+            'dtype': [("id", "i4"), ("name", "U4"), ("score", "f8"),
+                      ("flag", "?"), ("extra", "i4")],
+            'records': [(1, u"a", 0.5, True, 0)],
+            'object_expr': 'object[0]',
+            'schema_expr': 'schema.items.additionalProperties',
+        }),
+    ]
+
+    dtype = [("id", "i4"), ("name", "U4"), ("score", "f8"), ("flag", "?")]
+    object_expr = None
+    schema_expr = None
+
+    def setUp(self):
+        super(StructuredArrayTests, self).setUp()
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy is not available")
+        self.schema = Schema({"type": "array", "items": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer", "minimum": 0},
+                "name": {"type": "string", "pattern": "^[a-z]+$"},
+                "score": {"type": "number", "maximum": 1,
+                          "maximumCanEqual": False},
+                "flag": {"type": "boolean"},
+            },
+            "additionalProperties": False,
+        }})
+        self.arr = numpy.array(self.records, dtype=self.dtype)
+
+    def test_same_result_as_validator(self):
+        if self.object_expr is None:
+            self.assertTrue(Validator.validate(self.schema, self.arr))
+            self.assertTrue(ColumnarValidator.validate(self.schema, self.arr))
+        else:
+            expected = self.assertRaises(
+                ValidationError, Validator.validate, self.schema, self.arr)
+            ex = self.assertRaises(
+                ValidationError, ColumnarValidator.validate, self.schema,
+                self.arr)
+            self.assertEqual(ex.message, expected.message)
+            self.assertEqual(ex.new_message, expected.new_message)
+            self.assertEqual(ex.object_expr, self.object_expr)
+            self.assertEqual(ex.schema_expr, self.schema_expr)
+
+    def test_records_are_not_converted_to_dictionaries(self):
+        self.patch(vectorized, 'to_list', None)
+        if self.object_expr is None:
+            self.assertTrue(ColumnarValidator.validate(self.schema, self.arr))
+        else:
+            self.assertRaises(
+                ValidationError, ColumnarValidator.validate, self.schema,
+                self.arr)
@@ -0,0 +1,197 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for compiled validators
+"""
+
+import json
+import multiprocessing
+import pickle
+import threading
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator import compiled
+from json_schema_validator.columnar import ColumnarValidator
+from json_schema_validator.compiled import CompiledValidator
+from json_schema_validator.errors import SchemaError, ValidationError
+from json_schema_validator.misc import get_schema_fingerprint
+from json_schema_validator.schema import Schema
+from json_schema_validator.tests import test_validator
+
+
+class CompiledValidatorFailureTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorFailureTests.scenarios
+
+    def test_same_error_as_validator(self):
+        validator = CompiledValidator(Schema(json.loads(self.schema)))
+        ex = self.assertRaises(
+            ValidationError, validator.validate, json.loads(self.data))
+        self.assertEqual(ex.message, self.raises.message)
+        self.assertEqual(ex.new_message, self.raises.new_message)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+    def test_same_error_after_pickling(self):
+        validator = pickle.loads(pickle.dumps(
+            CompiledValidator(Schema(json.loads(self.schema)))))
+        ex = self.assertRaises(
+            ValidationError, validator.validate, json.loads(self.data))
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+    def test_check_rejects_invalid_data(self):
+        validator = CompiledValidator(Schema(json.loads(self.schema)))
+        self.assertFalse(validator.is_valid(json.loads(self.data)))
+
+
+class CompiledValidatorSuccessTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorSuccessTests.scenarios
+
+    def test_validator_does_not_raise_an_exception(self):
+        validator = CompiledValidator(Schema(json.loads(self.schema)))
+        self.assertEqual(validator.validate(json.loads(self.data)), True)
+
+
+SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer", "minimum": 0},
+        "name": {"type": "string", "maxLength": 8, "optional": True},
+        "tags": {
+            "type": "array",
+            "items": {"type": "string"},
+            "uniqueItems": True,
+        },
+    },
+    "additionalProperties": False,
+})
+
+
+class CompiledValidatorTests(TestCase):
+
+    def test_schema_must_be_a_schema_object(self):
+        self.assertRaises(ValueError, CompiledValidator, {})
+
+    def test_schema_errors_are_reported_on_validation(self):
+        validator = CompiledValidator(Schema({"type": "string", "format": 1}))
+        self.assertRaises(SchemaError, validator.validate, "x")
+
+    def test_recursive_schema(self):
+        schema_json = {
+            "type": "object",
+            "properties": {"next": {"type": "null", "optional": True}},
+        }
+        schema_json["properties"]["next"]["type"] = ["null", schema_json]
+        validator = CompiledValidator(Schema(schema_json))
+        self.assertTrue(validator.is_valid({"next": {"next": {}}}))
+        self.assertFalse(validator.is_valid({"next": {"next": 1}}))
+
+    def test_shared_between_threads(self):
+        validator = CompiledValidator(SCHEMA)
+        valid = {"id": 1, "name": "x", "tags": ["a", "b"]}
+        invalid = {"id": 1, "tags": ["a", "a"]}
+        errors = []
+
+        def worker():
+            for i in range(200):
+                try:
+                    validator.validate(valid)
+                    ex = self.assertRaises(
+                        ValidationError, validator.validate, invalid)
+                    self.assertEqual(ex.object_expr, "object.tags")
+                except Exception as exc:
+                    errors.append(exc)
+        threads = [threading.Thread(target=worker) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+def _is_valid(validator, obj):
+    return validator.is_valid(obj)
+
+
+class CompiledValidatorPickleTests(TestCase):
+
+    def setUp(self):
+        super(CompiledValidatorPickleTests, self).setUp()
+        self.schema = Schema({
+            "type": "object",
+            "properties": {
+                "b": {"type": "integer"},
+                "a": {"type": "string"},
+            },
+        })
+        self.addCleanup(compiled._cache.clear)
+
+    def test_schema_is_compiled_once(self):
+        data = pickle.dumps(CompiledValidator(self.schema))
+        validator = pickle.loads(data)
+        self.assertIs(pickle.loads(data), validator)
+        self.assertIsNot(validator._check, None)
+        self.assertEqual(validator.schema._schema, self.schema._schema)
+
+    def test_pickled_form(self):
+        validator = CompiledValidator(self.schema)
+        function, args = validator.__reduce__()
+        fingerprint, text, validator_class = args
+        # The order of the properties is kept
+        self.assertEqual(
+            text, '{"type":"object","properties":{"b":{"type":"integer"},'
+            '"a":{"type":"string"}}}')
+        self.assertIs(validator_class, compiled.Validator)
+        # Checkpoints identify schemas the same way
+        self.assertEqual(fingerprint, get_schema_fingerprint(self.schema))
+        self.assertIs(function(*args), function(*args))
+        # Unpickled validators are pickled the same way
+        self.assertEqual(function(*args).__reduce__(), (function, args))
+
+    def test_validator_class_is_kept(self):
+        validator = pickle.loads(pickle.dumps(
+            CompiledValidator(self.schema, ColumnarValidator)))
+        self.assertIs(validator._validator_class, ColumnarValidator)
+        self.assertIsNot(validator, pickle.loads(pickle.dumps(
+            CompiledValidator(self.schema))))
+
+    def test_cache_is_bounded(self):
+        for i in range(compiled.CACHE_SIZE + 1):
+            pickle.loads(pickle.dumps(CompiledValidator(
+                Schema({"type": "integer", "maximum": i}))))
+        self.assertLessEqual(len(compiled._cache), compiled.CACHE_SIZE)
+
+    def test_spawned_workers(self):
+        get_context = getattr(multiprocessing, "get_context", None)
+        if get_context is None:
+            self.skipTest("start methods are not supported")
+        validator = CompiledValidator(self.schema)
+        pool = get_context("spawn").Pool(1)
+        self.addCleanup(pool.join)
+        self.addCleanup(pool.terminate)
+        self.assertEqual(
+            pool.starmap(_is_valid, [
+                (validator, {"a": "x", "b": 1}),
+                (validator, {"a": 1}),
+            ]), [True, False])
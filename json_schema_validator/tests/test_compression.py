@@ -0,0 +1,140 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for transparent decompression
+"""
+
+import bz2
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator import compression
+from json_schema_validator.bulk import validate_lines
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import StreamingValidator
+
+
+def gzip_compress(data):
+    stream = io.BytesIO()
+    with gzip.GzipFile(fileobj=stream, mode="wb") as gz:
+        gz.write(data)
+    return stream.getvalue()
+
+
+def xz_compress(data):
+    return compression.lzma.compress(data)
+
+
+DATA = b"".join(
+    json.dumps({"id": i, "name": "x" * (i % 7)}).encode("ascii") + b"\n"
+    for i in range(2000))
+
+
+class DecompressionTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("gzip", {'kind': 'gzip', 'compress': staticmethod(gzip_compress)}),
+        ("bz2", {'kind': 'bz2', 'compress': staticmethod(bz2.compress)}),
+        ("xz", {'kind': 'xz', 'compress': staticmethod(xz_compress)}),
+    ]
+
+    def setUp(self):
+        super(DecompressionTests, self).setUp()
+        if self.kind == "xz" and compression.lzma is None:
+            self.skipTest("lzma is not available")
+
+    def test_detect_compression(self):
+        self.assertEqual(
+            compression.detect_compression(self.compress(DATA)[:6]),
+            self.kind)
+
+    def test_round_trip(self):
+        fp = io.BytesIO(self.compress(DATA))
+        with compression.open_decompressed(fp, read_size=100) as reader:
+            self.assertEqual(reader.read(), DATA)
+
+    def test_concatenated_streams(self):
+        fp = io.BytesIO(self.compress(DATA) + self.compress(DATA))
+        with compression.open_decompressed(fp, read_size=100) as reader:
+            self.assertEqual(reader.read(), DATA + DATA)
+
+    def test_chunks_are_bounded(self):
+        data = b"\0" * (8 << 20) + DATA
+        fp = io.BytesIO(self.compress(data) + self.compress(DATA))
+        chunks = list(compression.iter_decompressed(
+            fp, self.kind, read_size=1 << 16))
+        self.assertEqual(b"".join(chunks), data + DATA)
+        self.assertLessEqual(max(len(chunk) for chunk in chunks), 1 << 16)
+
+    def test_truncated_data(self):
+        fp = io.BytesIO(self.compress(DATA)[:-20])
+        with compression.open_decompressed(fp) as reader:
+            self.assertRaises(ValueError, reader.read)
+
+    def test_streaming_validator(self):
+        schema = Schema({"type": "array", "items": {"type": "integer"}})
+        fp = io.BytesIO(self.compress(b"[1, 2, 3, 4, 5]"))
+        self.assertTrue(StreamingValidator.validate(schema, fp))
+        fp = io.BytesIO(self.compress(b'[1, 2, "3"]'))
+        ex = self.assertRaises(
+            ValidationError, StreamingValidator.validate, schema, fp)
+        self.assertEqual(ex.object_expr, "object[2]")
+
+    def test_validate_lines(self):
+        lines = DATA.splitlines(True)
+        lines[1500] = b'{"id": "1500"}\n'
+        data = b"".join(lines)
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, "wb") as stream:
+            stream.write(self.compress(data))
+        schema = Schema(
+            {"type": "object", "properties": {"id": {"type": "integer"}}})
+        results = [
+            (line_no, offset) for line_no, offset, error in validate_lines(
+                schema, path, block_size=1000)]
+        self.assertEqual(results, [(1501, data.index(lines[1500]))])
+
+
+class OpenDecompressedTests(TestCase):
+
+    def test_uncompressed_data_is_unchanged(self):
+        fp = io.BytesIO(DATA)
+        reader = compression.open_decompressed(fp)
+        self.assertEqual(reader.read(3), DATA[:3])
+        self.assertEqual(reader.read(), DATA[3:])
+
+    def test_text(self):
+        reader = compression.open_decompressed(io.StringIO(u"[1, 2]"))
+        self.assertEqual(reader.read(), u"[1, 2]")
+
+    def test_closing_reader_stops_thread(self):
+        fp = io.BytesIO(bz2.compress(DATA * 20))
+        reader = compression.open_decompressed(fp, read_size=64)
+        reader.read(10)
+        reader.close()
+        self.assertFalse(reader._thread.is_alive())
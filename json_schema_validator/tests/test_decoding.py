@@ -0,0 +1,115 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for schema-directed decoding
+"""
+
+from datetime import datetime
+
+from testtools import TestCase
+
+from json_schema_validator.decoding import DecodingValidator
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.shortcuts import decode
+
+
+DATE_TIME = {"type": "string", "format": "date-time"}
+SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "when": DATE_TIME,
+        "log": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"at": DATE_TIME, "text": {"type": "string"}},
+            },
+        },
+    },
+})
+
+
+class DecodingValidatorTests(TestCase):
+
+    def setUp(self):
+        super(DecodingValidatorTests, self).setUp()
+        self.obj = {
+            "when": "2010-11-12T14:38:55Z",
+            "log": [
+                {"at": "2010-11-12T14:40:00Z", "text": "start"},
+                {"at": "2010-11-12T14:41:00Z", "text": "stop"},
+            ],
+        }
+        self.expected = {
+            "when": datetime(2010, 11, 12, 14, 38, 55),
+            "log": [
+                {"at": datetime(2010, 11, 12, 14, 40), "text": "start"},
+                {"at": datetime(2010, 11, 12, 14, 41), "text": "stop"},
+            ],
+        }
+
+    def test_decode_in_place(self):
+        result = DecodingValidator.decode(SCHEMA, self.obj)
+        self.assertIs(result, self.obj)
+        self.assertEqual(result, self.expected)
+
+    def test_decode_copy(self):
+        log = self.obj["log"]
+        result = DecodingValidator.decode(SCHEMA, self.obj, copy=True)
+        self.assertEqual(result, self.expected)
+        self.assertIsNot(result, self.obj)
+        self.assertEqual(self.obj["when"], "2010-11-12T14:38:55Z")
+        self.assertIs(self.obj["log"], log)
+        self.assertEqual(log[0]["at"], "2010-11-12T14:40:00Z")
+
+    def test_invalid_document_is_not_decoded(self):
+        self.obj["log"][1]["at"] = "yesterday"
+        ex = self.assertRaises(
+            ValidationError, DecodingValidator.decode, SCHEMA, self.obj)
+        self.assertEqual(ex.object_expr, "object.log[1].at")
+        self.assertEqual(ex.schema_expr, "schema.properties.log.items"
+                         ".properties.at.format")
+        self.assertEqual(self.obj["when"], "2010-11-12T14:38:55Z")
+
+    def test_decode_toplevel_value(self):
+        self.assertEqual(
+            DecodingValidator.decode(
+                Schema(DATE_TIME), "2010-11-12T14:38:55Z"),
+            datetime(2010, 11, 12, 14, 38, 55))
+
+    def test_failed_union_alternative_is_not_decoded(self):
+        schema = Schema({"items": {"type": [
+            {"type": "string", "format": "date-time", "maxLength": 4},
+            "string"]}})
+        self.assertEqual(
+            DecodingValidator.decode(schema, ["2010-11-12T14:38:55Z"]),
+            ["2010-11-12T14:38:55Z"])
+
+    def test_values_of_iterators_are_not_decoded(self):
+        self.obj["log"] = iter(self.obj["log"])
+        self.assertRaises(
+            ValueError, DecodingValidator.decode, SCHEMA, self.obj)
+
+    def test_decode_shortcut(self):
+        self.assertEqual(
+            decode('{"items": {"format": "date-time"}}',
+                   '["2010-11-12T14:38:55Z"]'),
+            [datetime(2010, 11, 12, 14, 38, 55)])
@@ -24,6 +24,7 @@ Unit tests for JSON extensions
 from testtools import TestCase
 from datetime import datetime, timedelta
 
+from json_schema_validator import extensions
 from json_schema_validator.extensions import datetime_extension, timedelta_extension
 
 
@@ -37,12 +38,66 @@ class ExtensionTests(object):
         obj = self.extension.from_json(self.reference_text)
         self.assertEqual(obj, self.reference_obj)
 
+    def test_to_json_many(self):
+        texts = self.extension.to_json_many([self.reference_obj] * 2)
+        self.assertEqual(texts, [self.reference_text] * 2)
+
+    def test_from_json_many(self):
+        objs = self.extension.from_json_many([self.reference_text] * 2)
+        self.assertEqual(objs, [self.reference_obj] * 2)
+
+    def test_from_json_many_without_numpy(self):
+        self.patch(extensions, 'numpy', None)
+        objs = self.extension.from_json_many([self.reference_text] * 2)
+        self.assertEqual(objs, [self.reference_obj] * 2)
+
+    def test_to_json_many_rejects_nat(self):
+        if extensions.numpy is None:
+            self.skipTest("NumPy is not available")
+        arr = extensions.numpy.array([self.reference_obj, None])
+        arr = arr.astype(self.numpy_dtype)
+        self.assertRaises(ValueError, self.extension.to_json_many, arr)
+
+    def test_numpy_round_trip(self):
+        if extensions.numpy is None:
+            self.skipTest("NumPy is not available")
+        arr = self.extension.from_json_many(
+            [self.reference_text] * 2, as_numpy=True)
+        self.assertEqual(arr.tolist(), [self.reference_obj] * 2)
+        texts = self.extension.to_json_many(arr)
+        self.assertEqual(texts, [self.reference_text] * 2)
+
 
 class DatetimeExtensionTests(TestCase, ExtensionTests):
 
     reference_obj = datetime(2010, 12, 7, 23, 59, 58)
     reference_text = "2010-12-07T23:59:58Z"
     extension = datetime_extension
+    numpy_dtype = "datetime64[s]"
+
+    def test_to_json_many_short_years(self):
+        objs = [self.reference_obj, datetime(999, 1, 2, 3, 4, 5)]
+        expected = [self.extension.to_json(obj) for obj in objs]
+        self.assertEqual(self.extension.to_json_many(objs), expected)
+        if extensions.numpy is not None:
+            arr = extensions.numpy.array(objs, dtype=self.numpy_dtype)
+            self.assertEqual(self.extension.to_json_many(arr), expected)
+
+    def test_from_json_accepts_non_fixed_width_text(self):
+        obj = self.extension.from_json("2010-12-7T23:59:58Z")
+        self.assertEqual(obj, self.reference_obj)
+
+    def test_from_json_many_accepts_non_fixed_width_text(self):
+        objs = self.extension.from_json_many(
+            [self.reference_text, "2010-12-7T23:59:58Z"])
+        self.assertEqual(objs, [self.reference_obj] * 2)
+
+    def test_from_json_many_rejects_invalid_text(self):
+        for text in ("2010-02-30T23:59:58Z", "2010-12-07T23:59:58Z\n",
+                     "0000-12-07T23:59:58Z", "2010-12-07 23:59:58Z"):
+            self.assertRaises(
+                ValueError, self.extension.from_json_many,
+                [self.reference_text, text])
 
 
 class TimedeltaExtensionTests(TestCase, ExtensionTests):
@@ -50,3 +105,17 @@ class TimedeltaExtensionTests(TestCase, ExtensionTests):
     reference_obj = timedelta(days=1, seconds=2, microseconds=3)
     reference_text = "1d 2s 3us"
     extension = timedelta_extension
+    numpy_dtype = "timedelta64[us]"
+
+    def test_from_json_many_normalizes_like_from_json(self):
+        texts = ["0d 86400s 1000000us", "99999999d 99999999999s 0us",
+                 "100000000d 0s 0us", u"\u0661d 2s 3us"]
+        self.assertEqual(
+            self.extension.from_json_many(texts),
+            [self.extension.from_json(text) for text in texts])
+
+    def test_from_json_many_rejects_invalid_text(self):
+        for text in ("1d 2s", "d 2s 3us", "1d 2s -3us", "1d 2s 3us x"):
+            self.assertRaises(
+                ValueError, self.extension.from_json_many,
+                [self.reference_text, text])
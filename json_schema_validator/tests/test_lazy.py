@@ -0,0 +1,159 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for validation on access
+"""
+
+import json
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.lazy import (
+    LazyValidatedDict,
+    LazyValidatedList,
+    lazy_validate,
+)
+from json_schema_validator.schema import Schema
+from json_schema_validator.tests import test_validator
+
+
+def access_all(value):
+    """Access every value of a proxy, recursively."""
+    if isinstance(value, LazyValidatedDict):
+        for key in value:
+            access_all(value[key])
+    elif isinstance(value, LazyValidatedList):
+        for item in value:
+            access_all(item)
+
+
+class LazyValidatorFailureTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorFailureTests.scenarios
+
+    def test_same_error_as_validator(self):
+        schema = Schema(json.loads(self.schema))
+        ex = self.assertRaises(
+            ValidationError, lambda: access_all(
+                lazy_validate(schema, json.loads(self.data))))
+        self.assertEqual(ex.message, self.raises.message)
+        self.assertEqual(ex.new_message, self.raises.new_message)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+
+class LazyValidatorSuccessTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorSuccessTests.scenarios
+
+    def test_validator_does_not_raise_an_exception(self):
+        schema = Schema(json.loads(self.schema))
+        access_all(lazy_validate(schema, json.loads(self.data)))
+
+
+SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "note": {"type": "string", "optional": True},
+        "rows": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"value": {"type": "number"}},
+            },
+        },
+        "tags": {
+            "type": "array",
+            "items": {"type": "string"},
+            "uniqueItems": True,
+        },
+    },
+    "additionalProperties": False,
+})
+
+
+class LazyValidateTests(TestCase):
+
+    def setUp(self):
+        super(LazyValidateTests, self).setUp()
+        self.obj = {
+            "id": 1,
+            "rows": [{"value": 1}, {"value": "bad"}, {"value": 3}],
+            "tags": ["a", "a"],
+        }
+
+    def test_values_are_validated_on_access(self):
+        doc = lazy_validate(SCHEMA, self.obj)
+        self.assertEqual(doc["id"], 1)
+        rows = doc["rows"]
+        self.assertIsInstance(rows, LazyValidatedList)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[-1]["value"], 3)
+        ex = self.assertRaises(ValidationError, lambda: rows[1]["value"])
+        self.assertEqual(ex.object_expr, "object.rows[1].value")
+        self.assertEqual(
+            ex.schema_expr, "schema.properties.rows.items.properties.value"
+            ".type")
+
+    def test_values_are_validated_once(self):
+        doc = lazy_validate(SCHEMA, self.obj)
+        self.assertIs(doc["rows"], doc["rows"])
+        self.assertIs(doc["rows"][0], doc["rows"][0])
+
+    def test_containers_checked_as_a_whole(self):
+        doc = lazy_validate(SCHEMA, self.obj)
+        ex = self.assertRaises(ValidationError, lambda: doc["tags"])
+        self.assertEqual(ex.object_expr, "object.tags")
+        self.obj["tags"] = ["a", "b"]
+        self.assertIs(lazy_validate(SCHEMA, self.obj)["tags"],
+                      self.obj["tags"])
+
+    def test_missing_property_is_reported_eagerly(self):
+        del self.obj["id"]
+        ex = self.assertRaises(
+            ValidationError, lazy_validate, SCHEMA, self.obj)
+        self.assertEqual(ex.schema_expr, "schema.properties.id.optional")
+
+    def test_unknown_property_is_reported_eagerly(self):
+        self.obj["other"] = 1
+        ex = self.assertRaises(
+            ValidationError, lazy_validate, SCHEMA, self.obj)
+        self.assertEqual(ex.schema_expr, "schema.additionalProperties")
+
+    def test_mapping_interface(self):
+        doc = lazy_validate(SCHEMA, self.obj)
+        self.assertIn("id", doc)
+        self.assertNotIn("note", doc)
+        self.assertEqual(doc.get("note"), None)
+        self.assertEqual(sorted(doc), ["id", "rows", "tags"])
+        self.assertEqual(len(doc), 3)
+
+    def test_slices(self):
+        doc = lazy_validate(SCHEMA, self.obj)
+        self.assertEqual(
+            [row["value"] for row in doc["rows"][::2]], [1, 3])
+
+    def test_scalar_document(self):
+        self.assertEqual(lazy_validate(Schema({"type": "string"}), "x"), "x")
+        self.assertRaises(
+            ValidationError, lazy_validate, Schema({"type": "string"}), 1)
@@ -0,0 +1,189 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for the resource limits of validation
+"""
+
+import array
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator.columnar import ColumnarValidator
+from json_schema_validator.decoding import DecodingValidator
+from json_schema_validator.errors import LimitExceeded, ValidationError
+from json_schema_validator.limits import Limits
+from json_schema_validator.schema import Schema
+from json_schema_validator.shortcuts import validate
+from json_schema_validator.validator import Validator
+
+
+SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "rows": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "tags": {"type": "array", "items": {"type": "string"}},
+                },
+                "additionalProperties": False,
+            },
+        },
+    },
+    "additionalProperties": False,
+})
+ROW_SCHEMA_EXPR = "schema.properties.rows.items"
+DOCUMENT = {
+    "name": "x" * 10,
+    "rows": [{"tags": ["a", "b"]}, {"tags": ["c", "d" * 100]}],
+}
+
+
+class LimitTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("max_depth", {
+            'limit': "max_depth",
+            'limits': Limits(max_depth=3),
+            'object_expr': "object.rows[0].tags[0]",
+            'schema_expr': ROW_SCHEMA_EXPR + ".properties.tags.items",
+        }),
+        ("max_nodes", {
+            'limit': "max_nodes",
+            'limits': Limits(max_nodes=8),
+            'object_expr': "object.rows[1].tags",
+            'schema_expr': ROW_SCHEMA_EXPR + ".properties.tags",
+        }),
+        ("max_string_length", {
+            'limit': "max_string_length",
+            'limits': Limits(max_string_length=50),
+            'object_expr': "object.rows[1].tags[1]",
+            'schema_expr': ROW_SCHEMA_EXPR + ".properties.tags.items",
+        }),
+        ("timeout", {
+            'limit': "timeout",
+            'limits': Limits(timeout=-1, check_interval=4),
+            'object_expr': "object.rows[0]",
+            'schema_expr': ROW_SCHEMA_EXPR,
+        }),
+    ]
+
+    validators = [Validator, ColumnarValidator, DecodingValidator]
+
+    def test_limit_is_reported(self):
+        for validator_class in self.validators:
+            ex = self.assertRaises(
+                LimitExceeded, validator_class.validate, SCHEMA, DOCUMENT,
+                self.limits)
+            self.assertIsInstance(ex, ValidationError)
+            self.assertEqual(ex.limit, self.limit)
+            self.assertEqual(ex.object_expr, self.object_expr)
+            self.assertEqual(ex.schema_expr, self.schema_expr)
+
+    def test_limit_is_not_hidden_by_union_types(self):
+        schema = Schema({"type": [SCHEMA._schema, "any"]})
+        ex = self.assertRaises(
+            LimitExceeded, Validator.validate, schema, DOCUMENT, self.limits)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr.replace(
+            "schema", "schema.type.0.type", 1))
+
+
+class ValidatorLimitsTests(TestCase):
+
+    def test_no_limits(self):
+        self.assertTrue(Validator.validate(SCHEMA, DOCUMENT))
+        self.assertTrue(Validator.validate(SCHEMA, DOCUMENT, Limits()))
+
+    def test_limits_are_reset_for_each_validation(self):
+        validator = Validator(Limits(max_nodes=8))
+        for i in range(3):
+            validator.validate_toplevel(
+                SCHEMA, {"name": "x", "rows": [{"tags": ["a"]}]})
+
+    def test_validation_errors_are_still_reported(self):
+        schema = Schema({"type": "array"})
+        ex = self.assertRaises(
+            ValidationError, Validator.validate, schema, DOCUMENT,
+            Limits(max_depth=100))
+        self.assertNotIsInstance(ex, LimitExceeded)
+
+    def test_vectorized_items_are_counted(self):
+        schema = Schema({"type": "array", "items": {"type": "number"}})
+        obj = array.array("d", range(100))
+        self.assertTrue(Validator.validate(schema, obj, Limits(max_nodes=101)))
+        ex = self.assertRaises(
+            LimitExceeded, Validator.validate, schema, obj,
+            Limits(max_nodes=100))
+        self.assertEqual(ex.object_expr, "object")
+
+    def test_columnar_rows_are_checked(self):
+        schema = Schema({
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}},
+            },
+        })
+        obj = [{"name": "x"} for i in range(100)] + [{"name": "x" * 100}]
+        ex = self.assertRaises(
+            LimitExceeded, ColumnarValidator.validate, schema, obj,
+            Limits(max_string_length=10))
+        self.assertEqual(ex.object_expr, "object[100].name")
+
+    def test_requires_schemas_are_checked(self):
+        schema = Schema({
+            "type": "object",
+            "properties": {
+                "flag": {
+                    "requires": {
+                        "properties": {
+                            "rows": {
+                                "type": "array",
+                                "items": {"type": "object"},
+                            },
+                        },
+                    },
+                },
+            },
+        })
+        obj = {"flag": True, "rows": [{"x": i} for i in range(1000)]}
+        self.assertTrue(Validator.validate(schema, obj))
+        ex = self.assertRaises(
+            LimitExceeded, Validator.validate, schema, obj,
+            Limits(max_nodes=10))
+        self.assertEqual(ex.limit, "max_nodes")
+        self.assertEqual(
+            ex.schema_expr,
+            "schema.properties.flag.requires.properties.rows.items"
+            ".additionalProperties")
+
+    def test_shortcuts(self):
+        ex = self.assertRaises(
+            LimitExceeded, validate, '{"items": {"items": {"items": {}}}}',
+            '[[[[1]]]]', limits=Limits(max_depth=1))
+        self.assertEqual(ex.limit, "max_depth")
+        self.assertEqual(ex.object_expr, "object[0][0]")
+
+    def test_check_interval_must_be_positive(self):
+        self.assertRaises(ValueError, Limits, check_interval=0)
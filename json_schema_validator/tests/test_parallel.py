@@ -0,0 +1,271 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for parallel validation
+"""
+
+import json
+import os
+import tempfile
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator import parallel
+from json_schema_validator.errors import SchemaError, ValidationError
+from json_schema_validator.parallel import (
+    validate_array,
+    validate_array_text,
+    validate_lines,
+    validate_many,
+)
+from json_schema_validator.schema import Schema
+from json_schema_validator.streaming import StreamingValidator
+from json_schema_validator.tests import test_bulk, test_validator
+from json_schema_validator.tests.test_compression import gzip_compress
+from json_schema_validator.validator import Validator
+
+
+SCHEMA = Schema({
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "value": {"type": "number", "maximum": 100},
+    },
+})
+
+
+def make_documents(count):
+    for i in range(count):
+        if i % 7 == 3:
+            yield {"id": i, "value": 1000}
+        else:
+            yield {"id": i, "value": i % 100}
+
+
+class DyingValidator(Validator):
+
+    def validate_toplevel(self, schema, obj):
+        os._exit(1)
+
+
+class ValidateManyTests(TestCase):
+
+    def assertResults(self, results, count):
+        self.assertEqual([index for index, error in results],
+                         list(range(count)))
+        for index, error in results:
+            if index % 7 == 3:
+                self.assertEqual(error.object_expr, "object.value")
+            else:
+                self.assertIs(error, None)
+
+    def test_results_are_in_input_order(self):
+        self.assertResults(
+            list(validate_many(SCHEMA, make_documents(2000), workers=3)),
+            2000)
+
+    def test_results_as_completed(self):
+        results = list(validate_many(
+            SCHEMA, make_documents(2000), workers=3, ordered=False))
+        self.assertResults(sorted(results, key=lambda result: result[0]),
+                           2000)
+
+    def test_single_worker(self):
+        self.assertResults(
+            list(validate_many(SCHEMA, make_documents(50), workers=1)), 50)
+
+    def test_no_documents(self):
+        self.assertEqual(list(validate_many(SCHEMA, [], workers=2)), [])
+
+    def test_schema_errors_are_raised(self):
+        schema = Schema({"type": "object", "properties": 1})
+        results = validate_many(schema, [{}, {}], workers=2)
+        self.assertRaises(SchemaError, list, results)
+
+    def test_unpicklable_documents_are_reported(self):
+        documents = [{"id": 1}, {"id": (i for i in range(3))}]
+        results = validate_many(
+            Schema({"type": "object"}), documents, workers=2)
+        self.assertRaises(TypeError, list, results)
+
+    def test_dead_workers_are_reported(self):
+        results = validate_many(
+            SCHEMA, make_documents(10), workers=2,
+            validator_class=DyingValidator)
+        self.assertRaises(RuntimeError, list, results)
+
+    def test_jobs_are_forgotten(self):
+        list(validate_many(SCHEMA, make_documents(10), workers=2))
+        self.assertEqual(parallel._jobs, {})
+
+
+class AdjustChunkSizeTests(TestCase):
+
+    def test_slow_chunks_shrink(self):
+        self.assertEqual(parallel._adjust_chunk_size(100, 100, 1.0), 52)
+
+    def test_fast_chunks_grow(self):
+        self.assertEqual(
+            parallel._adjust_chunk_size(16, 16, 0.00001),
+            parallel.MAX_CHUNK_SIZE)
+
+    def test_size_is_at_least_one(self):
+        self.assertEqual(parallel._adjust_chunk_size(1, 1, 10.0), 1)
+
+
+class ValidateArrayFailureTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorFailureTests.scenarios
+
+    def test_same_error_as_validator(self):
+        schema = Schema(json.loads(self.schema))
+        ex = self.assertRaises(
+            ValidationError, validate_array, schema, json.loads(self.data),
+            workers=2, threshold=0)
+        self.assertEqual(ex.message, self.raises.message)
+        self.assertEqual(ex.new_message, self.raises.new_message)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+    def test_same_error_as_streaming_validator(self):
+        schema = Schema(json.loads(self.schema))
+        ex = self.assertRaises(
+            ValidationError, validate_array_text, schema, self.data,
+            workers=2, threshold=0)
+        self.assertEqual(ex.new_message, self.raises.new_message)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+
+class ValidateArraySuccessTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorSuccessTests.scenarios
+
+    def test_validate_array(self):
+        schema = Schema(json.loads(self.schema))
+        self.assertEqual(validate_array(
+            schema, json.loads(self.data), workers=2, threshold=0), True)
+
+    def test_validate_array_text(self):
+        schema = Schema(json.loads(self.schema))
+        self.assertEqual(validate_array_text(
+            schema, self.data, workers=2, threshold=0), True)
+
+
+ARRAY_SCHEMA = Schema({
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "integer"},
+            "name": {"type": "string"},
+        },
+    },
+})
+
+
+class ValidateLargeArrayTests(TestCase):
+
+    def setUp(self):
+        super(ValidateLargeArrayTests, self).setUp()
+        self.obj = [
+            {"id": i, "name": "item, [{\\\"%d\\\"}]" % i}
+            for i in range(1000)]
+
+    def test_valid_array(self):
+        self.assertTrue(validate_array(
+            ARRAY_SCHEMA, self.obj, workers=3, threshold=0))
+        self.assertTrue(validate_array_text(
+            ARRAY_SCHEMA, json.dumps(self.obj), workers=3, threshold=0))
+
+    def test_earliest_error_is_reported(self):
+        self.obj[700]["id"] = "x"
+        self.obj[300]["name"] = 1
+        ex = self.assertRaises(
+            ValidationError, validate_array, ARRAY_SCHEMA, self.obj,
+            workers=3, threshold=0)
+        self.assertEqual(ex.object_expr, "object[300].name")
+        ex = self.assertRaises(
+            ValidationError, validate_array_text, ARRAY_SCHEMA,
+            json.dumps(self.obj), workers=3, threshold=0)
+        self.assertEqual(ex.object_expr, "object[300].name")
+
+    def test_unbalanced_brackets_in_strings(self):
+        for item in self.obj:
+            item["name"] = "]],"
+        self.assertTrue(validate_array_text(
+            ARRAY_SCHEMA, json.dumps(self.obj), workers=3, threshold=0))
+
+    def test_invalid_json(self):
+        text = json.dumps(self.obj)
+        text = text[:len(text) // 2] + "," + text[len(text) // 2:]
+        self.assertRaises(
+            ValueError, validate_array_text, ARRAY_SCHEMA, text,
+            workers=3, threshold=0)
+
+
+class SplitArrayTextTests(TestCase):
+
+    def test_items_are_kept_whole(self):
+        obj = [{"a": [1, 2, "[x,\\\\]"]}, "x,\\\"y", [[]], 3.5, None] * 20
+        data = json.dumps(obj).encode("utf-8")
+        ranges = parallel._split_array_text(data, 7)
+        self.assertGreater(len(ranges), 1)
+        items = []
+        for start, end in ranges:
+            items.extend(json.loads(b"[" + data[start:end] + b"]"))
+        self.assertEqual(items, obj)
+
+    def test_empty_array(self):
+        self.assertEqual(parallel._split_array_text(b" [ ] ", 4), [])
+
+    def test_not_an_array(self):
+        self.assertIs(parallel._split_array_text(b"{}", 4), None)
+
+
+class ValidateLinesTests(test_bulk.ValidateLinesTests):
+
+    scenarios = [
+        (name + "_" + kind, dict(params, compress=compress))
+        for name, params in test_bulk.ValidateLinesTests.scenarios
+        for kind, compress in [
+            ("plain", lambda data: data), ("gzip", gzip_compress)]
+    ]
+
+    def validate(self, data):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, "wb") as stream:
+            stream.write(self.compress(data))
+        kwargs = {'block_size': self.block_size, 'workers': 2}
+        if self.validator_class is not None:
+            kwargs['validator_class'] = self.validator_class
+        return [
+            (line_no, offset, isinstance(error, ValidationError))
+            for line_no, offset, error in validate_lines(
+                test_bulk.SCHEMA, path, **kwargs)]
+
+    def test_many_blocks(self):
+        lines = test_bulk.make_lines(2000)
+        lines[1500] = b'{"id": -1, "name": "x"}'
+        data = b"\n".join(lines)
+        self.assertEqual(
+            self.validate(data), [(1501, data.index(lines[1500]), True)])
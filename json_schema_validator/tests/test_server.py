@@ -0,0 +1,155 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for the validation daemon
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator import server
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.server import (
+    Client,
+    ConnectionPool,
+    ValidationServer,
+)
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"id": {"type": "integer", "optional": True}},
+}
+
+# Unique objects cannot be compared, the validator raises TypeError
+UNIQUE_OBJECTS_SCHEMA = {
+    "type": "array",
+    "items": {"type": "object"},
+    "uniqueItems": True,
+}
+
+
+class ServerTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("unix", {'transport': "unix"}),
+        ("tcp", {'transport': "tcp"}),
+    ]
+
+    def setUp(self):
+        super(ServerTests, self).setUp()
+        schema_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, schema_dir)
+        with open(os.path.join(schema_dir, "item.json"), "w") as stream:
+            json.dump(SCHEMA, stream)
+        with open(os.path.join(schema_dir, "tags.json"), "w") as stream:
+            json.dump(UNIQUE_OBJECTS_SCHEMA, stream)
+        with open(os.path.join(schema_dir, "README"), "w") as stream:
+            stream.write("not a schema")
+        validation_server = ValidationServer.from_directory(
+            schema_dir, max_document_size=1 << 20)
+        if self.transport == "unix":
+            path = os.path.join(schema_dir, "socket")
+            server = validation_server.make_unix_server(path)
+            self.options = {'path': path}
+        else:
+            server = validation_server.make_tcp_server(0)
+            self.options = {'address': server.server_address}
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def make_client(self):
+        client = Client(**self.options)
+        self.addCleanup(client.close)
+        return client
+
+    def test_valid_document(self):
+        client = self.make_client()
+        self.assertTrue(client.validate("item", '{"id": 1}'))
+        self.assertTrue(client.validate("item", {"id": 2}))
+
+    def test_invalid_document(self):
+        ex = self.assertRaises(
+            ValidationError, self.make_client().validate, "item",
+            b'{"id": "x"}')
+        self.assertEqual(ex.object_expr, "object.id")
+        self.assertEqual(ex.schema_expr, "schema.properties.id.type")
+
+    def test_failures(self):
+        client = self.make_client()
+        self.assertRaises(ValueError, client.validate, "other", "{}")
+        self.assertRaises(ValueError, client.validate, "item", "{")
+        # The connection can still be used
+        self.assertTrue(client.validate("item", "{}"))
+
+    def test_malformed_requests(self):
+        client = self.make_client()
+        schema_id = b"\xff"
+        client._sock.sendall(
+            server._REQUEST.pack(len(schema_id), 2) + schema_id + b"{}")
+        self.assertRaises(ValueError, client.receive)
+        deep = '{"id": ' + '[' * 100000 + ']' * 100000 + '}'
+        self.assertRaises(ValueError, client.validate, "item", deep)
+        self.assertTrue(client.validate("item", "{}"))
+
+    def test_unexpected_errors(self):
+        client = self.make_client()
+        ex = self.assertRaises(
+            ValueError, client.validate, "tags", [{"a": 1}, {"b": 2}])
+        self.assertIn("TypeError", str(ex))
+        self.assertTrue(client.validate("item", "{}"))
+
+    def test_documents_over_the_maximum_size(self):
+        client = self.make_client()
+        self.assertRaises(
+            ValueError, client.validate, "item",
+            {"id": 1, "padding": "x" * (1 << 20)})
+        # The document was skipped, the connection can still be used
+        self.assertTrue(client.validate("item", "{}"))
+
+    def test_pipelining(self):
+        documents = [{"id": i} if i % 5 else {"id": "x"} for i in range(500)]
+        results = list(self.make_client().validate_many("item", documents))
+        self.assertEqual([index for index, error in results],
+                         list(range(500)))
+        self.assertEqual(
+            [index for index, error in results if error is not None],
+            list(range(0, 500, 5)))
+
+    def test_connection_pool(self):
+        pool = ConnectionPool(size=2, **self.options)
+        self.addCleanup(pool.close)
+        with pool.connection() as client:
+            pass
+        self.assertTrue(pool.validate("item", "{}"))
+        with pool.connection() as other:
+            self.assertIs(other, client)
+        self.assertRaises(ValidationError, pool.validate, "item", [])
+        with pool.connection() as other:
+            self.assertIs(other, client)
@@ -0,0 +1,114 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for the shortcuts
+"""
+
+import json
+
+from testtools import TestCase
+
+from json_schema_validator import shortcuts
+from json_schema_validator.errors import ValidationError
+
+
+class SchemaCacheTests(TestCase):
+
+    def setUp(self):
+        super(SchemaCacheTests, self).setUp()
+        self.patch(shortcuts, "SCHEMA_CACHE_SIZE", 2)
+        self.patch(shortcuts, "_schema_cache", shortcuts.OrderedDict())
+        self.calls = []
+
+    def deserializer(self, text):
+        self.calls.append(text)
+        return json.loads(text)
+
+    def test_schema_is_parsed_once(self):
+        for data in ('1', '2', '3'):
+            shortcuts.validate('{"type": "integer"}', data, self.deserializer)
+        self.assertEqual(self.calls.count('{"type": "integer"}'), 1)
+
+    def test_least_recently_used_schema_is_evicted(self):
+        schemas = ['{"type": "integer"}', '{"type": "number"}', '{}']
+        for schema_text in schemas + schemas[1:]:
+            shortcuts.validate(schema_text, '1', self.deserializer)
+        self.assertEqual([
+            self.calls.count(schema_text) for schema_text in schemas],
+            [1, 1, 1])
+        shortcuts.validate(schemas[0], '1', self.deserializer)
+        self.assertEqual(self.calls.count(schemas[0]), 2)
+        self.assertEqual(len(shortcuts._schema_cache), 2)
+
+    def test_bytes_schema(self):
+        schema = shortcuts._get_schema(
+            bytearray(b'{"type": "string"}'), json.loads)
+        self.assertIs(
+            shortcuts._get_schema(b'{"type": "string"}', json.loads), schema)
+
+
+class BinaryDataTests(TestCase):
+
+    def test_validate(self):
+        for data in (b'"x"', bytearray(b'"x"'), memoryview(b'"x"')):
+            self.assertTrue(shortcuts.validate('{"type": "string"}', data))
+
+    def test_validate_invalid(self):
+        self.assertRaises(
+            ValidationError, shortcuts.validate, '{"type": "string"}',
+            memoryview(b'1'))
+
+    def test_load_validated(self):
+        for data in (b'[1]', bytearray(b'[1]'), memoryview(b'[1]')):
+            self.assertEqual(
+                shortcuts.load_validated('{"type": "array"}', data), [1])
+
+
+class InternKeysTests(TestCase):
+
+    schema_text = (
+        '{"type": "object", "properties": {'
+        '"name": {"optional": true}, "id": {"optional": true}}}')
+
+    def test_keys_are_shared(self):
+        first = shortcuts.decode(
+            self.schema_text, '{"name": "a", "other": 1}', intern_keys=True)
+        second = shortcuts.decode(
+            self.schema_text, b'{"other": 2, "name": "b"}', intern_keys=True)
+        self.assertEqual(first, {"name": "a", "other": 1})
+        for key in first:
+            self.assertEqual(
+                [other for other in second if other is key], [key])
+
+    def test_keys_are_schema_property_names(self):
+        data = shortcuts.decode(
+            self.schema_text, '{"id": 1}', intern_keys=True)
+        schema = shortcuts._get_schema(
+            self.schema_text, shortcuts._default_deserializer)
+        key, = data
+        name, = [name for name in schema.properties if name == "id"]
+        self.assertIs(key, name)
+
+    def test_validate(self):
+        self.assertTrue(shortcuts.validate(
+            self.schema_text, '{"id": 1}', intern_keys=True))
+        self.assertRaises(
+            ValidationError, shortcuts.validate, self.schema_text, '[]',
+            intern_keys=True)
@@ -0,0 +1,296 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Unit tests for streaming validation
+"""
+
+import io
+import json
+
+from testscenarios import TestWithScenarios
+from testtools import TestCase
+
+from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
+from json_schema_validator.shortcuts import load_validated, validate_stream
+from json_schema_validator.streaming import (
+    EventBuilder,
+    RawJSON,
+    JSONEventParser,
+    StreamingValidator,
+)
+from json_schema_validator.tests import test_validator
+from json_schema_validator.validator import Validator
+
+
+def build(events):
+    """Build the value described by a sequence of parsing events."""
+    builder = EventBuilder()
+    for event, value in events:
+        builder.feed(event, value)
+    return builder.value
+
+
+class JSONEventParserTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("scalar", {'text': '  42 '}),
+        ("string", {'text': '"foo"'}),
+        ("escapes", {'text': '"a\\"b\\\\c\\n\\u00e9\\ud83d\\ude00"'}),
+        ("unicode", {'text': u'"zażółć"'}),
+        ("numbers", {'text': '[0, -1, 1.5, -0.25e-3, 1E10, 12345678901234567890]'}),
+        ("constants", {'text': '[true, false, null]'}),
+        ("empty_containers", {'text': '[{}, [], {"a": []}, [[]]]'}),
+        ("nested", {
+            'text': '{"a": {"b": [1, {"c": "d"}]}, "e" : [ "f" , 2 ] }'}),
+        ("whitespace", {'text': '\n\t[ 1 ,\r\n 2 ]\n'}),
+    ]
+
+    def parse(self, chunk_size):
+        fp = io.BytesIO(self.text.encode("utf-8"))
+        return build(JSONEventParser(fp, chunk_size))
+
+    def test_same_value_as_json_loads(self):
+        expected = json.loads(self.text)
+        for chunk_size in (1, 2, 3, 7, 1024):
+            self.assertEqual(self.parse(chunk_size), expected)
+
+    def test_text_file(self):
+        fp = io.StringIO(self.text)
+        self.assertEqual(
+            build(JSONEventParser(fp, 2)), json.loads(self.text))
+
+
+class JSONEventParserErrorTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("empty", {'text': ''}),
+        ("extra_data", {'text': '[1] 2'}),
+        ("missing_comma", {'text': '[1 2]'}),
+        ("trailing_comma", {'text': '[1, ]'}),
+        ("missing_colon", {'text': '{"a" 1}'}),
+        ("unquoted_key", {'text': '{a: 1}'}),
+        ("unterminated_array", {'text': '[1, 2'}),
+        ("unterminated_string", {'text': '"abc'}),
+        ("mismatched_bracket", {'text': '[1}'}),
+        ("bad_literal", {'text': 'nul'}),
+        ("leading_zero", {'text': '01'}),
+        ("bad_escape", {'text': '"\\x"'}),
+        ("control_character", {'text': '"a\nb"'}),
+        ("invalid_utf8", {'text': b'"\xff"'}),
+    ]
+
+    def test_value_error(self):
+        text = self.text
+        if not isinstance(text, bytes):
+            text = text.encode("utf-8")
+        self.assertRaises(
+            ValueError, list, JSONEventParser(io.BytesIO(text), 2))
+
+
+class JSONEventParserMiscTests(TestCase):
+
+    def test_error_has_offset(self):
+        text = b'{"a": [1, 2 3]}'
+        ex = self.assertRaises(
+            ValueError, list, JSONEventParser(io.BytesIO(text)))
+        self.assertIn("byte offset 12", str(ex))
+
+    def test_malformed_text_is_rejected(self):
+        for text in ('[{"a" 1}]', '[[1 2]]', '[["\\x"]]', '[[01]]', '[[1',
+                     '[[{"a": [1, 2,]}]]', '[[{"a": 1,}]]', '[[[1], [2] [3]]]',
+                     '[[{"a": {"b": {"c": [1 2]}}}]]', '[[1.]]', '[[tru]]'):
+            parser = JSONEventParser(io.BytesIO(text.encode("utf-8")), 2)
+            events = iter(parser)
+            next(events)
+            next(events)
+            self.assertRaises(ValueError, parser.skip_container)
+
+
+class SkipContainerTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("object", {'text': '{"a": [1, "x\\u00e9", {"b": null}], "c": {}}'}),
+        ("array", {'text': '[[], {"a": true}, -1.5e3, "\\"]"]'}),
+        ("empty_object", {'text': '{}'}),
+        ("empty_array", {'text': '[ ]'}),
+        ("deep", {'text': '[{"a": {"b": {"c": {"d": [1, [2, {}]]}}}}, 3]'}),
+    ]
+
+    def test_raw_text_of_container(self):
+        text = '[1, {0}, 2]'.replace('{0}', self.text).encode("utf-8")
+        for chunk_size in (1, 3, 1024):
+            parser_obj = JSONEventParser(io.BytesIO(text), chunk_size)
+            events = iter(parser_obj)
+            self.assertEqual(next(events), ("start_array", None))
+            self.assertEqual(next(events), ("scalar", 1))
+            next(events)
+            raw = parser_obj.skip_container()
+            self.assertEqual(raw, self.text.encode("utf-8"))
+            self.assertEqual(list(events), [("scalar", 2), ("end_array", None)])
+
+
+class StreamingValidatorFailureTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorFailureTests.scenarios
+
+    def test_same_error_as_validator(self):
+        schema = Schema(json.loads(self.schema))
+        fp = io.BytesIO(self.data.encode("utf-8"))
+        ex = self.assertRaises(
+            ValidationError, StreamingValidator.validate, schema, fp, 3)
+        self.assertEqual(ex.new_message, self.raises.new_message)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+
+class StreamingValidatorSuccessTests(TestWithScenarios, TestCase):
+
+    scenarios = test_validator.ValidatorSuccessTests.scenarios
+
+    def test_validator_does_not_raise_an_exception(self):
+        schema = Schema(json.loads(self.schema))
+        fp = io.BytesIO(self.data.encode("utf-8"))
+        self.assertTrue(StreamingValidator.validate(schema, fp, 3))
+
+
+class StreamingValidatorTests(TestCase):
+
+    schema = Schema({
+        "type": "object",
+        "properties": {
+            "rows": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "tags": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "uniqueItems": True,
+                        },
+                        "extra": {"optional": True},
+                    },
+                },
+            },
+        },
+    })
+
+    def validate(self, obj):
+        text = json.dumps(obj).encode("utf-8")
+        return StreamingValidator.validate(self.schema, io.BytesIO(text), 5)
+
+    def test_valid_document(self):
+        rows = [{"id": i, "tags": ["a", "b"], "extra": {"x": [i]}}
+                for i in range(50)]
+        self.assertTrue(self.validate({"rows": rows}))
+
+    def test_error_in_streamed_value(self):
+        rows = [{"id": i, "tags": []} for i in range(50)]
+        rows[31]["id"] = "31"
+        ex = self.assertRaises(ValidationError, self.validate, {"rows": rows})
+        self.assertEqual(ex.object_expr, "object.rows[31].id")
+        self.assertEqual(
+            ex.schema_expr, "schema.properties.rows.items.properties.id.type")
+
+    def test_error_in_built_value(self):
+        rows = [{"id": i, "tags": ["a"]} for i in range(50)]
+        rows[7]["tags"] = ["a", "a"]
+        obj = {"rows": rows}
+        expected = self.assertRaises(
+            ValidationError, Validator.validate, self.schema, obj)
+        ex = self.assertRaises(ValidationError, self.validate, obj)
+        self.assertEqual(ex.message, expected.message)
+        self.assertEqual(ex.object_expr, "object.rows[7].tags")
+        self.assertEqual(ex.schema_expr, expected.schema_expr)
+
+    def test_requires_is_checked(self):
+        schema = Schema({"properties": {
+            "a": {"optional": True},
+            "b": {"optional": True, "requires": "a"},
+        }})
+        fp = io.BytesIO(b'{"b": 1}')
+        ex = self.assertRaises(
+            ValidationError, StreamingValidator.validate, schema, fp)
+        self.assertEqual(ex.schema_expr, "schema.properties.b.requires")
+
+    def test_incomplete_document(self):
+        validator = StreamingValidator(Schema({}))
+        validator.feed("start_array", None)
+        self.assertRaises(ValueError, validator.close)
+
+    def test_validate_stream(self):
+        fp = io.BytesIO(b'[1, 2, "3"]')
+        ex = self.assertRaises(
+            ValidationError, validate_stream,
+            '{"items": {"type": "integer"}}', fp)
+        self.assertEqual(ex.object_expr, "object[2]")
+
+
+class LoadValidatedTests(TestCase):
+
+    schema = '{"type": "object", "properties": {"a": {"type": "integer"}}}'
+
+    def test_returns_document(self):
+        obj = {"a": 1, "b": [{"c": None}, "d", 1.5]}
+        self.assertEqual(load_validated(self.schema, json.dumps(obj)), obj)
+
+    def test_bytes(self):
+        self.assertEqual(load_validated(self.schema, b'{"a": 2}'), {"a": 2})
+
+    def test_parsing_stops_at_first_error(self):
+        # The malformed tail is never parsed
+        ex = self.assertRaises(
+            ValidationError, load_validated, self.schema, '{"a": "1", ]')
+        self.assertEqual(ex.object_expr, "object.a")
+
+    def test_scalar_document(self):
+        self.assertEqual(load_validated('{"type": "string"}', '"x"'), "x")
+
+    def test_lazy_unconstrained_values(self):
+        schema = """{"type": "object", "properties": {
+            "a": {"type": "integer"},
+            "b": {},
+            "c": {"type": "array"}}}"""
+        obj = load_validated(
+            schema, '{"a": 1, "b": {"x": [1, 2]}, "c": [{"y": 1}], "d": []}',
+            lazy=True)
+        self.assertEqual(obj["a"], 1)
+        self.assertIsInstance(obj["b"], RawJSON)
+        self.assertEqual(obj["b"].raw, b'{"x": [1, 2]}')
+        self.assertEqual(obj["b"].value, {"x": [1, 2]})
+        self.assertIsInstance(obj["c"][0], RawJSON)
+        self.assertEqual(obj["c"][0].value, {"y": 1})
+        self.assertIsInstance(obj["d"], RawJSON)
+        self.assertEqual(obj["d"].value, [])
+
+    def test_lazy_values_are_checked(self):
+        self.assertRaises(
+            ValueError, load_validated, '{}', '{"a": [1, 2,]}', lazy=True)
+        ex = self.assertRaises(
+            ValidationError, load_validated,
+            '{"properties": {"a": {"type": "integer"}}}',
+            '{"b": [1, 2], "a": "1"}', lazy=True)
+        self.assertEqual(ex.object_expr, "object.a")
+
+    def test_lazy_document(self):
+        obj = load_validated('{}', '[1, 2]', lazy=True)
+        self.assertEqual(obj.value, [1, 2])
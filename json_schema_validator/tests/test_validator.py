@@ -21,6 +21,7 @@
 Unit tests for JSON schema
 """
 
+import array
 import functools
 import json
 import sys
@@ -28,7 +29,9 @@ import sys
 from testscenarios import TestWithScenarios
 from testtools import TestCase
 
+from json_schema_validator import vectorized
 from json_schema_validator.errors import ValidationError
+from json_schema_validator.schema import Schema
 from json_schema_validator.shortcuts import validate
 from json_schema_validator.validator import Validator
 
@@ -382,6 +385,32 @@ class ValidatorFailureTests(TestWithScenarios, TestCase):
             'object_expr': 'object[4]',
             'schema_expr': 'schema.additionalProperties.type',
         }),
+        ("array_with_fewer_items_than_minItems", {
+            'schema': """
+            {
+                "items": {"type": "integer"},
+                "minItems": 2
+            }""",
+            'data': '[1]',
+            'raises': ValidationError(
+                "[1] has fewer than the minimum number of items 2",
+                "Object has fewer than the minimum number of items"),
+            'object_expr': 'object',
+            'schema_expr': 'schema.minItems',
+        }),
+        ("array_with_more_items_than_maxItems", {
+            'schema': """
+            {
+                "items": {"type": "integer"},
+                "maxItems": 1
+            }""",
+            'data': '[1, 2]',
+            'raises': ValidationError(
+                "[1, 2] has more than the maximum number of items 1",
+                "Object has more than the maximum number of items"),
+            'object_expr': 'object',
+            'schema_expr': 'schema.maxItems',
+        }),
         ("array_with_array_schema_and_uniqueItems_is_True", {
             'schema': """
             {
@@ -780,3 +809,270 @@ class ValidatorSuccessTests(TestWithScenarios, TestCase):
     def test_validator_does_not_raise_an_exception(self):
         self.assertEqual(
             True, validate(self.schema, self.data))
+
+
+class ArrayTypeTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("array_array_of_integers", {
+            'schema': {"type": "array", "items": {"type": "integer"}},
+            'data': lambda: array.array('l', [1, 2, 3]),
+        }),
+        ("array_array_of_doubles_is_not_integer", {
+            'schema': {"type": "array", "items": {"type": "integer"}},
+            'data': lambda: array.array('d', [1, 2, 3]),
+            'object_expr': 'object[0]',
+            'schema_expr': 'schema.items.type',
+        }),
+        ("array_array_within_range", {
+            'schema': {
+                "type": "array",
+                "items": {"type": "number", "minimum": 0, "maximum": 1}},
+            'data': lambda: array.array('d', [0, 0.5, 1]),
+        }),
+        ("array_array_below_minimum", {
+            'schema': {
+                "type": "array",
+                "items": {"type": "number", "minimum": 0}},
+            'data': lambda: array.array('d', [0, 1, -1, -2]),
+            'object_expr': 'object[2]',
+            'schema_expr': 'schema.items.minimum',
+        }),
+        ("array_array_equal_to_exclusive_minimum", {
+            'schema': {
+                "type": "array",
+                "items": {"minimum": 0, "minimumCanEqual": False}},
+            'data': lambda: array.array('i', [1, 0]),
+            'object_expr': 'object[1]',
+            'schema_expr': 'schema.items.minimum',
+        }),
+        ("memoryview_above_maximum", {
+            'schema': {"items": {"type": "integer", "maximum": 200}},
+            'data': lambda: memoryview(bytearray(b"\x01\xff")),
+            'object_expr': 'object[1]',
+            'schema_expr': 'schema.items.maximum',
+        }),
+        ("memoryview_equal_to_exclusive_maximum", {
+            'schema': {"items": {"maximum": 2.5, "maximumCanEqual": False}},
+            'data': lambda: memoryview(array.array('f', [1, 2.5])),
+            'object_expr': 'object[1]',
+            'schema_expr': 'schema.items.maximum',
+        }),
+        ("array_array_of_large_integers_above_float_maximum", {
+            'schema': {"items": {"type": "integer", "maximum": 2.0 ** 53}},
+            'data': lambda: array.array('q', [1, 2 ** 53 + 1]),
+            'object_expr': 'object[1]',
+            'schema_expr': 'schema.items.maximum',
+        }),
+        ("array_array_of_integers_below_fractional_minimum", {
+            'schema': {"items": {"minimum": 1.5}},
+            'data': lambda: array.array('i', [2, 1]),
+            'object_expr': 'object[1]',
+            'schema_expr': 'schema.items.minimum',
+        }),
+        ("array_array_of_integers_within_huge_maximum", {
+            'schema': {"items": {"maximum": 2 ** 70}},
+            'data': lambda: array.array('q', [2 ** 62]),
+        }),
+        ("array_array_of_floats_above_double_maximum", {
+            'schema': {"items": {"maximum": 0.1}},
+            'data': lambda: array.array('f', [0.1]),
+            'object_expr': 'object[0]',
+            'schema_expr': 'schema.items.maximum',
+        }),
+        ("array_array_with_non_numeric_items_schema", {
+            'schema': {"items": {"type": "string"}},
+            'data': lambda: array.array('i', [1]),
+            'object_expr': 'object[0]',
+            'schema_expr': 'schema.items.type',
+        }),
+        ("array_array_with_unique_items", {
+            'schema': {"items": {"type": "integer"}, "uniqueItems": True},
+            'data': lambda: array.array('i', [1, 2, 1]),
+            'object_expr': 'object',
+            'schema_expr': 'schema.items',
+        }),
+        ("array_array_with_array_schema", {
+            'schema': {"items": [{"type": "integer"}, {"type": "integer"}]},
+            'data': lambda: array.array('i', [1, 2]),
+        }),
+    ]
+
+    object_expr = None
+    schema_expr = None
+
+    def _check(self, obj):
+        schema = Schema(self.schema)
+        if self.object_expr is None:
+            self.assertTrue(Validator.validate(schema, obj))
+        else:
+            ex = self.assertRaises(
+                ValidationError, Validator.validate, schema, obj)
+            self.assertEqual(ex.object_expr, self.object_expr)
+            self.assertEqual(ex.schema_expr, self.schema_expr)
+
+    def test_without_numpy(self):
+        self.patch(vectorized, 'numpy', None)
+        self._check(self.data())
+
+    def test_with_numpy(self):
+        if vectorized.numpy is None:
+            self.skipTest("NumPy is not available")
+        self._check(self.data())
+
+    def test_numpy_array(self):
+        if vectorized.numpy is None:
+            self.skipTest("NumPy is not available")
+        self._check(vectorized.numpy.asarray(self.data()))
+
+
+def _iterate_arrays(obj):
+    """Replace the lists in obj with iterators."""
+    if isinstance(obj, list):
+        return iter([_iterate_arrays(item) for item in obj])
+    if isinstance(obj, dict):
+        return dict(
+            (key, _iterate_arrays(value)) for key, value in obj.items())
+    return obj
+
+
+class IteratorFailureTests(TestWithScenarios, TestCase):
+
+    scenarios = ValidatorFailureTests.scenarios
+
+    def test_same_error_as_lists(self):
+        schema = Schema(json.loads(self.schema))
+        obj = _iterate_arrays(json.loads(self.data))
+        ex = self.assertRaises(
+            ValidationError, Validator.validate, schema, obj)
+        self.assertEqual(ex.new_message, self.raises.new_message)
+        self.assertEqual(ex.object_expr, self.object_expr)
+        self.assertEqual(ex.schema_expr, self.schema_expr)
+
+
+class IteratorSuccessTests(TestWithScenarios, TestCase):
+
+    scenarios = ValidatorSuccessTests.scenarios
+
+    def test_validator_does_not_raise_an_exception(self):
+        schema = Schema(json.loads(self.schema))
+        obj = _iterate_arrays(json.loads(self.data))
+        self.assertTrue(Validator.validate(schema, obj))
+
+
+_INTEGERS = {"type": "array", "items": {"type": "integer"}}
+
+
+class IteratorReuseTests(TestWithScenarios, TestCase):
+
+    scenarios = [
+        ("nested_type", {
+            'schema': dict(_INTEGERS, type=_INTEGERS, minItems=2),
+            'data': [1, 2],
+        }),
+        ("alternative_types", {
+            'schema': {"type": [
+                "string", dict(_INTEGERS, maxItems=1),
+                dict(_INTEGERS, minItems=2)]},
+            'data': [1, 2],
+        }),
+        ("nested_alternative_types", {
+            'schema': {"properties": {"rows": {"type": [
+                "string", dict(_INTEGERS, maxItems=1),
+                dict(_INTEGERS, minItems=2)]}}},
+            'data': {"rows": [1, 2]},
+        }),
+        ("requires_after", {
+            'schema': {"properties": {
+                "rows": dict(_INTEGERS, minItems=2),
+                "flag": {"requires": {"properties": {
+                    "rows": dict(_INTEGERS, minItems=2)}}},
+            }},
+            'data': {"flag": 1, "rows": [1, 2]},
+        }),
+        ("requires_before", {
+            'schema': {"properties": {
+                "flag": {"requires": {"properties": {
+                    "rows": dict(_INTEGERS, minItems=2)}}},
+                "rows": dict(_INTEGERS, minItems=2),
+            }},
+            'data': {"flag": 1, "rows": [1, 2]},
+        }),
+    ]
+
+    def test_items_are_read_once(self):
+        schema = Schema(self.schema)
+        self.assertTrue(Validator.validate(schema, self.data))
+        self.assertTrue(
+            Validator.validate(schema, _iterate_arrays(self.data)))
+
+
+class IteratorConsumptionTests(TestCase):
+
+    def test_document_is_consumed_one_item_at_a_time(self):
+        def generate():
+            yield 1
+            yield "x"
+            self.fail("Items were consumed after the error")
+        ex = self.assertRaises(
+            ValidationError, Validator.validate, Schema(_INTEGERS),
+            generate())
+        self.assertEqual(ex.object_expr, "object[1]")
+
+
+class IterValidateTests(TestCase):
+
+    schema = Schema({
+        "type": "array",
+        "items": {"type": "integer", "maximum": 10},
+        "maxItems": 5,
+        "minItems": 2,
+    })
+
+    def test_items_are_passed_through(self):
+        items = Validator.iter_validate(self.schema, iter([1, 2, 3]))
+        self.assertEqual(list(items), [1, 2, 3])
+
+    def test_items_are_consumed_one_at_a_time(self):
+        consumed = []
+
+        def generate():
+            for item in range(4):
+                consumed.append(item)
+                yield item
+        items = Validator.iter_validate(self.schema, generate())
+        self.assertEqual(next(items), 0)
+        self.assertEqual(consumed, [0])
+
+    def test_invalid_item(self):
+        items = Validator.iter_validate(self.schema, [1, 20, 3])
+        self.assertEqual(next(items), 1)
+        ex = self.assertRaises(ValidationError, next, items)
+        self.assertEqual(ex.object_expr, "object[1]")
+        self.assertEqual(ex.schema_expr, "schema.items.maximum")
+
+    def test_too_many_items_are_reported_early(self):
+        def generate():
+            for item in range(6):
+                yield item
+            self.fail("Items were consumed after the error")
+        ex = self.assertRaises(
+            ValidationError, list,
+            Validator.iter_validate(self.schema, generate()))
+        self.assertEqual(ex.schema_expr, "schema.maxItems")
+
+    def test_too_few_items(self):
+        ex = self.assertRaises(
+            ValidationError, list,
+            Validator.iter_validate(self.schema, [1]))
+        self.assertEqual(ex.schema_expr, "schema.minItems")
+
+    def test_wrong_type(self):
+        self.assertRaises(
+            ValidationError, list,
+            Validator.iter_validate(Schema({"type": "object"}), [1]))
+
+    def test_alternative_types_are_rejected(self):
+        self.assertRaises(
+            ValueError, Validator.iter_validate,
+            Schema({"type": ["array", "null"]}), [1])
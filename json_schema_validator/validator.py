@@ -20,13 +20,19 @@
 """Validator implementation."""
 
 import re
-import datetime
 import itertools
 import types
 import sys
 
-from json_schema_validator.errors import ValidationError
-from json_schema_validator.misc import NUMERIC_TYPES
+from json_schema_validator import vectorized
+from json_schema_validator.errors import LimitExceeded, ValidationError
+from json_schema_validator.extensions import datetime_extension
+from json_schema_validator.limits import _clock
+from json_schema_validator.misc import (
+    ARRAY_TYPES,
+    ITERATOR_TYPES,
+    NUMERIC_TYPES,
+)
 from json_schema_validator.schema import Schema
 
 if sys.version_info[0] > 2:
@@ -42,6 +48,10 @@ class Validator(object):
 
     Can be used to validate any JSON document against a
     :class:`json_schema_validator.schema.Schema`.
+
+    :param limits:
+        Optional :class:`json_schema_validator.limits.Limits` of each
+        validation
     """
 
     JSON_TYPE_MAP = {
@@ -49,16 +59,22 @@ class Validator(object):
         "number": NUMERIC_TYPES,
         "integer": int,
         "object": dict,
-        "array": list,
+        "array": ARRAY_TYPES,
         "null": None.__class__,
     }
 
-    def __init__(self):
+    def __init__(self, limits=None):
         self._schema_stack = []
         self._object_stack = []
+        self._limits = limits
+        # Lists of the items of iterators read so far, by id of the iterator
+        self._iterator_items = {}
+        self._start_limits()
 
     def _push_object(self, obj, path):
         self._object_stack.append((obj, path))
+        if self._limits is not None:
+            self._check_limits(obj)
 
     def _pop_object(self):
         self._object_stack.pop()
@@ -78,7 +94,7 @@ class Validator(object):
         return self._schema_stack[-1][0]
 
     @classmethod
-    def validate(cls, schema, obj):
+    def validate(cls, schema, obj, limits=None):
         """
         Validate specified JSON object obj with specified schema.
 
@@ -88,12 +104,17 @@ class Validator(object):
             :class:`json_schema_validator.schema.Schema`
         :param obj:
             JSON object to validate
+        :param limits:
+            Optional :class:`json_schema_validator.limits.Limits` of the
+            validation
         :rtype:
             bool
         :returns:
             True on success
         :raises `json_schema_validator.errors.ValidationError`:
             if the object does not match schema.
+        :raises `json_schema_validator.errors.LimitExceeded`:
+            if the validation exceeds one of the limits.
         :raises `json_schema_validator.errors.SchemaError`:
             if the schema itself is wrong.
         """
@@ -101,10 +122,61 @@ class Validator(object):
             raise ValueError(
                 "schema value {0!r} is not a Schema"
                 " object".format(schema))
-        self = cls()
+        self = cls() if limits is None else cls(limits=limits)
         self.validate_toplevel(schema, obj)
         return True
 
+    @classmethod
+    def iter_validate(cls, schema, iterable):
+        """
+        Validate the items of an array while they are being consumed.
+
+        The items are taken from iterable one at a time, so the array is never
+        held in memory (unless the schema requires unique items, which are
+        remembered). Each item is yielded once it is valid. The number of
+        items is checked when iterable is exhausted, too many items are
+        reported as soon as there are.
+
+        :param schema:
+            Schema of the whole array. Its type must be a single type name.
+        :type schema:
+            :class:`json_schema_validator.schema.Schema`
+        :param iterable:
+            Iterable of the items
+        :returns:
+            A generator of the items of iterable
+        :raises `json_schema_validator.errors.ValidationError`:
+            from the generator, if the array does not match schema.
+            The items yielded before are valid.
+        :raises `json_schema_validator.errors.SchemaError`:
+            if the schema itself is wrong.
+        """
+        if not isinstance(schema, Schema):
+            raise ValueError(
+                "schema value {0!r} is not a Schema"
+                " object".format(schema))
+        if not isinstance(schema.type, basestring):
+            # Alternative types would consume the items to check them
+            raise ValueError(
+                "iter_validate() needs a schema with a single type, not"
+                " {0!r}".format(schema.type))
+        self = cls()
+        return self._iter_validate_toplevel(schema, iter(iterable))
+
+    def _iter_validate_toplevel(self, schema, items):
+        self._object_stack = []
+        self._schema_stack = []
+        self._iterator_items = {}
+        self._start_limits()
+        self._push_schema(schema, "schema")
+        self._push_object(items, "object")
+        self._validate_type()
+        self._report_unsupported()
+        for item in self._iter_items():
+            yield item
+        self._pop_schema()
+        self._pop_object()
+
     def _get_object_expression(self):
         return "".join(map(lambda x: x[1], self._object_stack))
 
@@ -114,6 +186,8 @@ class Validator(object):
     def validate_toplevel(self, schema, obj):
         self._object_stack = []
         self._schema_stack = []
+        self._iterator_items = {}
+        self._start_limits()
         self._push_schema(schema, "schema")
         self._push_object(obj, "object")
         self._validate()
@@ -122,23 +196,35 @@ class Validator(object):
 
     def _validate(self):
         obj = self._object
+        if isinstance(obj, ITERATOR_TYPES) and (
+                len(self._object_stack) > 1
+                or not isinstance(self._schema.type, basestring)):
+            # Alternative types, nested types and requires may look at the
+            # items more than once. Only a whole document with a single type
+            # is sure to be walked once.
+            obj = self._unpack_array_object()
         self._validate_type()
         self._validate_requires()
         if isinstance(obj, dict):
             self._validate_properties()
             self._validate_additional_properties()
-        elif isinstance(obj, list):
+        elif isinstance(obj, ARRAY_TYPES):
             self._validate_items()
         else:
-            self._validate_enum()
-            self._validate_format()
-            self._validate_pattern()
-            if isinstance(obj, basestring):
-                self._validate_length()
-            elif isinstance(obj, NUMERIC_TYPES):
-                self._validate_range()
+            self._validate_scalar()
         self._report_unsupported()
 
+    def _validate_scalar(self):
+        """Validate the current object, which is not an object or an array."""
+        obj = self._object
+        self._validate_enum()
+        self._validate_format()
+        self._validate_pattern()
+        if isinstance(obj, basestring):
+            self._validate_length()
+        elif isinstance(obj, NUMERIC_TYPES):
+            self._validate_range()
+
     def _report_error(self, legacy_message, new_message=None,
                       schema_suffix=None):
         """
@@ -163,6 +249,73 @@ class Validator(object):
         raise ValidationError(legacy_message, new_message, object_expr,
                               schema_expr)
 
+    def _start_limits(self):
+        """Reset the usage of the limits for a new validation."""
+        limits = self._limits
+        if limits is None:
+            return
+        # Limits that are not set are infinite, so that checking them only
+        # takes a comparison
+        unlimited = float("inf")
+        self._nodes_left = limits.max_nodes
+        if self._nodes_left is None:
+            self._nodes_left = unlimited
+        self._max_stack_depth = unlimited
+        if limits.max_depth is not None:
+            self._max_stack_depth = limits.max_depth + 1
+        self._max_string_length = limits.max_string_length
+        if self._max_string_length is None:
+            self._max_string_length = unlimited
+        self._deadline = limits.get_deadline()
+        self._clock_countdown = unlimited
+        if self._deadline is not None:
+            self._clock_countdown = limits.check_interval
+
+    def _share_limits(self, other):
+        """Hand the usage of the limits over to another validator."""
+        if self._limits is None:
+            return
+        other._nodes_left = self._nodes_left
+        other._max_stack_depth = self._max_stack_depth
+        other._max_string_length = self._max_string_length
+        other._deadline = self._deadline
+        other._clock_countdown = self._clock_countdown
+
+    def _check_limits(self, obj, count=1):
+        """
+        Account for count values visited and check the limits.
+
+        This is called for each value pushed on the object stack (obj), so it
+        must be cheap. The clock is only read every
+        :attr:`json_schema_validator.limits.Limits.check_interval` values.
+        """
+        self._nodes_left -= count
+        if self._nodes_left < 0:
+            self._report_limit(
+                "max_nodes", "Object has too many values (limit {0})".format(
+                    self._limits.max_nodes))
+        if len(self._object_stack) > self._max_stack_depth:
+            self._report_limit(
+                "max_depth", "Object is nested too deeply (limit {0})".format(
+                    self._limits.max_depth))
+        if isinstance(obj, basestring) and \
+                len(obj) > self._max_string_length:
+            self._report_limit(
+                "max_string_length", "String is too long (limit {0})".format(
+                    self._limits.max_string_length))
+        self._clock_countdown -= count
+        if self._clock_countdown <= 0:
+            self._clock_countdown = self._limits.check_interval
+            if _clock() > self._deadline:
+                self._report_limit(
+                    "timeout", "Validation took too long (limit {0}s)".format(
+                        self._limits.timeout))
+
+    def _report_limit(self, limit, message):
+        raise LimitExceeded(
+            message, message, self._get_object_expression(),
+            self._get_schema_expression(), limit)
+
     def _push_property_schema(self, prop):
         """Construct a sub-schema from a property of the current schema."""
         schema = Schema(self._schema.properties[prop])
@@ -182,6 +335,29 @@ class Validator(object):
     def _push_property_object(self, prop):
         self._push_object(self._object[prop], "." + prop)
 
+    def _unpack_array_object(self):
+        """
+        Replace the current array object with a list of native python values.
+
+        This is a no-op for lists. Iterators are read once, later calls for
+        the same iterator return the same list. Other array types (see
+        :data:`json_schema_validator.misc.ARRAY_TYPES`) are converted with
+        :func:`json_schema_validator.vectorized.to_list`.
+        """
+        obj, path = self._object_stack[-1]
+        if isinstance(obj, list):
+            return obj
+        if isinstance(obj, ITERATOR_TYPES):
+            key = id(obj)
+            if key not in self._iterator_items:
+                # Keep the iterator alive so that its id is not reused
+                self._iterator_items[key] = (obj, list(obj))
+            obj = self._iterator_items[key][1]
+        else:
+            obj = vectorized.to_list(obj)
+        self._object_stack[-1] = (obj, path)
+        return obj
+
     def _report_unsupported(self):
         schema = self._schema
         if schema.contentEncoding is not None:
@@ -226,6 +402,8 @@ class Validator(object):
                     ".type.%d" % index)
                 try:
                     self._validate()
+                except LimitExceeded:
+                    raise
                 except ValidationError:
                     # Ignore errors, we just want one thing to match
                     pass
@@ -237,11 +415,7 @@ class Validator(object):
                     self._pop_schema()
             else:
                 # We were not interupted (no break) so we did not match
-                self._report_error(
-                    "{obj!r} does not match any of the types in {type!r}".format(
-                        obj=obj, type=json_type_list),
-                    "Object has incorrect type (multiple types possible)",
-                    schema_suffix=".type")
+                self._report_type_alternatives(json_type_list)
         else:
             # Simple type check
             if not isinstance(obj, self.JSON_TYPE_MAP[json_type]):
@@ -278,14 +452,15 @@ class Validator(object):
             return
         if fmt == 'date-time':
             try:
-                DATE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
-                datetime.datetime.strptime(obj, DATE_TIME_FORMAT)
+                value = datetime_extension.from_json(obj)
             except ValueError:
                 self._report_error(
                     "{obj!r} is not a string representing JSON date-time".format(
                         obj=obj),
                     "Object is not a string representing JSON date-time",
                     schema_suffix=".format")
+            else:
+                self._decode_format(value)
         elif fmt == 'regex':
             try:
                 re.compile(obj)
@@ -298,6 +473,14 @@ class Validator(object):
         else:
             raise NotImplementedError("format {0!r} is not supported".format(fmt))
 
+    def _decode_format(self, value):
+        """
+        Handle the value decoded while checking the format of an object.
+
+        This is called with the :class:`datetime.datetime` object parsed from
+        a valid date-time string. It does nothing by default.
+        """
+
     def _validate_properties(self):
         obj = self._object
         schema = self._schema
@@ -309,15 +492,23 @@ class Validator(object):
                 self._validate()
                 self._pop_object()
             else:
-                if not self._schema.optional:
-                    self._report_error(
-                        "{obj!r} does not have property {prop!r}".format(
-                            obj=obj, prop=prop),
-                        "Object lacks property {prop!r}".format(
-                            prop=prop),
-                        schema_suffix=".optional")
+                self._validate_missing_property(prop)
             self._pop_schema()
 
+    def _validate_missing_property(self, prop):
+        """
+        Check that prop, missing from the current object, is optional.
+
+        The schema of the property has to be the current schema.
+        """
+        if not self._schema.optional:
+            self._report_error(
+                "{obj!r} does not have property {prop!r}".format(
+                    obj=self._object, prop=prop),
+                "Object lacks property {prop!r}".format(
+                    prop=prop),
+                schema_suffix=".optional")
+
     def _validate_additional_properties(self):
         obj = self._object
         assert isinstance(obj, dict)
@@ -326,14 +517,7 @@ class Validator(object):
             # Report exception for each unknown property
             for prop in obj.keys():
                 if prop not in self._schema.properties:
-                    self._report_error(
-                        "{obj!r} has unknown property {prop!r} and"
-                        " additionalProperties is false".format(
-                            obj=obj, prop=prop),
-                        "Object has unknown property {prop!r} but"
-                        " additional properties are disallowed".format(
-                            prop=prop),
-                        schema_suffix=".additionalProperties")
+                    self._report_unknown_property(prop)
         else:
             # Check each property against this object
             self._push_additional_property_schema()
@@ -343,6 +527,17 @@ class Validator(object):
                 self._pop_object()
             self._pop_schema()
 
+    def _report_unknown_property(self, prop):
+        """Report prop of the current object as an additional property."""
+        self._report_error(
+            "{obj!r} has unknown property {prop!r} and"
+            " additionalProperties is false".format(
+                obj=self._object, prop=prop),
+            "Object has unknown property {prop!r} but"
+            " additional properties are disallowed".format(
+                prop=prop),
+            schema_suffix=".additionalProperties")
+
     def _validate_enum(self):
         obj = self._object
         schema = self._schema
@@ -393,66 +588,40 @@ class Validator(object):
                     "Object is greater than the maximum",
                     schema_suffix=".maximum")
 
+    def _report_type_alternatives(self, json_type_list):
+        """Report that the current object matches none of the types."""
+        self._report_error(
+            "{obj!r} does not match any of the types in {type!r}".format(
+                obj=self._object, type=json_type_list),
+            "Object has incorrect type (multiple types possible)",
+            schema_suffix=".type")
+
     def _validate_items(self):
         obj = self._object
         schema = self._schema
-        assert isinstance(obj, list)
+        assert isinstance(obj, ARRAY_TYPES)
+        if isinstance(obj, ITERATOR_TYPES):
+            for item in self._iter_items():
+                pass
+            return
         items_schema_json = schema.items
         if items_schema_json == {}:
             # default value, don't do anything
             return
-        if isinstance(obj, list) and schema.uniqueItems is True and len(set(obj)) != len(obj):
-            # If we want a list of unique items and the length of unique
-            # elements is different from the length of the full list
-            # then validation fails.
-            # This implementation isn't strictly compatible with the specs, because
-            # we are not checking unique dicts.
-            self._report_error(
-                "Repeated items found in {obj!r}".format(obj=obj),
-                "Repeated items found in array",
-                schema_suffix=".items")
-        if schema.minItems:
-            if len(obj) < schema.minItems:
-                self._report_error(
-                    "{obj!r} has fewer than the minimum number of items"
-                    " {minItems!r}".format(obj=obj, minimum=schema.minItems),
-                    "Object has fewer than the minimum number of items",
-                    schema_suffix=".minItems")
-        if schema.maxItems is not None:
-            if len(obj) > schema.maxItems:
-                self._report_error(
-                    "{obj!r} has more than the maximum number of items"
-                    " {maxItems!r}".format(obj=obj, minimum=schema.maxItems),
-                    "Object has more than the maximum number of items",
-                    schema_suffix=".maxItems")
+        self._validate_unique_items()
+        self._validate_item_count(len(obj))
         if isinstance(items_schema_json, dict):
             self._push_array_schema()
-            for index, item in enumerate(obj):
-                self._push_array_item_object(index)
-                self._validate()
-                self._pop_object()
+            if not self._validate_vectorized_items():
+                obj = self._unpack_array_object()
+                for index, item in enumerate(obj):
+                    self._push_array_item_object(index)
+                    self._validate()
+                    self._pop_object()
             self._pop_schema()
         elif isinstance(items_schema_json, list):
-            if len(obj) < len(items_schema_json):
-                # If our data array is shorter than the schema then
-                # validation fails. Longer arrays are okay (during this
-                # step) as they are validated based on
-                # additionalProperties schema
-                self._report_error(
-                    "{obj!r} is shorter than array schema {schema!r}".
-                    format(obj=obj, schema=items_schema_json),
-                    "Object array is shorter than schema array",
-                    schema_suffix=".items")
-            if len(obj) != len(items_schema_json) and schema.additionalProperties is False:
-                # If our array is not exactly the same size as the
-                # schema and additional properties are disallowed then
-                # validation fails
-                self._report_error(
-                    "{obj!r} is not of the same length as array schema"
-                    " {schema!r} and additionalProperties is"
-                    " false".format(obj=obj, schema=items_schema_json),
-                    "Object array is not of the same length as schema array",
-                    schema_suffix=".items")
+            obj = self._unpack_array_object()
+            self._validate_tuple_length(len(obj))
             # Validate each array element using schema for the
             # corresponding array index, fill missing values (since
             # there may be more items in our array than in the schema)
@@ -471,6 +640,158 @@ class Validator(object):
                 self._pop_schema()
                 self._pop_object()
 
+    def _validate_unique_items(self):
+        obj = self._object
+        if self._schema.uniqueItems is True and len(set(obj)) != len(obj):
+            # If we want a list of unique items and the length of unique
+            # elements is different from the length of the full list
+            # then validation fails.
+            # This implementation isn't strictly compatible with the specs, because
+            # we are not checking unique dicts.
+            self._report_error(
+                "Repeated items found in {obj!r}".format(obj=obj),
+                "Repeated items found in array",
+                schema_suffix=".items")
+
+    def _iter_items(self):
+        """
+        Validate the items of the current array object one at a time.
+
+        The object is an iterator whose items are consumed as they are
+        validated. The checks are the same as those of
+        :meth:`_validate_items` but errors are reported in the order of the
+        items and the number of items is checked at the end.
+
+        :returns:
+            A generator of the valid items
+        """
+        schema = self._schema
+        items_schema_json = schema.items
+        items = self._object
+        if items_schema_json == {}:
+            # default value, don't do anything
+            for item in items:
+                yield item
+            return
+        if schema.uniqueItems is True:
+            seen = set()
+        else:
+            seen = None
+        max_items = schema.maxItems
+        is_tuple = isinstance(items_schema_json, list)
+        additional = schema.additionalProperties
+        count = 0
+        for item in items:
+            index = count
+            count += 1
+            if max_items is not None and count > max_items:
+                self._validate_item_count(count)
+            if seen is not None:
+                if item in seen:
+                    self._report_error(
+                        "Repeated items found in {obj!r}".format(
+                            obj=self._object),
+                        "Repeated items found in array",
+                        schema_suffix=".items")
+                seen.add(item)
+            if not is_tuple:
+                self._push_array_schema()
+            elif index < len(items_schema_json):
+                self._push_schema(
+                    Schema(items_schema_json[index]), "items[%d]" % index)
+            elif additional is False:
+                self._validate_tuple_length(count)
+            else:
+                self._push_schema(Schema(additional), ".additionalProperties")
+            self._push_object(item, "[%d]" % index)
+            self._validate()
+            self._pop_object()
+            self._pop_schema()
+            yield item
+        self._validate_item_count(count)
+        if is_tuple:
+            self._validate_tuple_length(count)
+
+    def _validate_item_count(self, count):
+        """Check the number of items of the current array object."""
+        obj = self._object
+        schema = self._schema
+        if schema.minItems:
+            if count < schema.minItems:
+                self._report_error(
+                    "{obj!r} has fewer than the minimum number of items"
+                    " {minItems!r}".format(obj=obj, minItems=schema.minItems),
+                    "Object has fewer than the minimum number of items",
+                    schema_suffix=".minItems")
+        if schema.maxItems is not None:
+            if count > schema.maxItems:
+                self._report_error(
+                    "{obj!r} has more than the maximum number of items"
+                    " {maxItems!r}".format(obj=obj, maxItems=schema.maxItems),
+                    "Object has more than the maximum number of items",
+                    schema_suffix=".maxItems")
+
+    def _validate_tuple_length(self, count):
+        """
+        Check the number of items of the current array object.
+
+        This is used when the schema describes each item separately (items is
+        a list of schemas).
+        """
+        obj = self._object
+        schema = self._schema
+        items_schema_json = schema.items
+        if count < len(items_schema_json):
+            # If our data array is shorter than the schema then
+            # validation fails. Longer arrays are okay (during this
+            # step) as they are validated based on
+            # additionalProperties schema
+            self._report_error(
+                "{obj!r} is shorter than array schema {schema!r}".
+                format(obj=obj, schema=items_schema_json),
+                "Object array is shorter than schema array",
+                schema_suffix=".items")
+        if count != len(items_schema_json) and schema.additionalProperties is False:
+            # If our array is not exactly the same size as the
+            # schema and additional properties are disallowed then
+            # validation fails
+            self._report_error(
+                "{obj!r} is not of the same length as array schema"
+                " {schema!r} and additionalProperties is"
+                " false".format(obj=obj, schema=items_schema_json),
+                "Object array is not of the same length as schema array",
+                schema_suffix=".items")
+
+    def _validate_vectorized_items(self):
+        """
+        Validate all items of a numeric array at once.
+
+        This works for arrays that are not lists (for example
+        :class:`array.array`, :class:`memoryview` or
+        :class:`numpy.ndarray`) when NumPy is available and the items schema
+        only constrains numbers. The first invalid item, if any, is validated
+        again in the regular way to report the error.
+
+        :returns:
+            True if the items were validated, False if the caller needs to
+            validate each item individually.
+        """
+        obj = self._object
+        if isinstance(obj, list):
+            return False
+        index = vectorized.find_invalid_item(obj, self._schema)
+        if index is NotImplemented:
+            return False
+        if self._limits is not None:
+            # The items are numbers, only their number matters
+            self._check_limits(None, len(obj))
+        if index is not None:
+            self._push_object(
+                vectorized.get_item(obj, index), "[%d]" % index)
+            self._validate()
+            self._pop_object()
+        return True
+
     def _validate_requires(self):
         obj = self._object
         schema = self._schema
@@ -508,9 +829,23 @@ class Validator(object):
             # and restoring the state would be very complicated we just
             # instantiate a new validator with a subset of our current
             # history here.
-            sub_validator = Validator()
-            sub_validator._object_stack = self._object_stack[:-1]
-            sub_validator._schema_stack = self._schema_stack[:]
-            sub_validator._push_schema(
-                Schema(requires_json), ".requires")
-            sub_validator._validate()
+            sub_validator = self._get_requires_validator(requires_json)
+            # The enclosing object is walked again, within our limits
+            self._share_limits(sub_validator)
+            try:
+                sub_validator._validate()
+            finally:
+                sub_validator._share_limits(self)
+
+    def _get_requires_validator(self, requires_json):
+        """
+        Get a validator of the enclosing object against requires_json.
+
+        Its limits are not set, see :meth:`_share_limits`.
+        """
+        sub_validator = Validator(self._limits)
+        sub_validator._iterator_items = self._iterator_items
+        sub_validator._object_stack = self._object_stack[:-1]
+        sub_validator._schema_stack = self._schema_stack[:]
+        sub_validator._push_schema(Schema(requires_json), ".requires")
+        return sub_validator
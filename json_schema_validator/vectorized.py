@@ -0,0 +1,210 @@
+# Copyright (C) 2010, 2011 Linaro Limited
+# Copyright (C) 2016 Zygmunt Krynicki
+#
+# Author: Zygmunt Krynicki <me@zygoon.pl>
+#
+# This file is part of json-schema-validator.
+#
+# json-schema-validator is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License version 3
+# as published by the Free Software Foundation
+#
+# json-schema-validator is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with json-schema-validator.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Vectorized validation of numeric arrays.
+
+The helpers in this module are only useful when NumPy is available. They
+operate on a zero-copy view of the validated array (anything supporting the
+buffer protocol as well as :class:`numpy.ndarray`) and locate the first
+element that the regular validator would reject. The validator then
+re-validates that single element to produce the usual error.
+
+Structured (record) arrays are validated as if each record was an object
+mapping field names to native python values.
+"""
+
+import math
+import operator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Schema keywords that can be checked with vectorized operations
+NUMERIC_KEYWORDS = frozenset([
+    "type", "minimum", "maximum", "minimumCanEqual", "maximumCanEqual",
+    "optional", "title", "description", "default",
+])
+
+# Schema types that can be checked with vectorized operations
+NUMERIC_SCHEMA_TYPES = ("number", "integer", "any")
+
+# NumPy dtype kinds that map to JSON numbers and integers. Booleans are
+# included because the validator accepts them as python integers.
+NUMBER_KINDS = "biuf"
+INTEGER_KINDS = "biu"
+
+
+def as_array(obj):
+    """
+    Get a one-dimensional NumPy view of obj, without copying.
+
+    :returns:
+        :class:`numpy.ndarray` or None if NumPy is not available or if obj
+        cannot be viewed as a one-dimensional array.
+    """
+    if numpy is None:
+        return
+    try:
+        arr = numpy.asarray(obj)
+    except (TypeError, ValueError):
+        return
+    if arr.ndim != 1:
+        return
+    return arr
+
+
+def is_numeric_schema(schema):
+    """
+    Check if schema only constrains numbers.
+
+    :param schema:
+        :class:`json_schema_validator.schema.Schema` to look at
+    """
+    schema_json = schema._schema
+    if not NUMERIC_KEYWORDS.issuperset(schema_json):
+        return False
+    if schema_json.get("type", "any") not in NUMERIC_SCHEMA_TYPES:
+        return False
+    for keyword in ("minimum", "maximum"):
+        value = schema_json.get(keyword)
+        # Decimal (and invalid) limits are left to the regular code path
+        if value is not None and not isinstance(value, (int, float)):
+            return False
+    return True
+
+
+class _Inexact(Exception):
+    """Raised when a bound cannot be compared exactly with an array."""
+
+
+def _compare_integers(arr, op, bound):
+    """
+    Compare an integer array with a bound, exactly.
+
+    Python compares integers and floats exactly, NumPy converts both to
+    float64 and rounds integers above 2**53. Float bounds are replaced by the
+    integer bound that selects the same integers and bounds outside of the
+    range of the dtype select either all or none of the elements.
+    """
+    if isinstance(bound, float):
+        if math.isnan(bound):
+            raise _Inexact()
+        if math.isinf(bound):
+            return numpy.full(len(arr), op(0, bound), dtype=bool)
+        if op is operator.lt or op is operator.ge:
+            bound = int(math.ceil(bound))
+        else:
+            bound = int(math.floor(bound))
+    if arr.dtype.kind == "b":
+        info_min, info_max = 0, 1
+    else:
+        info = numpy.iinfo(arr.dtype)
+        info_min, info_max = int(info.min), int(info.max)
+    if bound < info_min or bound > info_max:
+        return numpy.full(len(arr), op(info_min, bound), dtype=bool)
+    return op(arr, bound)
+
+
+def _compare_floats(arr, op, bound):
+    """
+    Compare a floating point array with a bound, exactly.
+
+    The bound is a float64 scalar, so that narrower arrays are widened
+    instead of the bound being rounded to their precision.
+    """
+    if not isinstance(bound, float) and float(bound) != bound:
+        raise _Inexact()
+    return op(arr, numpy.float64(bound))
+
+
+def find_invalid_item(obj, schema):
+    """
+    Find the first element of obj that does not match schema.
+
+    :param obj:
+        Array-like object to check
+    :param schema:
+        :class:`json_schema_validator.schema.Schema` of each element
+    :returns:
+        Index of the first invalid element, None if all elements are valid or
+        NotImplemented if the check cannot be vectorized.
+    """
+    if not is_numeric_schema(schema):
+        return NotImplemented
+    arr = as_array(obj)
+    if arr is None or arr.dtype.kind not in NUMBER_KINDS:
+        return NotImplemented
+    if len(arr) == 0:
+        return
+    if schema.type == "integer" and arr.dtype.kind not in INTEGER_KINDS:
+        # Floating point values are never integers, even if they are whole
+        return 0
+    if arr.dtype.kind in INTEGER_KINDS:
+        compare = _compare_integers
+    else:
+        compare = _compare_floats
+    invalid = numpy.zeros(len(arr), dtype=bool)
+    try:
+        if schema.minimum is not None:
+            if schema.minimumCanEqual:
+                invalid |= compare(arr, operator.lt, schema.minimum)
+            else:
+                invalid |= compare(arr, operator.le, schema.minimum)
+        if schema.maximum is not None:
+            if schema.maximumCanEqual:
+                invalid |= compare(arr, operator.gt, schema.maximum)
+            else:
+                invalid |= compare(arr, operator.ge, schema.maximum)
+    except _Inexact:
+        return NotImplemented
+    if not invalid.any():
+        return
+    return int(invalid.argmax())
+
+
+def get_item(obj, index):
+    """Get element of array-like obj at index as a native python value."""
+    return numpy.asarray(obj)[index].item()
+
+
+def is_record_array(obj):
+    """Check if obj is a one-dimensional NumPy structured array."""
+    return (numpy is not None and isinstance(obj, numpy.ndarray)
+            and obj.dtype.names is not None and obj.ndim == 1)
+
+
+def get_record(obj, index):
+    """Get record of structured array obj at index as a dictionary."""
+    return dict(zip(obj.dtype.names, obj[index].item()))
+
+
+def to_list(obj):
+    """
+    Convert array-like obj to a list of native python values.
+
+    Records of structured arrays are converted to dictionaries.
+    """
+    if is_record_array(obj):
+        names = obj.dtype.names
+        return [dict(zip(names, record)) for record in obj.tolist()]
+    return obj.tolist()
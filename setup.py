@@ -40,6 +40,11 @@ setup(
     packages=find_packages(),
     url='https://github.com/zyga/json-schema-validator',
     test_suite='json_schema_validator.tests.test_suite',
+    entry_points={
+        'console_scripts': [
+            'json-schema-validator = json_schema_validator.cli:main',
+        ],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",